@@ -0,0 +1,68 @@
+"""
+Process-level registry of MongoDBAgent instances.
+
+Constructing an agent creates OpenAI clients, MCP session pools and caches,
+so callers (evaluation tasks, the Streamlit app) should share one agent per
+configuration instead of building a new one per request:
+
+    from agent_registry import get_agent
+    agent = get_agent()
+
+Registered agents are closed when the process exits.
+"""
+
+import atexit
+import threading
+from typing import Any, Dict, Tuple
+
+from mongodb_agent import MongoDBAgent
+
+
+_agents: Dict[Tuple, MongoDBAgent] = {}
+_lock = threading.Lock()
+
+
+def _config_key(config: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((name, repr(value)) for name, value in config.items()))
+
+
+def get_agent(**config) -> MongoDBAgent:
+    """
+    Return the shared agent for a configuration, creating it on first use.
+
+    Args:
+        **config: MongoDBAgent constructor arguments; agents with identical
+            arguments are shared
+
+    Returns:
+        The process-wide MongoDBAgent for that configuration
+    """
+    key = _config_key(config)
+    with _lock:
+        agent = _agents.get(key)
+        if agent is None:
+            agent = MongoDBAgent(**config)
+            _agents[key] = agent
+    return agent
+
+
+async def aclose_agents() -> None:
+    """Close the sessions and connections the registered agents hold on the running event loop."""
+    for agent in list(_agents.values()):
+        await agent.aclose()
+
+
+def shutdown_agents() -> None:
+    """Close every registered agent and forget it. Runs automatically at exit."""
+    with _lock:
+        agents = list(_agents.values())
+        _agents.clear()
+
+    for agent in agents:
+        try:
+            agent.close()
+        except Exception as e:
+            print(f"Error shutting down agent: {e}")
+
+
+atexit.register(shutdown_agents)
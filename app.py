@@ -3,14 +3,20 @@ Streamlit AI Agent for MongoDB querying via MCP tools.
 Run with: streamlit run app.py
 
 The AI calling logic is separated into the MongoDBAgent class which can be
-used independently for evaluation with pydantic_evals.
+used independently for evaluation with pydantic_evals. A single agent is shared
+by all reruns and sessions of the app (see get_cached_agent).
 """
 
+import json
+import math
 import os
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
 
 from mongodb_agent import MongoDBAgent
+from agent_registry import get_agent
+from result_pager import ResultPager
 
 
 # Load environment variables
@@ -24,6 +30,123 @@ else:
 # STREAMLIT UI
 # ============================================================================
 
+# Wall-clock bounds for interactive queries, in seconds
+QUERY_DEADLINE_S = float(os.getenv("AGENT_QUERY_DEADLINE_S", "60"))
+COMPLETION_TIMEOUT_S = 30.0
+TOOL_TIMEOUT_S = 15.0
+
+class AgentWarmup:
+    """
+    Warm-up state of the shared agent. A failed warm-up is retried in the
+    background, one attempt at a time (like server.py), so an app started
+    before the MCP server recovers without blocking reruns.
+    """
+    
+    def __init__(self, agent: MongoDBAgent):
+        self.agent = agent
+        self.error = None
+        self._lock = threading.Lock()
+        self._retry_thread = None
+    
+    def run(self) -> None:
+        """Warm the agent up, recording the outcome in error."""
+        # Pay MCP initialize/connect, tool listing, schema loading and the OpenAI
+        # TLS handshake at startup instead of on the first user query
+        try:
+            self.agent.warmup_sync()
+            self.error = None
+        except Exception as e:
+            print(f"Agent warm-up failed: {e}")
+            self.error = str(e) or type(e).__name__
+    
+    def retry_if_failed(self) -> None:
+        """Start a background retry of a failed warm-up unless one is already running."""
+        with self._lock:
+            if self.error is None or (self._retry_thread is not None and self._retry_thread.is_alive()):
+                return
+            self._retry_thread = threading.Thread(target=self.run, name="agent-warmup", daemon=True)
+            self._retry_thread.start()
+
+def _load_agent():
+    """Create the shared agent and warm it up. Returns (agent, AgentWarmup)."""
+    agent = get_agent(
+        completion_timeout_s=COMPLETION_TIMEOUT_S,
+        tool_timeout_s=TOOL_TIMEOUT_S,
+        adaptive_iterations=True,
+        # Easy questions go to this cheaper model first, e.g. gpt-4.1-mini
+        fast_model=os.getenv("AGENT_FAST_MODEL") or None,
+        # Race completions slower than the recent p95 with a duplicate request
+        hedge_completions=os.getenv("AGENT_HEDGE_COMPLETIONS", "").lower() in ("1", "true", "yes"),
+        # Operators often ask the same question at once (e.g. at shift start)
+        coalesce_queries=True,
+        # Set when events_daily is kept up to date with rollups.py
+        daily_rollups=os.getenv("AGENT_DAILY_ROLLUPS", "").lower() in ("1", "true", "yes")
+    )
+    warmup = AgentWarmup(agent)
+    warmup.run()
+    return agent, warmup
+
+def _cached_agent_and_warmup():
+    # Caches the warm-up state, not its outcome: a failure is retried (see AgentWarmup)
+    import streamlit as st
+    return st.cache_resource(show_spinner="Warming up the agent...")(_load_agent)()
+
+def get_cached_agent() -> MongoDBAgent:
+    """
+    Process-wide agent cached as a Streamlit resource, so its OpenAI client,
+    MCP session pool and caches survive script reruns and user sessions.
+    It is shut down by agent_registry when the process exits.
+    """
+    return _cached_agent_and_warmup()[0]
+
+def _load_pager() -> ResultPager:
+    return ResultPager(os.getenv("MDB_MCP_CONNECTION_STRING"), os.getenv("MDB_MCP_DATABASE"))
+
+def get_cached_pager() -> ResultPager:
+    """Process-wide pager (one MongoClient) for browsing results larger than one page."""
+    import streamlit as st
+    return st.cache_resource(_load_pager)()
+
+def show_result_pages(pagination):
+    """
+    Browse the full result of a large find page by page, read straight from
+    MongoDB. Runs as a fragment, so changing pages doesn't rerun the query.
+    """
+    import streamlit as st
+    
+    @st.fragment
+    def result_pages():
+        key = json.dumps(pagination, sort_keys=True, default=str)
+        state = st.session_state.get("result_pages")
+        if state is None or state["key"] != key:
+            # Token of each visited page, so "Previous" doesn't need to re-scan
+            state = st.session_state["result_pages"] = {"key": key, "tokens": [None], "page": 0}
+        page = state["page"]
+        
+        try:
+            documents, next_token = get_cached_pager().fetch_page(pagination, state["tokens"][page])
+        except Exception as e:
+            st.error(f"❌ Error loading results: {str(e)}")
+            return
+        if next_token is not None and len(state["tokens"]) == page + 1:
+            state["tokens"].append(next_token)
+        
+        total_pages = max(1, math.ceil(pagination["total"] / pagination["page_size"]))
+        st.markdown(f"**📄 All {pagination['total']} results** (page {page + 1} of {total_pages}):")
+        st.json(documents, expanded=False)
+        
+        prev_col, next_col = st.columns(2)
+        with prev_col:
+            if st.button("⬅️ Previous page", disabled=page == 0, use_container_width=True):
+                state["page"] -= 1
+                st.rerun(scope="fragment")
+        with next_col:
+            if st.button("Next page ➡️", disabled=next_token is None, use_container_width=True):
+                state["page"] += 1
+                st.rerun(scope="fragment")
+    
+    result_pages()
+
 def init_streamlit_ui():
     """Initialize Streamlit UI components. Only called when running as Streamlit app."""
     import streamlit as st
@@ -97,6 +220,13 @@ def main():
             st.error("❌ OpenAI API not configured")
             st.info("Add OPENAI_API_KEY to .env file")
         
+        st.markdown("---")
+        st.header("⚡ Answer Mode")
+        fast_answer = st.toggle(
+            "Fast answer",
+            help="Answer directly from the first successful query instead of asking the model to summarize it"
+        )
+        
         st.markdown("---")
         st.header("📝 Example Queries")
         st.markdown("""
@@ -111,10 +241,16 @@ def main():
         st.header("🔧 MCP Server Status")
         mcp_status = st.empty()
         
-        try:
-            # Try to check if MCP server is running (basic check)
-            mcp_status.success("✅ Ready to connect")
-        except:
+        if has_mongodb and has_openai:
+            # The cached agent is warmed up on first load, which also checks the MCP server;
+            # while that failed, each rerun retries it in the background and shows the last outcome
+            warmup = _cached_agent_and_warmup()[1]
+            warmup.retry_if_failed()
+            if warmup.error is None:
+                mcp_status.success("✅ Connected and warmed up")
+            else:
+                mcp_status.warning(f"⚠️ Make sure MCP server is running on localhost:3000 ({warmup.error})")
+        else:
             mcp_status.warning("⚠️ Make sure MCP server is running on localhost:3000")
     
     # Main content
@@ -165,11 +301,18 @@ OPENAI_API_KEY=sk-your-openai-api-key
     if submit_button and user_query:
         with st.spinner("🔄 Processing your query..."):
             try:
-                # Initialize MongoDB Agent
-                agent = MongoDBAgent()
+                # Reuse the shared MongoDB Agent
+                agent = get_cached_agent()
                 
                 # Run query
-                query_result = agent.query_sync(user_query)
+                query_result = agent.query_sync(
+                    user_query,
+                    stop_mode="fast_answer" if fast_answer else "full",
+                    deadline_s=QUERY_DEADLINE_S
+                )
+                
+                if query_result.get("stop_reason") == "deadline_exceeded":
+                    st.warning(f"⏱️ Stopped after the {QUERY_DEADLINE_S:.0f}s time limit, results may be incomplete.")
                 
                 # Display results
                 st.markdown("---")
@@ -183,6 +326,21 @@ OPENAI_API_KEY=sk-your-openai-api-key
                         "filter": query_result["filter"]
                     })
                 
+                # Show timing and token usage
+                trace = query_result.get("trace")
+                if trace:
+                    totals = trace["totals"]
+                    st.caption(
+                        f"⏱️ {trace['total_ms'] / 1000:.2f}s · "
+                        f"{totals['completions']} completions · {totals['tool_calls']} tool calls · "
+                        f"{totals['prompt_tokens']} prompt / {totals['completion_tokens']} completion tokens "
+                        f"({totals['cached_tokens']} cached)"
+                    )
+                
+                # Large finds: the model only saw the first page, browse the rest here
+                if query_result.get("pagination"):
+                    show_result_pages(query_result["pagination"])
+                
                 # Show iterations
                 for result in query_result.get("iterations", []):
                     with st.expander(f"🔄 Iteration {result['iteration']}", expanded=True):
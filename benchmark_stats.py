@@ -0,0 +1,83 @@
+"""
+Statistics helpers shared by run_benchmark.py and compare_benchmarks.py.
+
+Pure Python (no numpy/scipy) so benchmark artifacts can be compared anywhere.
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Percentile with linear interpolation between closest ranks."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _ranks(values: List[float]) -> Tuple[List[float], List[int]]:
+    """Average ranks (1-based) of values, plus the sizes of tied groups."""
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    ties = []
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        ties.append(j - i + 1)
+        i = j + 1
+    return ranks, ties
+
+
+def _upper_tail(z: float) -> float:
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def mann_whitney_greater(baseline: List[float], candidate: List[float]) -> Optional[float]:
+    """
+    One-sided Mann-Whitney U test (normal approximation with tie and
+    continuity correction) that candidate values tend to be larger.
+
+    Returns:
+        p-value, or None when either sample is too small to test
+    """
+    n1, n2 = len(baseline), len(candidate)
+    if n1 < 3 or n2 < 3:
+        return None
+
+    ranks, ties = _ranks(list(baseline) + list(candidate))
+    u2 = sum(ranks[n1:]) - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    tie_term = sum(t ** 3 - t for t in ties) / (n * (n - 1))
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return 1.0
+    return _upper_tail((u2 - n1 * n2 / 2 - 0.5) / sigma)
+
+
+def wilcoxon_greater(pairs: List[Tuple[float, float]]) -> Optional[float]:
+    """
+    One-sided Wilcoxon signed-rank test (normal approximation) that the
+    second value of each (baseline, candidate) pair tends to be larger.
+
+    Returns:
+        p-value, or None with fewer than 5 non-zero differences
+    """
+    diffs = [c - b for b, c in pairs if c != b]
+    n = len(diffs)
+    if n < 5:
+        return None
+
+    ranks, ties = _ranks([abs(d) for d in diffs])
+    w_plus = sum(r for r, d in zip(ranks, diffs) if d > 0)
+    variance = n * (n + 1) * (2 * n + 1) / 24 - sum(t ** 3 - t for t in ties) / 48
+    if variance <= 0:
+        return 1.0
+    return _upper_tail((w_plus - n * (n + 1) / 4 - 0.5) / math.sqrt(variance))
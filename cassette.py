@@ -0,0 +1,131 @@
+"""
+Record/replay cassettes for the LLM and MCP calls made by MongoDBAgent.
+
+A cassette stores every completion request/response and every MCP tool
+call/result on disk, keyed by a hash of the request content. In replay mode
+recorded interactions are served from disk and only unseen requests hit the
+network (and are then recorded), so unchanged evaluation cases re-run in
+milliseconds.
+
+Layout on disk:
+    <directory>/<kind>/<sha256>.json   with {"request": ..., "response": ...}
+
+Configure from the environment with:
+    AGENT_CASSETTE_MODE=record|replay
+    AGENT_CASSETTE_DIR=.cassettes
+    AGENT_CASSETTE_STRICT=1            # replay misses raise instead of going live
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+CASSETTE_MODES = ("record", "replay")
+DEFAULT_CASSETTE_DIR = ".cassettes"
+
+
+class CassetteMiss(LookupError):
+    """Raised in strict replay mode when a request has no recorded response."""
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convert pydantic models (OpenAI/MCP types) and containers to plain JSON data."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    return value
+
+
+def content_hash(payload: Any) -> str:
+    """Stable sha256 of a JSON-serializable payload."""
+    canonical = json.dumps(to_jsonable(payload), sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Content-addressed store of recorded agent interactions.
+
+    Modes:
+        record: always go live and (over)write the recorded response
+        replay: serve recorded responses; misses go live and are recorded,
+                unless strict=True in which case a CassetteMiss is raised
+    """
+
+    def __init__(self, directory: str = DEFAULT_CASSETTE_DIR, mode: str = "replay", strict: bool = False):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {CASSETTE_MODES}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.strict = strict
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        """Build a cassette from AGENT_CASSETTE_* variables, or None when not configured."""
+        mode = os.getenv("AGENT_CASSETTE_MODE")
+        if not mode:
+            return None
+        return cls(
+            directory=os.getenv("AGENT_CASSETTE_DIR", DEFAULT_CASSETTE_DIR),
+            mode=mode,
+            strict=os.getenv("AGENT_CASSETTE_STRICT", "").lower() in ("1", "true", "yes"),
+        )
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _path(self, kind: str, key: str) -> Path:
+        return self.directory / kind / f"{key}.json"
+
+    def lookup(self, kind: str, request: Any) -> Optional[Dict[str, Any]]:
+        """
+        Return the recorded response for a request, or None if it must go live.
+
+        Args:
+            kind: Interaction kind, e.g. "completion", "tool_call", "list_tools"
+            request: JSON-serializable request payload
+
+        Returns:
+            The stored response payload, or None on a miss / in record mode
+        """
+        if not self.replaying:
+            return None
+
+        path = self._path(kind, content_hash({"kind": kind, "request": request}))
+        if path.exists():
+            self.hits += 1
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["response"]
+
+        self.misses += 1
+        if self.strict:
+            raise CassetteMiss(f"No recorded {kind} for request hash {path.stem}")
+        return None
+
+    def record(self, kind: str, request: Any, response: Any) -> None:
+        """Store a live response so later replays can serve it."""
+        path = self._path(kind, content_hash({"kind": kind, "request": request}))
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file first so concurrent readers never see a partial cassette
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"kind": kind, "request": to_jsonable(request), "response": to_jsonable(response)},
+                f,
+                indent=2,
+                default=str,
+            )
+        os.replace(tmp_path, path)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
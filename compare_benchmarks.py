@@ -0,0 +1,258 @@
+"""
+Performance regression gate comparing two benchmark runs.
+
+Diffs the JSON artifacts written by run_benchmark.py (latency percentiles,
+tokens, iterations and tool calls, overall and per case) and flags
+statistically significant regressions:
+
+- per case: one-sided Mann-Whitney U test on the latency samples of each
+  run (needs --repeat >= 3 in both runs), plus mean increase in tokens,
+  iterations and tool calls
+- overall: one-sided Wilcoxon signed-rank test on per-case median latency,
+  paired by case
+
+A metric is a regression when the change is significant (p < --alpha) and
+larger than --threshold. Changes larger than --threshold that can't be
+tested (too few samples, e.g. --repeat 1) are reported as "insufficient
+samples" instead. Errors are gated too: a higher error rate than the
+baseline (overall or per case), a baseline case missing from the candidate
+and a case whose candidate samples all errored are regressions. The exit
+status is 1 when regressions are found.
+
+Usage:
+    python compare_benchmarks.py benchmarks/baseline.json benchmarks/candidate.json
+    python compare_benchmarks.py base.json cand.json --alpha 0.01 --threshold 0.05 --all-cases
+"""
+
+import argparse
+import json
+import math
+import sys
+from typing import Any, Dict, List, Optional
+
+from benchmark_stats import mann_whitney_greater, percentile, wilcoxon_greater
+
+
+COUNT_METRICS = ("tokens", "iterations", "tool_calls")
+
+
+def _relative_change(baseline: Optional[float], candidate: Optional[float]) -> Optional[float]:
+    if baseline is None or candidate is None:
+        return None
+    if baseline == 0:
+        return 0.0 if candidate == 0 else math.inf
+    return (candidate - baseline) / baseline
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+# Samples per side needed before a constant count shift counts as significant
+MIN_CONSTANT_SAMPLES = 2
+
+
+# ============================================================================
+# COMPARISON
+# ============================================================================
+
+def load_run(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _samples_by_case(run: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """All samples of each case, errored ones included."""
+    cases: Dict[str, List[Dict[str, Any]]] = {}
+    for sample in run["samples"]:
+        cases.setdefault(sample["case"], []).append(sample)
+    return cases
+
+
+def _successful(samples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [s for s in samples if s.get("error") is None]
+
+
+def _error_rate(samples: List[Dict[str, Any]]) -> Optional[float]:
+    return (len(samples) - len(_successful(samples))) / len(samples) if samples else None
+
+
+def _metric_values(samples: List[Dict[str, Any]], metric: str) -> List[float]:
+    if metric == "tokens":
+        return [s["prompt_tokens"] + s["completion_tokens"] for s in samples]
+    return [s[metric] for s in samples]
+
+
+def compare_cases(
+    baseline: Dict[str, Any],
+    candidate: Dict[str, Any],
+    alpha: float,
+    threshold: float,
+) -> List[Dict[str, Any]]:
+    """Per-case drilldown for every case of the baseline run."""
+    base_cases = _samples_by_case(baseline)
+    cand_cases = _samples_by_case(candidate)
+
+    rows = []
+    for case in sorted(base_cases):
+        base_all, cand_all = base_cases[case], cand_cases.get(case, [])
+        # Metrics are compared over the successful samples only
+        base, cand = _successful(base_all), _successful(cand_all)
+        base_latency = _metric_values(base, "latency_ms")
+        cand_latency = _metric_values(cand, "latency_ms")
+
+        row = {
+            "case": case,
+            "samples": (len(base), len(cand)),
+            "errors": (len(base_all) - len(base), len(cand_all) - len(cand)),
+            "latency_p50": (percentile(base_latency, 50), percentile(cand_latency, 50)),
+            "latency_change": _relative_change(percentile(base_latency, 50), percentile(cand_latency, 50)),
+            "latency_p_value": mann_whitney_greater(base_latency, cand_latency),
+            "regressions": [],
+            "insufficient": [],
+        }
+        if not cand_all:
+            row["regressions"].append("missing")
+        elif not cand or _error_rate(cand_all) > _error_rate(base_all):
+            row["regressions"].append("errors")
+
+        if row["latency_change"] is not None and row["latency_change"] > threshold:
+            if row["latency_p_value"] is None:
+                row["insufficient"].append("latency")
+            elif row["latency_p_value"] < alpha:
+                row["regressions"].append("latency")
+
+        for metric in COUNT_METRICS:
+            base_values, cand_values = _metric_values(base, metric), _metric_values(cand, metric)
+            change = _relative_change(_mean(base_values), _mean(cand_values))
+            row[metric] = (_mean(base_values), _mean(cand_values))
+            row[f"{metric}_change"] = change
+            if change is None or change <= threshold:
+                continue
+            # Counts are (nearly) deterministic, so a shift that is constant over
+            # repeated samples is significant on its own; with spread we require
+            # the rank test as for latency. A single sample per side proves neither.
+            p_value = mann_whitney_greater(base_values, cand_values)
+            constant = (
+                min(len(base_values), len(cand_values)) >= MIN_CONSTANT_SAMPLES
+                and len(set(base_values)) == 1 and len(set(cand_values)) == 1
+            )
+            if constant or (p_value is not None and p_value < alpha):
+                row["regressions"].append(metric)
+            elif p_value is None:
+                row["insufficient"].append(metric)
+
+        rows.append(row)
+    return rows
+
+
+def compare_overall(
+    baseline: Dict[str, Any],
+    candidate: Dict[str, Any],
+    rows: List[Dict[str, Any]],
+    alpha: float,
+    threshold: float,
+) -> Dict[str, Any]:
+    """Summary-level diff plus a paired test over per-case median latency."""
+    base_summary, cand_summary = baseline["summary"], candidate["summary"]
+    metrics = {}
+    for name in ("p50", "p95", "p99"):
+        b, c = base_summary["latency_ms"][name], cand_summary["latency_ms"][name]
+        metrics[f"latency_{name}"] = (b, c, _relative_change(b, c))
+    for name in ("tokens_per_query", "iterations_per_query", "tool_calls_per_query", "queries_per_second"):
+        b, c = base_summary.get(name), cand_summary.get(name)
+        metrics[name] = (b, c, _relative_change(b, c))
+
+    p_value = wilcoxon_greater([row["latency_p50"] for row in rows if None not in row["latency_p50"]])
+    latency_change = metrics["latency_p50"][2]
+    error_rates = (_error_rate(baseline["samples"]), _error_rate(candidate["samples"]))
+    return {
+        "metrics": metrics,
+        "latency_p_value": p_value,
+        "latency_regression": p_value is not None and p_value < alpha
+                              and latency_change is not None and latency_change > threshold,
+        "errors": (base_summary["errors"], cand_summary["errors"]),
+        "error_rates": error_rates,
+        # A run without samples failed as a whole
+        "error_regression": error_rates[1] is None or (error_rates[0] or 0.0) < error_rates[1],
+    }
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def _fmt(value: Optional[float], digits: int = 1) -> str:
+    return "n/a" if value is None else f"{value:.{digits}f}"
+
+
+def _fmt_change(change: Optional[float]) -> str:
+    if change is None:
+        return "n/a"
+    if math.isinf(change):
+        return "+inf"
+    return f"{change * 100:+.1f}%"
+
+
+def print_report(overall: Dict[str, Any], rows: List[Dict[str, Any]], all_cases: bool) -> None:
+    print("\n[Overall]:")
+    for name, (b, c, change) in overall["metrics"].items():
+        print(f"   {name:<24} {_fmt(b):>10} -> {_fmt(c):>10}  ({_fmt_change(change)})")
+    print(f"   errors                   {overall['errors'][0]:>10} -> {overall['errors'][1]:>10}"
+          f"{'  <-- REGRESSION' if overall['error_regression'] else ''}")
+    print(f"   paired latency test p = {_fmt(overall['latency_p_value'], 4)}"
+          f"{'  <-- REGRESSION' if overall['latency_regression'] else ''}")
+
+    shown = rows if all_cases else [row for row in rows if row["regressions"] or row["insufficient"]]
+    print(f"\n[Cases]: {len(rows)} compared, {sum(1 for row in rows if row['regressions'])} regressed, "
+          f"{sum(1 for row in rows if row['insufficient'] and not row['regressions'])} with insufficient samples")
+    for row in shown:
+        flag = f"  <-- {', '.join(row['regressions'])}" if row["regressions"] else ""
+        if row["insufficient"]:
+            flag += f"  (insufficient samples: {', '.join(row['insufficient'])})"
+        print(f"   {row['case']}{flag}")
+        print(f"      latency p50 {_fmt(row['latency_p50'][0])} -> {_fmt(row['latency_p50'][1])} ms "
+              f"({_fmt_change(row['latency_change'])}, p = {_fmt(row['latency_p_value'], 4)}, "
+              f"n = {row['samples'][0]}/{row['samples'][1]})")
+        if any(row["errors"]):
+            print(f"      errors     {row['errors'][0]} -> {row['errors'][1]}")
+        for metric in COUNT_METRICS:
+            b, c = row[metric]
+            print(f"      {metric:<10} {_fmt(b)} -> {_fmt(c)} ({_fmt_change(row[f'{metric}_change'])})")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", help="Benchmark JSON of the reference run")
+    parser.add_argument("candidate", help="Benchmark JSON of the run under test")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Minimum relative increase to flag")
+    parser.add_argument("--all-cases", action="store_true", help="Show every case, not only regressions")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    baseline, candidate = load_run(args.baseline), load_run(args.candidate)
+
+    print("=" * 80)
+    print("MongoDB AI Agent Benchmark Comparison")
+    print("=" * 80)
+    for label, run, path in (("Baseline", baseline, args.baseline), ("Candidate", candidate, args.candidate)):
+        meta = run.get("metadata", {})
+        print(f"{label:<10} {path} (commit {meta.get('git_commit')}, backend {meta.get('backend')}, "
+              f"concurrency {meta.get('concurrency')}, repeat {meta.get('repeat')})")
+
+    rows = compare_cases(baseline, candidate, args.alpha, args.threshold)
+    overall = compare_overall(baseline, candidate, rows, args.alpha, args.threshold)
+    print_report(overall, rows, args.all_cases)
+
+    regressed = (
+        overall["latency_regression"] or overall["error_regression"] or any(row["regressions"] for row in rows)
+    )
+    print(f"\n{'[FAIL] Performance regression detected' if regressed else '[OK] No significant regression'}")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+LLM judge with a persistent verdict cache.
+
+LLMJudge calls the judge model for every case on every run, even when the
+output being judged hasn't changed. CachedJudge takes the same arguments,
+but stores each verdict on disk keyed by a hash of everything the judge
+sees (rubric, model, input, output, expected output), so a re-run only
+re-judges cases whose outputs changed.
+
+Layout on disk:
+    <directory>/<sha256>.json   with {"request": ..., "verdict": {name: {"value": ..., "reason": ...}}}
+
+Configure from the environment with:
+    EVAL_JUDGE_CACHE_DIR=.judge_cache
+    EVAL_JUDGE_CACHE=0                 # judge every case live
+"""
+
+import json
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pydantic_evals.evaluators import EvaluationReason, Evaluator, EvaluatorContext, LLMJudge
+
+# Add parent directory to path to import the agent's modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cassette import content_hash, to_jsonable
+
+
+DEFAULT_JUDGE_CACHE_DIR = ".judge_cache"
+
+
+class JudgeCache:
+    """Content-addressed store of judge verdicts."""
+
+    def __init__(self, directory: str = DEFAULT_JUDGE_CACHE_DIR, enabled: bool = True):
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "JudgeCache":
+        return cls(
+            directory=os.getenv("EVAL_JUDGE_CACHE_DIR", DEFAULT_JUDGE_CACHE_DIR),
+            enabled=os.getenv("EVAL_JUDGE_CACHE", "1").lower() not in ("0", "false", "no"),
+        )
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def lookup(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Stored verdict for a judge request, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(content_hash(request))
+        if path.exists():
+            self.hits += 1
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["verdict"]
+        self.misses += 1
+        return None
+
+    def record(self, request: Dict[str, Any], verdict: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        path = self._path(content_hash(request))
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file first so concurrent readers never see a partial verdict
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"request": to_jsonable(request), "verdict": verdict}, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# Shared by every CachedJudge of the process, so its stats cover the whole run
+judge_cache = JudgeCache.from_env()
+
+
+def _to_verdict(output: Any) -> Dict[str, Dict[str, Any]]:
+    """JSON form of an LLMJudge output mapping."""
+    return {
+        name: {"value": getattr(result, "value", result), "reason": getattr(result, "reason", None)}
+        for name, result in output.items()
+    }
+
+
+@dataclass
+class CachedJudge(Evaluator[object, object]):
+    """LLMJudge whose verdicts are cached on disk (see JudgeCache)."""
+
+    rubric: str
+    model: str = "openai:gpt-4o"
+    include_input: bool = False
+    include_expected_output: bool = False
+
+    async def evaluate(self, ctx: EvaluatorContext[object, object]) -> Dict[str, EvaluationReason]:
+        # Only what the judge actually sees is part of the key
+        request = {
+            "rubric": self.rubric,
+            "model": self.model,
+            "input": ctx.inputs if self.include_input else None,
+            "output": ctx.output,
+            "expected_output": ctx.expected_output if self.include_expected_output else None,
+        }
+        verdict = judge_cache.lookup(request)
+        if verdict is None:
+            judge = LLMJudge(
+                rubric=self.rubric,
+                model=self.model,
+                include_input=self.include_input,
+                include_expected_output=self.include_expected_output,
+            )
+            verdict = _to_verdict(await judge.evaluate(ctx))
+            judge_cache.record(request, verdict)
+        return {name: EvaluationReason(value=result["value"], reason=result["reason"]) for name, result in verdict.items()}
@@ -19,8 +19,11 @@ from typing import List, Dict, Any
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from pydantic_evals import Case, Dataset
-from pydantic_evals.evaluators import Evaluator, EvaluatorContext, LLMJudge
-from mongodb_agent import MongoDBAgent
+from pydantic_evals.evaluators import Evaluator, EvaluatorContext
+from agent_registry import get_agent
+from execution_evaluator import ExecutionEvaluator, fixture_configured
+from filter_canonicalizer import FilterEquivalenceEvaluator
+from cached_judge import CachedJudge
 
 today = "2025-10-09"
 
@@ -428,23 +431,28 @@ class DatasetBuilder:
         ]
     
     def build(self) -> Dataset:
-        return Dataset(cases=self.cases, evaluators=[
-            LLMJudge(
-                rubric="Output and Expected Output's find query and filter should be equivalent and include the same values. Formating of dates, can be different, but only dates",
-                model="openai:gpt-4o",
-                include_input=True,
-            ),
-            LLMJudge(
+        evaluators = [
+            # Decided locally from canonical filters; the LLM judge is only asked when ambiguous
+            FilterEquivalenceEvaluator(today=self.today.strftime("%Y-%m-%d")),
+            CachedJudge(
                 rubric="The obtained_data of the find query should be equivalent to the expected_output' obtained_data of the find query. Both should return the same documents, no less, no more. Only thing that can differ is formating. The format of the dates can be different, but only dates",
                 model="openai:gpt-4o",
                 include_input=True,
             )
-        ])
+        ]
+        if fixture_configured():
+            # Exact check of "returns the same documents" (see execution_evaluator.py)
+            evaluators.append(ExecutionEvaluator(today=self.today.strftime("%Y-%m-%d")))
+        return Dataset(cases=self.cases, evaluators=evaluators)
 
 
 # Create dataset with conversation-based evaluator
 dataset = DatasetBuilder(today=today).build()
 
+# Options of every evaluated agent.query() call, part of the stored results'
+# fingerprint: the whole conversation is judged, so the agent runs to its final answer
+QUERY_OPTIONS: Dict[str, Any] = {}
+
 # Wrapper function for evaluation
 def ai_mongo_conversation(user_query: Dict[str, Any]) -> dict:
     """
@@ -455,12 +463,23 @@ def ai_mongo_conversation(user_query: Dict[str, Any]) -> dict:
     # Add more queries to the agent
     # Add expected output of find mongodb queries - separate llm judge
 
-    agent = MongoDBAgent()
-    result = agent.query_sync(user_query)
+    agent = get_agent()
+    result = agent.query_sync(user_query, **QUERY_OPTIONS)
 
     # print('user_query', user_query)
     # print('\n\nresult: \n', result)
     
+    # Timing/usage traces are exported by the agent's sinks, not judged
+    result.pop("trace", None)
+    return result
+
+async def ai_mongo_conversation_async(user_query: Dict[str, Any]) -> dict:
+    """
+    Async variant of ai_mongo_conversation for concurrent evaluation.
+    All cases share one MongoDBAgent and its MCP session pool.
+    """
+    result = await get_agent().query(user_query, **QUERY_OPTIONS)
+    result.pop("trace", None)
     return result
 
 
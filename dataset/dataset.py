@@ -7,7 +7,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from pydantic_evals import Case, Dataset
 from pydantic_evals.evaluators import Evaluator, EvaluatorContext
-from mongodb_agent import MongoDBAgent
+from agent_registry import get_agent
+from execution_evaluator import ExecutionEvaluator, fixture_configured
 
 today = "2025-10-09"
 
@@ -561,7 +562,16 @@ class MongoQueryEvaluator(Evaluator[dict, dict]):
         matched, total = self._compare(ctx.expected_output, ctx.output)
         return matched / total if total > 0 else 0.0
 
-dataset = Dataset(cases=cases, evaluators=[MongoQueryEvaluator()])
+evaluators = [MongoQueryEvaluator()]
+if fixture_configured():
+    # Also check that the generated query returns the same documents (see execution_evaluator.py)
+    evaluators.append(ExecutionEvaluator(today=today))
+
+dataset = Dataset(cases=cases, evaluators=evaluators)
+
+# Options of every evaluated agent.query() call, part of the stored results'
+# fingerprint: only collection/filter are evaluated, so stop as soon as the query has run
+QUERY_OPTIONS = {"stop_mode": "query_only"}
 
 # Create AI function wrapper for pydantic_evals
 def ai_mongo_query(user_query: str) -> dict:
@@ -569,8 +579,19 @@ def ai_mongo_query(user_query: str) -> dict:
     AI function that can be used with pydantic_evals.
     Takes a natural language query and returns MongoDB query structure.
     """
-    agent = MongoDBAgent()
-    result = agent.query_sync(user_query)
+    agent = get_agent()
+    result = agent.query_sync(user_query, **QUERY_OPTIONS)
+    return {
+        "collection": result.get("collection"),
+        "filter": result.get("filter")
+    }
+
+async def ai_mongo_query_async(user_query: str) -> dict:
+    """
+    Async variant of ai_mongo_query for concurrent evaluation.
+    All cases share one MongoDBAgent and its MCP session pool.
+    """
+    result = await get_agent().query(user_query, **QUERY_OPTIONS)
     return {
         "collection": result.get("collection"),
         "filter": result.get("filter")
@@ -0,0 +1,384 @@
+"""
+Execution-based evaluation of generated MongoDB queries.
+
+Instead of comparing filters structurally (MongoQueryEvaluator) or asking an
+LLM judge, the expected and the generated query are both run against a
+local fixture database and the sets of returned `_id`s are compared: two
+queries are equivalent when they return the same documents, however they
+are written. Results are cached by a hash of the canonical query, so every
+distinct query runs once per process.
+
+Cases the fixture can't decide are reported as inconclusive (the
+"execution" label) rather than scored: when the expected query returns no
+documents, or when the fixture's events don't reach back to the start of
+the expected query's date window (e.g. a snapshot of this week's events for
+cases dated 2025-10-09). Snapshot the dataset's period with --until.
+
+Fixture (the first configured one is used):
+    EVAL_FIXTURE_URI=mongodb://localhost:27017/fixture   local mongod seeded from a snapshot
+    EVAL_FIXTURE_SNAPSHOT=fixtures/events.jsonl          snapshot loaded into mongomock
+                                                         (pip install mongomock)
+
+Snapshots are relaxed EJSON, one document per line:
+    python dataset/execution_evaluator.py snapshot fixtures/events.jsonl --limit 20000 --until 2025-10-10
+    python dataset/execution_evaluator.py seed fixtures/events.jsonl mongodb://localhost:27017/fixture
+
+Expected outputs of the datasets use some shorthand that is resolved before
+running them: ObjectId('...') / ISODate('...') strings, date placeholders
+such as "today_start" or "<yesterday - start of day>" (relative to the
+case's today date) and plain 24-hex strings for `_id` / `...Id` fields.
+Generated queries are run exactly as the agent sent them (relaxed EJSON).
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from pydantic_evals.evaluators import Evaluator, EvaluatorContext
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+
+FIXTURE_DATABASE = "fixture"
+FIXTURE_COLLECTION = "events"
+
+_SHELL_CALL = re.compile(r"""^(ObjectId|ISODate)\(\s*['"](.+)['"]\s*\)$""")
+_OBJECT_ID = re.compile(r"^[0-9a-fA-F]{24}$")
+_TODAY_IN_TEXT = re.compile(r"today is (\d{4}-\d{2}-\d{2})")
+
+
+# ============================================================================
+# EXPECTED QUERY SHORTHAND
+# ============================================================================
+
+def _date_placeholders(today: datetime.datetime) -> Dict[str, datetime.datetime]:
+    """Placeholder -> datetime for the date placeholders used by the datasets (ends are exclusive)."""
+    day = datetime.timedelta(days=1)
+    week_start = today - datetime.timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    last_month_start = (month_start - day).replace(day=1)
+    values = {
+        "today_start": today,
+        "today_end": today + day,
+        "yesterday_start": today - day,
+        "yesterday_end": today,
+        "week_start": week_start,
+        "week_end": week_start + 7 * day,
+        "last_week_start": week_start - 7 * day,
+        "last_week_end": week_start,
+        "month_start": month_start,
+        "last_month_start": last_month_start,
+        "last_month_end": month_start,
+    }
+    # Spelling used by conversation_dataset.py
+    values.update({
+        "<today - start of day>": values["today_start"],
+        "<today - end of day>": values["today_end"],
+        "<yesterday - start of day>": values["yesterday_start"],
+        "<yesterday - end of day>": values["yesterday_end"],
+        "<week - start of week (monday)>": values["week_start"],
+        "<week - end of week (sunday)>": values["week_end"],
+    })
+    return values
+
+
+def parse_date(value: str) -> datetime.datetime:
+    """Naive UTC datetime of an ISO date string (UTC unless an offset is given)."""
+    parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _resolve(value: Any, placeholders: Dict[str, datetime.datetime], field: Optional[str]) -> Any:
+    # Operators ($gte, $in, ...) take the field of the key they are under
+    if isinstance(value, dict):
+        if set(value) == {"$date"} and value["$date"] in placeholders:
+            return placeholders[value["$date"]]
+        if len(value) == 1 and next(iter(value)) in ("$oid", "$date"):
+            return json_util.loads(json.dumps(value))
+        return {
+            key: _resolve(item, placeholders, field if key.startswith("$") else key)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_resolve(item, placeholders, field) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    call = _SHELL_CALL.match(value)
+    if call:
+        return ObjectId(call.group(2)) if call.group(1) == "ObjectId" else parse_date(call.group(2))
+    if value in placeholders:
+        return placeholders[value]
+    if field and (field == "_id" or field.endswith("Id")) and _OBJECT_ID.match(value):
+        return ObjectId(value)
+    return value
+
+
+def resolve_shorthand(query_filter: Any, today: datetime.datetime) -> Any:
+    """
+    Turn an expected filter written in the datasets' shorthand into a BSON query.
+
+    Args:
+        query_filter: Expected filter
+        today: Start of the case's today date
+
+    Returns:
+        The filter with ObjectIds and datetimes in place of their shorthand
+    """
+    return _resolve(query_filter, _date_placeholders(today), None)
+
+
+def case_today(inputs: Any, default: str) -> datetime.datetime:
+    """Today's date of a case: its today_date input, a "(today is ...)" in the text, or default."""
+    if isinstance(inputs, dict) and inputs.get("today_date"):
+        text_date = inputs["today_date"]
+    else:
+        found = _TODAY_IN_TEXT.search(inputs if isinstance(inputs, str) else "")
+        text_date = found.group(1) if found else default
+    return datetime.datetime.strptime(text_date, "%Y-%m-%d")
+
+
+def expected_query(expected_output: Dict[str, Any]) -> Tuple[Optional[str], Any]:
+    """(collection, filter) of an expected output of dataset.py or conversation_dataset.py."""
+    if "conversation" not in expected_output:
+        return expected_output.get("collection"), expected_output.get("filter")
+
+    collection, query_filter = None, None
+    for step in expected_output["conversation"]:
+        if step.get("role") == "tool_call" and step.get("tool") == "find":
+            collection = step["arguments"].get("collection")
+            query_filter = step["arguments"].get("filter")
+    return collection, query_filter
+
+
+# ============================================================================
+# FIXTURE
+# ============================================================================
+
+def filter_dates(value: Any) -> List[datetime.datetime]:
+    """Every datetime in a resolved filter."""
+    if isinstance(value, datetime.datetime):
+        return [value]
+    if isinstance(value, dict):
+        return [date for item in value.values() for date in filter_dates(item)]
+    if isinstance(value, list):
+        return [date for item in value for date in filter_dates(item)]
+    return []
+
+
+def query_hash(collection: str, query: Dict[str, Any]) -> str:
+    """Hash of a query in canonical form (BSON types resolved, keys sorted)."""
+    canonical = json_util.dumps({"collection": collection, "filter": query}, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def fixture_configured() -> bool:
+    return bool(os.getenv("EVAL_FIXTURE_URI") or os.getenv("EVAL_FIXTURE_SNAPSHOT"))
+
+
+def read_snapshot(path: str):
+    """Documents of a relaxed EJSON snapshot, one per line."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json_util.loads(line)
+
+
+class FixtureDatabase:
+    """Runs queries on the fixture and caches the returned _id sets by query hash."""
+
+    def __init__(self, database):
+        self._database = database
+        self._results: Dict[str, Optional[FrozenSet[Any]]] = {}
+        self._date_ranges: Dict[str, Optional[Tuple[datetime.datetime, datetime.datetime]]] = {}
+        # mongomock is not thread-safe and sync evaluators may run in threads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "FixtureDatabase":
+        """
+        Open the fixture configured by EVAL_FIXTURE_URI or EVAL_FIXTURE_SNAPSHOT.
+
+        Raises:
+            ValueError: Neither is set
+        """
+        uri = os.getenv("EVAL_FIXTURE_URI")
+        if uri:
+            client = MongoClient(uri)
+            database = client.get_default_database(FIXTURE_DATABASE)
+            return cls(database)
+
+        snapshot = os.getenv("EVAL_FIXTURE_SNAPSHOT")
+        if not snapshot:
+            raise ValueError("Set EVAL_FIXTURE_URI or EVAL_FIXTURE_SNAPSHOT to evaluate by execution")
+        import mongomock
+        database = mongomock.MongoClient()[FIXTURE_DATABASE]
+        documents = list(read_snapshot(snapshot))
+        if documents:
+            database[FIXTURE_COLLECTION].insert_many(documents)
+        print(f"Loaded {len(documents)} fixture documents from {snapshot} into mongomock")
+        return cls(database)
+
+    def ids(self, collection: str, query: Dict[str, Any]) -> Optional[FrozenSet[Any]]:
+        """_ids of the documents a filter returns, or None if the query fails."""
+        key = query_hash(collection, query)
+        with self._lock:
+            if key in self._results:
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+            try:
+                ids = frozenset(doc["_id"] for doc in self._database[collection].find(query, {"_id": 1}))
+            except (PyMongoError, TypeError, ValueError) as e:
+                print(f"Fixture query failed on {collection}: {e}")
+                ids = None
+            self._results[key] = ids
+            return ids
+
+    def date_range(self, collection: str) -> Optional[Tuple[datetime.datetime, datetime.datetime]]:
+        """(oldest, newest) event date in a fixture collection, or None when it has no dates."""
+        with self._lock:
+            if collection not in self._date_ranges:
+                dated = {"date": {"$type": "date"}}
+                oldest = self._database[collection].find_one(dated, {"date": 1}, sort=[("date", 1)])
+                newest = self._database[collection].find_one(dated, {"date": 1}, sort=[("date", -1)])
+                self._date_ranges[collection] = (oldest["date"], newest["date"]) if oldest and newest else None
+            return self._date_ranges[collection]
+
+    def covers(self, collection: str, query: Dict[str, Any]) -> bool:
+        """True when the fixture's events span the day the query's date window starts."""
+        dates = filter_dates(query)
+        if not dates:
+            return True
+        date_range = self.date_range(collection)
+        # Day precision: a day's first event is rarely at midnight
+        return date_range is not None and date_range[0].date() <= min(dates).date() <= date_range[1].date()
+
+    def stats(self) -> Dict[str, int]:
+        return {"queries": len(self._results), "hits": self.hits, "misses": self.misses}
+
+
+_fixture: Optional[FixtureDatabase] = None
+_fixture_lock = threading.Lock()
+
+
+def get_fixture() -> FixtureDatabase:
+    """The process-wide fixture, opened on first use."""
+    global _fixture
+    with _fixture_lock:
+        if _fixture is None:
+            _fixture = FixtureDatabase.from_env()
+        return _fixture
+
+
+# ============================================================================
+# EVALUATOR
+# ============================================================================
+
+@dataclass
+class ExecutionEvaluator(Evaluator[object, dict]):
+    """
+    Runs the expected and generated queries on the fixture and compares the returned _id sets.
+
+    The "execution" label tells how the case was decided: compared, failed,
+    or inconclusive (no_expected_documents / fixture_outside_window), in which
+    case same_documents and documents_jaccard are not reported.
+    """
+
+    today: str = "2025-10-09"
+
+    def evaluate(self, ctx: EvaluatorContext[object, dict]) -> Dict[str, Any]:
+        collection, query_filter = expected_query(ctx.expected_output or {})
+        output = ctx.output or {}
+        if not collection or not output.get("collection"):
+            return {"same_documents": False, "documents_jaccard": 0.0, "execution": "failed"}
+
+        fixture = get_fixture()
+        expected_filter = resolve_shorthand(query_filter or {}, case_today(ctx.inputs, self.today))
+        if not fixture.covers(collection, expected_filter):
+            # Any filter would "match" the documents the fixture doesn't have
+            return {"execution": "fixture_outside_window"}
+        expected_ids = fixture.ids(collection, expected_filter)
+        try:
+            actual_filter = json_util.loads(json.dumps(output.get("filter") or {}))
+        except (TypeError, ValueError):
+            actual_filter = None
+        actual_ids = fixture.ids(output["collection"], actual_filter) if actual_filter is not None else None
+
+        if expected_ids is None or actual_ids is None:
+            return {"same_documents": False, "documents_jaccard": 0.0, "execution": "failed"}
+        if not expected_ids:
+            # A wrong filter that matches nothing would look correct
+            return {"execution": "no_expected_documents"}
+        jaccard = len(expected_ids & actual_ids) / len(expected_ids | actual_ids)
+        return {"same_documents": expected_ids == actual_ids, "documents_jaccard": jaccard, "execution": "compared"}
+
+
+# ============================================================================
+# SNAPSHOTS
+# ============================================================================
+
+def snapshot(path: str, limit: int, until: Optional[str] = None) -> None:
+    """Export the newest events (before until, an ISO date) of the configured database to a snapshot file."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    client = MongoClient(os.environ["MDB_MCP_CONNECTION_STRING"])
+    try:
+        events = client[os.environ["MDB_MCP_DATABASE"]][FIXTURE_COLLECTION]
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            query_filter = {"date": {"$lt": parse_date(until)}} if until else {}
+            for document in events.find(query_filter).sort("date", -1).limit(limit):
+                f.write(json_util.dumps(document, json_options=RELAXED_JSON_OPTIONS) + "\n")
+                count += 1
+        print(f"✓ Wrote {count} documents to {path}")
+    finally:
+        client.close()
+
+
+def seed(path: str, uri: str) -> None:
+    """Replace the fixture collection of a local mongod with a snapshot."""
+    client = MongoClient(uri)
+    try:
+        events = client.get_default_database(FIXTURE_DATABASE)[FIXTURE_COLLECTION]
+        events.drop()
+        documents = list(read_snapshot(path))
+        if documents:
+            events.insert_many(documents)
+        print(f"✓ Seeded {len(documents)} documents into {events.full_name}")
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("snapshot", help="Export events from MDB_MCP_CONNECTION_STRING/MDB_MCP_DATABASE")
+    export.add_argument("path")
+    export.add_argument("--limit", type=int, default=20000, help="Newest events to export")
+    export.add_argument("--until", help="Only events before this ISO date, e.g. the day after the dataset's today")
+    load = commands.add_parser("seed", help="Load a snapshot into a local mongod")
+    load.add_argument("path")
+    load.add_argument("uri", help="e.g. mongodb://localhost:27017/fixture")
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        snapshot(args.path, args.limit, args.until)
+    else:
+        seed(args.path, args.uri)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Deterministic equivalence of MongoDB filters.
+
+Generated and expected filters often differ only in formatting:
+ObjectId('...') vs {"$oid": ...}, ISODate(...) vs {"$date": ...} vs ISO
+strings, the order of $in values or $or branches, or ranges split over an
+$and. canonicalize() rewrites a filter into one normal form so that such
+filters compare equal:
+- ObjectIds (shell, EJSON or 24-hex strings on _id/...Id fields) -> {"$oid": "<lowercase hex>"}
+- dates (shell, EJSON, placeholders, ISO strings on date fields) -> {"$date": "<UTC ISO, ms>"}
+- {"$eq": v} and single-value {"$in": [v]} -> v
+- $in/$nin/$all values and $or/$nor branches sorted and deduplicated
+- nested $and flattened and folded into the filter (ranges on one field merged)
+
+FilterEquivalenceEvaluator judges most cases locally with it and only asks
+an LLM judge when the canonical filters differ in a way that may still be
+equivalent (regexes, $or/$expr and other operators, or different range
+bounds on the same fields).
+"""
+
+import datetime
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pydantic_evals.evaluators import EvaluationReason, Evaluator, EvaluatorContext
+
+# Add parent directory to path to import the agent's modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cached_judge import CachedJudge
+from execution_evaluator import case_today, expected_query, parse_date, resolve_shorthand
+from query_planner import DATE_FIELDS
+
+
+_SORTED_ARRAY_OPERATORS = {"$in", "$nin", "$all"}
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+# Operators whose semantics the canonical form can't compare: differences
+# involving them go to the LLM judge
+_OPAQUE_OPERATORS = {
+    "$regex", "$options", "$expr", "$where", "$text", "$elemMatch", "$not", "$exists",
+    "$or", "$nor", "$and", "$type", "$size", "$all", "$mod",
+}
+
+
+# ============================================================================
+# CANONICAL FORM
+# ============================================================================
+
+def _sort_key(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _canonical_value(value: Any, field: Optional[str]) -> Any:
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value).lower()}
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return {"$date": value.isoformat(timespec="milliseconds") + "Z"}
+    if isinstance(value, str) and field in DATE_FIELDS:
+        try:
+            return _canonical_value(parse_date(value), field)
+        except ValueError:
+            return value
+    if isinstance(value, list):
+        return [_canonical_value(item, field) for item in value]
+    if isinstance(value, dict):
+        return {key: _canonical_value(item, key) for key, item in value.items()}
+    return value
+
+
+def _canonical_condition(field: str, condition: Any) -> Any:
+    """Canonical condition on a field: a value, or a dict of operators."""
+    if not (isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition)):
+        return _canonical_value(condition, field)
+
+    operators = {}
+    for op, operand in condition.items():
+        if op in _SORTED_ARRAY_OPERATORS and isinstance(operand, list):
+            values = {_sort_key(v): v for v in (_canonical_value(item, field) for item in operand)}
+            operand = [values[key] for key in sorted(values)]
+            if op == "$in" and len(operand) == 1:
+                op, operand = "$eq", operand[0]
+        elif op == "$not":
+            operand = _canonical_condition(field, operand)
+        elif op == "$elemMatch" and isinstance(operand, dict):
+            operand = canonical_filter(operand)
+        else:
+            operand = _canonical_value(operand, field)
+        operators[op] = operand
+
+    if set(operators) == {"$eq"}:
+        return operators["$eq"]
+    return operators
+
+
+def _merge_clauses(clauses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """AND of clauses as one filter; clauses that can't be merged stay under $and."""
+    merged: Dict[str, Any] = {}
+    leftovers = []
+    for clause in clauses:
+        for key, condition in clause.items():
+            if key not in merged:
+                merged[key] = condition
+                continue
+            current = merged[key]
+            both_operators = (
+                isinstance(current, dict) and isinstance(condition, dict)
+                and all(op.startswith("$") for op in list(current) + list(condition))
+            )
+            if both_operators and not set(current) & set(condition):
+                # e.g. {"date": {"$gte": a}} AND {"date": {"$lt": b}}
+                merged[key] = {**current, **condition}
+            elif current != condition:
+                leftovers.append({key: condition})
+    if leftovers:
+        leftovers.sort(key=_sort_key)
+        merged["$and"] = leftovers
+    return merged
+
+
+def canonical_filter(query_filter: Dict[str, Any]) -> Dict[str, Any]:
+    """Canonical form of a filter whose values are already BSON (see canonicalize)."""
+    clauses: List[Dict[str, Any]] = []
+    for key, condition in query_filter.items():
+        if key == "$and" and isinstance(condition, list):
+            clauses += [canonical_filter(branch) for branch in condition if isinstance(branch, dict)]
+        elif key in ("$or", "$nor") and isinstance(condition, list):
+            branches = {_sort_key(b): b for b in (canonical_filter(b) for b in condition if isinstance(b, dict))}
+            if key == "$or" and len(branches) == 1:
+                clauses.append(next(iter(branches.values())))
+            else:
+                clauses.append({key: [branches[k] for k in sorted(branches)]})
+        elif key.startswith("$"):
+            clauses.append({key: _canonical_value(condition, None)})
+        else:
+            clauses.append({key: _canonical_condition(key, condition)})
+    return _merge_clauses(clauses)
+
+
+def canonicalize(query_filter: Any, today: datetime.datetime) -> Any:
+    """
+    Canonical form of a filter written as EJSON, shell syntax or the datasets' shorthand.
+
+    Args:
+        query_filter: Filter as generated by the agent or written in a dataset
+        today: Start of the case's today date (for date placeholders)
+
+    Returns:
+        JSON-compatible canonical filter; equal for filters that differ only in formatting
+    """
+    resolved = resolve_shorthand(query_filter, today)
+    if not isinstance(resolved, dict):
+        return _canonical_value(resolved, None)
+    return canonical_filter(resolved)
+
+
+# ============================================================================
+# COMPARISON
+# ============================================================================
+
+def _uses_opaque_operators(value: Any) -> bool:
+    if isinstance(value, dict):
+        return any(key in _OPAQUE_OPERATORS or _uses_opaque_operators(item) for key, item in value.items())
+    if isinstance(value, list):
+        return any(_uses_opaque_operators(item) for item in value)
+    # Placeholders the canonicalizer doesn't know
+    return isinstance(value, str) and value.startswith("<") and value.endswith(">")
+
+
+def _equality_part(canonical: Dict[str, Any]) -> Dict[str, Any]:
+    """Conditions of a canonical filter other than ranges."""
+    part = {}
+    for field, condition in canonical.items():
+        if isinstance(condition, dict) and condition and set(condition) <= _RANGE_OPERATORS:
+            part[field] = None
+        elif isinstance(condition, dict) and set(condition) & _RANGE_OPERATORS:
+            part[field] = {op: value for op, value in condition.items() if op not in _RANGE_OPERATORS}
+        else:
+            part[field] = condition
+    return part
+
+
+def compare_filters(expected: Any, actual: Any) -> Tuple[Optional[bool], str]:
+    """
+    Compare two canonical filters.
+
+    Returns:
+        (True / False when decided, None when only a judge can tell; reason)
+    """
+    if expected == actual:
+        return True, "canonical filters are equal"
+    if not isinstance(expected, dict) or not isinstance(actual, dict):
+        return False, "filter missing"
+    if _uses_opaque_operators(expected) or _uses_opaque_operators(actual):
+        return None, "filters differ and use operators compared by meaning only"
+
+    if set(expected) != set(actual):
+        missing = sorted(set(expected) - set(actual))
+        extra = sorted(set(actual) - set(expected))
+        return False, f"different fields (missing {missing}, extra {extra})"
+    expected_part, actual_part = _equality_part(expected), _equality_part(actual)
+    if expected_part != actual_part:
+        differing = sorted(field for field in expected_part if expected_part[field] != actual_part[field])
+        return False, f"different values for {differing}"
+    # Same fields and values, different range bounds: $lt next day vs $lte 23:59:59.999 etc.
+    return None, "range bounds differ"
+
+
+# ============================================================================
+# EVALUATOR
+# ============================================================================
+
+FILTER_RUBRIC = (
+    "Output and Expected Output's find query and filter should be equivalent and include the same values. "
+    "Formating of dates, can be different, but only dates"
+)
+
+
+@dataclass
+class FilterEquivalenceEvaluator(Evaluator[object, dict]):
+    """Judges filter equivalence by canonical form, asking an LLM judge only for ambiguous cases."""
+
+    today: str = "2025-10-09"
+    judge_model: str = "openai:gpt-4o"
+    judge_rubric: str = FILTER_RUBRIC
+
+    async def evaluate(self, ctx: EvaluatorContext[object, dict]) -> Dict[str, EvaluationReason]:
+        collection, expected_filter = expected_query(ctx.expected_output or {})
+        output = ctx.output or {}
+        if collection != output.get("collection"):
+            verdict, reason = False, f"collection {output.get('collection')!r} instead of {collection!r}"
+        else:
+            today = case_today(ctx.inputs, self.today)
+            try:
+                verdict, reason = compare_filters(
+                    canonicalize(expected_filter, today),
+                    canonicalize(output.get("filter"), today)
+                )
+            except (TypeError, ValueError) as e:
+                verdict, reason = None, f"could not canonicalize ({e})"
+
+        if verdict is None:
+            judge = CachedJudge(
+                rubric=self.judge_rubric,
+                model=self.judge_model,
+                include_input=True,
+                include_expected_output=True,
+            )
+            judged = next(iter((await judge.evaluate(ctx)).values()))
+            verdict = bool(judged.value)
+            reason = f"LLM judge ({reason}): {judged.reason}"
+        return {"filter_equivalent": EvaluationReason(value=verdict, reason=reason)}
@@ -0,0 +1,235 @@
+"""
+SQLite store of evaluation results.
+
+Every evaluated case is stored with the hash of its definition (inputs,
+expected output, metadata) and the fingerprint of the agent that produced
+the output (see MongoDBAgent.fingerprint). Incremental runs reuse stored
+results and only re-run cases whose definition or agent fingerprint
+changed; the history of runs gives score and latency trends.
+
+Cases whose evaluators failed (e.g. an LLM judge API error) are stored with
+those failures and, like failed cases, are never reused. Reused results are
+copied into the run that reused them, marked with the id of their source.
+
+Tables:
+    runs     one row per evaluation run (dataset, fingerprint, commit, totals)
+    results  one row per evaluated case and run
+"""
+
+import json
+import sqlite3
+import subprocess
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from cassette import content_hash
+
+
+DEFAULT_EVAL_STORE = "evals.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    git_commit TEXT,
+    incremental INTEGER NOT NULL,
+    cases_run INTEGER,
+    cases_reused INTEGER
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    dataset TEXT NOT NULL,
+    case_name TEXT NOT NULL,
+    case_hash TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    score REAL,
+    scores TEXT,
+    duration_s REAL,
+    output TEXT,
+    error TEXT,
+    evaluator_errors TEXT,
+    reused_from INTEGER,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_lookup ON results (dataset, case_name, case_hash, fingerprint);
+"""
+
+# Columns added to results after the first schema, for stores created before them
+_ADDED_RESULT_COLUMNS = {"evaluator_errors": "TEXT", "reused_from": "INTEGER"}
+
+
+def case_hash(case: Any) -> str:
+    """Hash of a pydantic_evals case definition (changes when the case is edited)."""
+    return content_hash({
+        "inputs": case.inputs,
+        "expected_output": case.expected_output,
+        "metadata": case.metadata,
+    })
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _numeric(value: Any) -> Optional[float]:
+    """Evaluation value (bool/int/float or EvaluationReason/EvaluationResult) as a number."""
+    value = getattr(value, "value", value)
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    return None
+
+
+def case_scores(report_case: Any) -> Dict[str, float]:
+    """Numeric scores and assertions of a pydantic_evals ReportCase, by evaluation name."""
+    scores = {}
+    for name, result in list(report_case.scores.items()) + list(report_case.assertions.items()):
+        number = _numeric(result)
+        if number is not None:
+            scores[name] = number
+    return scores
+
+
+class EvalStore:
+    """Evaluation results persisted in SQLite."""
+
+    def __init__(self, path: str = DEFAULT_EVAL_STORE):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(results)")}
+        with self._conn:
+            for column, column_type in _ADDED_RESULT_COLUMNS.items():
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE results ADD COLUMN {column} {column_type}")
+        self._lock = threading.Lock()
+
+    def start_run(self, dataset: str, fingerprint: str, incremental: bool) -> int:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (started_at, dataset, fingerprint, git_commit, incremental) VALUES (?, ?, ?, ?, ?)",
+                (_now(), dataset, fingerprint, _git_commit(), int(incremental)),
+            )
+            return cursor.lastrowid
+
+    def finish_run(self, run_id: int, cases_run: int, cases_reused: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET cases_run = ?, cases_reused = ? WHERE id = ?",
+                (cases_run, cases_reused, run_id),
+            )
+
+    def record(
+        self,
+        run_id: int,
+        dataset: str,
+        case_name: str,
+        case_hash: str,
+        fingerprint: str,
+        scores: Optional[Dict[str, float]] = None,
+        duration_s: Optional[float] = None,
+        output: Any = None,
+        error: Optional[str] = None,
+        evaluator_errors: Optional[List[str]] = None,
+        reused_from: Optional[int] = None
+    ) -> None:
+        """
+        Store the result of one case; the case score is the mean of its scores and assertions.
+
+        Args:
+            error: Why the case failed, if it did
+            evaluator_errors: Failures of the case's evaluators (its scores are incomplete)
+            reused_from: Id of the stored result this one is copied from
+        """
+        score = sum(scores.values()) / len(scores) if scores else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO results (run_id, dataset, case_name, case_hash, fingerprint, score, scores, "
+                "duration_s, output, error, evaluator_errors, reused_from, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id, dataset, case_name, case_hash, fingerprint, score,
+                    json.dumps(scores or {}), duration_s, json.dumps(output, default=str), error,
+                    json.dumps(evaluator_errors) if evaluator_errors else None, reused_from, _now(),
+                ),
+            )
+
+    def latest(self, dataset: str, case_name: str, case_hash: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Most recent complete result of a case for the same definition and agent, or None.
+        Results of failed cases or failed evaluators don't count.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM results WHERE dataset = ? AND case_name = ? AND case_hash = ? AND fingerprint = ? "
+                "AND error IS NULL AND evaluator_errors IS NULL ORDER BY id DESC LIMIT 1",
+                (dataset, case_name, case_hash, fingerprint),
+            ).fetchone()
+        if row is None:
+            return None
+        result = dict(row)
+        result["scores"] = json.loads(result["scores"] or "{}")
+        return result
+
+    def history(self, dataset: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Per-run score and latency of the most recent runs of a dataset, newest first.
+        The latency only covers the cases that ran, not the reused ones.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT runs.id, runs.started_at, runs.fingerprint, runs.git_commit,
+                       runs.cases_run, runs.cases_reused,
+                       AVG(results.score) AS mean_score,
+                       AVG(CASE WHEN results.reused_from IS NULL THEN results.duration_s END) AS mean_duration_s,
+                       SUM(results.error IS NOT NULL) AS errors,
+                       SUM(results.evaluator_errors IS NOT NULL) AS evaluator_errors
+                FROM runs LEFT JOIN results ON results.run_id = runs.id
+                WHERE runs.dataset = ?
+                GROUP BY runs.id ORDER BY runs.id DESC LIMIT ?
+                """,
+                (dataset, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def case_history(self, dataset: str, case_name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Score and latency of one case over its most recent runs, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, fingerprint, score, duration_s, error, evaluator_errors, reused_from, created_at "
+                "FROM results "
+                "WHERE dataset = ? AND case_name = ? ORDER BY id DESC LIMIT ?",
+                (dataset, case_name, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def print_history(store: EvalStore, dataset: str, limit: int = 20) -> None:
+    """Print the score and latency trend of a dataset's recent runs."""
+    print(f"{'run':>5}  {'started':19}  {'commit':8}  {'agent':8}  {'run':>4}  {'reused':>6}  {'score':>6}  {'latency':>8}  "
+          f"errors  evaluator errors")
+    for run in store.history(dataset, limit):
+        score = f"{run['mean_score']:.3f}" if run["mean_score"] is not None else "-"
+        latency = f"{run['mean_duration_s']:.2f}s" if run["mean_duration_s"] is not None else "-"
+        print(
+            f"{run['id']:>5}  {run['started_at'][:19]:19}  {run['git_commit'] or '-':8}  {run['fingerprint'][:8]:8}  "
+            f"{run['cases_run'] or 0:>4}  {run['cases_reused'] or 0:>6}  {score:>6}  {latency:>8}  {run['errors'] or 0:>6}  "
+            f"{run['evaluator_errors'] or 0}"
+        )
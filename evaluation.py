@@ -0,0 +1,221 @@
+"""
+Concurrent evaluation runner for the MongoDB AI Agent.
+
+Runs pydantic_evals datasets with an async task function so cases execute
+concurrently (bounded by max_concurrency) on a single event loop, sharing
+one agent and its MCP session pool. When OpenAI rate limits a case, every
+worker pauses for the advertised retry-after before the case is retried.
+
+evaluate_with_store() additionally persists every case result in an
+EvalStore and, in incremental mode, only re-runs cases whose definition or
+agent fingerprint changed since their last stored result.
+"""
+
+import asyncio
+import functools
+import json
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from openai import RateLimitError
+from pydantic_evals import Dataset
+
+from cassette import content_hash
+from eval_store import EvalStore, case_hash, case_scores
+from resilience import retry_after
+
+
+class RateLimitGate:
+    """Shared cool-down: once any case is rate limited, all cases wait before their next attempt."""
+
+    def __init__(self):
+        self._resume_at = 0.0
+
+    async def wait(self) -> None:
+        delay = self._resume_at - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def back_off(self, delay: float) -> None:
+        self._resume_at = max(self._resume_at, asyncio.get_running_loop().time() + delay)
+
+
+def rate_limit_aware(
+    task: Callable[[Any], Awaitable[Any]],
+    max_retries: int = 5,
+    base_delay: float = 2.0,
+    gate: Optional[RateLimitGate] = None,
+) -> Callable[[Any], Awaitable[Any]]:
+    """
+    Wrap an async evaluation task so rate-limited cases back off and retry.
+
+    The agent already retries each completion (see resilience.py); this only
+    sees rate limits that outlasted those retries, and re-runs the whole case.
+
+    Args:
+        task: Async function taking case inputs and returning the output
+        max_retries: Retries per case before the rate limit error is raised
+        base_delay: Initial backoff (seconds) when no retry-after is advertised
+        gate: Cool-down shared between cases; a new one is created if omitted
+
+    Returns:
+        Async function with the same name and signature as task
+    """
+    gate = gate or RateLimitGate()
+
+    @functools.wraps(task)
+    async def wrapper(inputs):
+        for attempt in range(max_retries + 1):
+            await gate.wait()
+            try:
+                return await task(inputs)
+            except RateLimitError as e:
+                if attempt == max_retries:
+                    raise
+                delay = retry_after(e) or base_delay * (2 ** attempt)
+                delay += random.uniform(0, delay / 4)
+                print(f"[rate limited] pausing all cases for {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+                gate.back_off(delay)
+
+    return wrapper
+
+
+async def evaluate_concurrently(
+    dataset: Dataset,
+    task: Callable[[Any], Awaitable[Any]],
+    max_concurrency: int = 4,
+    max_rate_limit_retries: int = 5,
+):
+    """
+    Evaluate a dataset running up to max_concurrency cases at a time.
+
+    Args:
+        dataset: pydantic_evals Dataset to evaluate
+        task: Async task function (e.g. ai_mongo_query_async)
+        max_concurrency: Maximum number of cases in flight
+        max_rate_limit_retries: Retries per case on OpenAI rate limits
+
+    Returns:
+        pydantic_evals EvaluationReport
+    """
+    return await dataset.evaluate(
+        rate_limit_aware(task, max_retries=max_rate_limit_retries),
+        max_concurrency=max_concurrency,
+    )
+
+
+def evaluation_fingerprint(dataset: Dataset, agent_fingerprint: str) -> str:
+    """Fingerprint of the agent combined with the dataset's evaluators (a changed rubric changes scores too)."""
+    return content_hash({
+        "agent": agent_fingerprint,
+        "evaluators": [repr(evaluator) for evaluator in dataset.evaluators],
+    })
+
+
+def split_stored_cases(
+    dataset: Dataset,
+    store: EvalStore,
+    dataset_name: str,
+    fingerprint: str
+) -> Tuple[List[Any], List[Dict[str, Any]]]:
+    """
+    Split a dataset's cases into those that need a run and those with a reusable stored result.
+
+    Returns:
+        (cases whose definition or fingerprint changed since their last stored
+        result, stored results of the unchanged cases)
+    """
+    pending, reused = [], []
+    for case in dataset.cases:
+        stored = store.latest(dataset_name, case.name, case_hash(case), fingerprint)
+        if stored is None:
+            pending.append(case)
+        else:
+            reused.append(stored)
+    return pending, reused
+
+
+def store_run(
+    store: EvalStore,
+    dataset: Dataset,
+    dataset_name: str,
+    fingerprint: str,
+    incremental: bool,
+    report: Any,
+    reused: List[Dict[str, Any]]
+) -> int:
+    """
+    Record an evaluation run: the cases of its report and the reused stored results.
+
+    Returns:
+        Id of the stored run
+    """
+    hashes = {case.name: case_hash(case) for case in dataset.cases}
+    run_id = store.start_run(dataset_name, fingerprint, incremental)
+    # Reused results are copied into this run so its history covers the whole dataset
+    for stored in reused:
+        store.record(
+            run_id, dataset_name, stored["case_name"], stored["case_hash"], fingerprint,
+            scores=stored["scores"], duration_s=stored["duration_s"], output=json.loads(stored["output"]),
+            reused_from=stored["id"],
+        )
+
+    cases_run = 0
+    if report is not None:
+        for case in report.cases:
+            store.record(
+                run_id, dataset_name, case.name, hashes[case.name], fingerprint,
+                scores=case_scores(case), duration_s=case.task_duration, output=case.output,
+                # Scores are missing for failed evaluators: store them so the case isn't reused
+                evaluator_errors=[f"{failure.name}: {failure.error_message}" for failure in case.evaluator_failures],
+            )
+        for failure in report.failures:
+            store.record(
+                run_id, dataset_name, failure.name, hashes[failure.name], fingerprint,
+                error=failure.error_message,
+            )
+        cases_run = len(report.cases) + len(report.failures)
+
+    store.finish_run(run_id, cases_run=cases_run, cases_reused=len(reused))
+    return run_id
+
+
+async def evaluate_with_store(
+    dataset: Dataset,
+    task: Callable[[Any], Awaitable[Any]],
+    store: EvalStore,
+    dataset_name: str,
+    fingerprint: str,
+    incremental: bool = False,
+    max_concurrency: int = 4,
+    max_rate_limit_retries: int = 5,
+) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    Evaluate a dataset and store every case result.
+
+    Args:
+        dataset: pydantic_evals Dataset to evaluate
+        task: Async task function (e.g. ai_mongo_query_async)
+        store: Results store
+        dataset_name: Name the results are stored under
+        fingerprint: Fingerprint of what produced the outputs (see evaluation_fingerprint)
+        incremental: Reuse stored results of unchanged cases instead of re-running them
+        max_concurrency: Maximum number of cases in flight
+        max_rate_limit_retries: Retries per case on OpenAI rate limits
+
+    Returns:
+        (EvaluationReport of the cases that ran, or None when every case was
+        reused; stored results of the reused cases)
+    """
+    pending, reused = split_stored_cases(dataset, store, dataset_name, fingerprint) if incremental else (list(dataset.cases), [])
+
+    report = None
+    if pending:
+        report = await evaluate_concurrently(
+            dataset.model_copy(update={"cases": pending}),
+            task,
+            max_concurrency=max_concurrency,
+            max_rate_limit_retries=max_rate_limit_retries,
+        )
+    store_run(store, dataset, dataset_name, fingerprint, incremental, report, reused)
+    return report, reused
@@ -0,0 +1,201 @@
+"""
+Fake OpenAI and MCP backends for benchmarking MongoDBAgent offline.
+
+The fake model follows the conversation shape the real agent produces:
+  1. check the events schema and the unique values of `type`
+  2. run a `find` with a filter derived from the question
+  3. answer in text
+with log-normally distributed latencies and token counts estimated from the
+message sizes. The fake MCP session answers every tool with canned data.
+Both are seeded so runs are reproducible.
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from mcp.types import CallToolResult, ListToolsResult, TextContent, Tool
+from openai.types.chat import ChatCompletion
+
+
+FAKE_TOOLS = ["find", "aggregate", "count", "collection-schema", "collection-indexes", "explain", "list-collections"]
+
+_FAKE_DOCUMENT = {
+    "_id": {"$oid": "68e76c77087ed400125e9285"},
+    "type": "enterEvents",
+    "entryType": "eid",
+    "guestName": "SHAJAHAN ABDULR MOHAMMEDKUNHI",
+    "propertyId": {"$oid": "60ae026077dba90011862dfc"},
+    "message": "SHAJAHAN ABDULR MOHAMMEDKUNHI entered the unit HR",
+    "date": {"$date": "2025-10-09T08:04:07.699Z"},
+}
+
+
+def _latency(rng: random.Random, median_ms: float, sigma: float) -> float:
+    """Log-normal latency in seconds with the given median."""
+    if median_ms <= 0:
+        return 0.0
+    return rng.lognormvariate(math.log(median_ms / 1000), sigma)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _message_text(message: Any) -> str:
+    if isinstance(message, dict):
+        return str(message.get("content") or "") + json.dumps(message.get("tool_calls") or [], default=str)
+    return str(getattr(message, "content", "") or "") + str(getattr(message, "tool_calls", "") or "")
+
+
+def _day_range(today: datetime, days_ago: int) -> Dict[str, Any]:
+    start = today - timedelta(days=days_ago)
+    return {
+        "$gte": {"$date": start.strftime("%Y-%m-%dT00:00:00Z")},
+        "$lt": {"$date": (start + timedelta(days=1)).strftime("%Y-%m-%dT00:00:00Z")},
+    }
+
+
+def fake_filter(question: str, today_date: Optional[str]) -> Dict[str, Any]:
+    """Build a plausible events filter from the question, like the real model would."""
+    text = question.lower()
+    if not today_date:
+        match = re.search(r"today is (\d{4}-\d{2}-\d{2})", text)
+        today_date = match.group(1) if match else "2025-10-09"
+    today = datetime.strptime(today_date[:10], "%Y-%m-%d")
+
+    query_filter: Dict[str, Any] = {}
+    if "deliver" in text:
+        query_filter["type"] = "deliveryEvents"
+    elif re.search(r"check(ed)?[- ]?outs?", text):
+        query_filter["type"] = "leaveEvents"
+    else:
+        query_filter["type"] = "enterEvents"
+
+    if "qr" in text:
+        query_filter["leaveType" if query_filter["type"] == "leaveEvents" else "entryType"] = "qrCode"
+    elif "emirates id" in text:
+        query_filter["entryType"] = "eid"
+
+    if "yesterday" in text:
+        query_filter["date"] = _day_range(today, 1)
+    elif "today" in text:
+        query_filter["date"] = _day_range(today, 0)
+    return query_filter
+
+
+class FakeOpenAIClient:
+    """Stands in for AsyncOpenAI: only chat.completions.create and models.retrieve are implemented."""
+
+    def __init__(self, median_latency_ms: float = 800.0, sigma: float = 0.35, seed: int = 0, model: str = "gpt-4.1"):
+        self.median_latency_ms = median_latency_ms
+        self.sigma = sigma
+        self.model = model
+        self._rng = random.Random(seed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.models = SimpleNamespace(retrieve=self._retrieve)
+
+    async def _retrieve(self, model: str):
+        return SimpleNamespace(id=model)
+
+    async def _create(self, model: str, messages: List[Any], **kwargs) -> ChatCompletion:
+        await asyncio.sleep(_latency(self._rng, self.median_latency_ms, self.sigma))
+
+        system = messages[0]["content"]
+        database = re.search(r"The database you're working with is: (\S+)", system)
+        database = database.group(1) if database else "test"
+        today = re.search(r"The current date is (\S+)", system)
+        today = today.group(1) if today and today.group(1) != "None" else None
+        question = next(m["content"] for m in messages if isinstance(m, dict) and m.get("role") == "user")
+        turn = sum(1 for m in messages if not isinstance(m, dict) or m.get("role") == "assistant")
+
+        message: Dict[str, Any] = {"role": "assistant"}
+        if turn == 0:
+            calls = [
+                ("collection-schema", {"database": database, "collection": "events"}),
+                ("aggregate", {"database": database, "collection": "events",
+                               "pipeline": [{"$group": {"_id": "$type"}}]}),
+            ]
+        elif turn == 1:
+            calls = [("find", {"database": database, "collection": "events",
+                               "filter": fake_filter(question, today), "limit": 10})]
+        else:
+            calls = []
+            message["content"] = f"Here are the events matching: {question}"
+
+        if calls:
+            message["tool_calls"] = [
+                {
+                    "id": f"call_{turn}_{i}_{self._rng.getrandbits(32):08x}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(arguments)},
+                }
+                for i, (name, arguments) in enumerate(calls)
+            ]
+
+        prompt_tokens = sum(_estimate_tokens(_message_text(m)) for m in messages)
+        completion_tokens = _estimate_tokens(_message_text(message))
+        return ChatCompletion.model_validate({
+            "id": f"chatcmpl-fake-{self._rng.getrandbits(32):08x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls" if calls else "stop",
+                "message": message,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeMCPSession:
+    """Stands in for an MCP ClientSession returning canned data for every tool."""
+
+    def __init__(self, median_latency_ms: float = 60.0, sigma: float = 0.5, seed: int = 0):
+        self.median_latency_ms = median_latency_ms
+        self.sigma = sigma
+        self._rng = random.Random(seed)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def list_tools(self) -> ListToolsResult:
+        return ListToolsResult(tools=[
+            Tool(name=name, description=f"Fake {name} tool", inputSchema={"type": "object", "properties": {}})
+            for name in FAKE_TOOLS
+        ])
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        await asyncio.sleep(_latency(self._rng, self.median_latency_ms, self.sigma))
+        if name == "find":
+            text = f'Found 1 documents in the collection "{arguments.get("collection")}":\n{json.dumps(_FAKE_DOCUMENT)}'
+        elif name == "count":
+            text = 'Found 1 documents in the collection'
+        else:
+            text = f"{name} result for {json.dumps(arguments, sort_keys=True)}"
+        return CallToolResult(content=[TextContent(type="text", text=text)])
+
+
+def fake_session_factory(median_latency_ms: float = 60.0, sigma: float = 0.5, seed: int = 0):
+    """Session factory for MongoDBAgent(session_factory=...) backed by FakeMCPSession."""
+
+    @asynccontextmanager
+    async def open_session():
+        yield FakeMCPSession(median_latency_ms=median_latency_ms, sigma=sigma, seed=seed)
+
+    return open_session
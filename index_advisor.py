@@ -0,0 +1,349 @@
+"""
+Index advisor derived from the agent's query log.
+
+Reads the queries logged by MongoDBAgent (AGENT_QUERY_LOG, see query_log.py),
+aggregates which fields are filtered/sorted on and with which operators, and
+recommends compound indexes following the ESR rule (Equality, Sort, Range).
+The selectivity of each predicate is estimated from the schema profile
+written by extract_schema.py (or events_schema in mongodb_agent.py).
+
+Runs fully offline; nothing is created on the database. The suggested
+createIndex commands are printed for review.
+
+Usage:
+    python index_advisor.py query_log.jsonl
+    python index_advisor.py query_log.jsonl --schema events_schema.txt --top 3 --min-support 5
+"""
+
+import argparse
+import re
+import statistics
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from query_log import read_query_log
+
+
+# Fraction of documents assumed to match a predicate when the profile can't tell
+DATE_RANGE_SELECTIVITY = 0.1
+RANGE_SELECTIVITY = 0.3
+PREFIX_REGEX_SELECTIVITY = 0.05
+# Fields with more unique values than the profile lists ("> 10, treated as string")
+HIGH_CARDINALITY_SELECTIVITY = 0.01
+
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+
+# ============================================================================
+# SCHEMA PROFILE
+# ============================================================================
+
+def parse_schema_profile(text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Parse the schema analysis text of extract_schema.py.
+
+    Returns:
+        {field: {"presence": fraction of documents, "types": [...],
+                 "distinct": number of unique values or None when > 10}}
+    """
+    profile: Dict[str, Dict[str, Any]] = {}
+    field = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("Field: "):
+            field = line[len("Field: "):]
+            profile[field] = {"presence": 1.0, "types": [], "distinct": None}
+        elif field is None:
+            continue
+        elif line.startswith("Present in: "):
+            match = re.match(r"Present in: (\d+)/(\d+)", line)
+            if match and int(match.group(2)):
+                profile[field]["presence"] = int(match.group(1)) / int(match.group(2))
+        elif line.startswith("Type(s): "):
+            profile[field]["types"] = [t.strip() for t in line[len("Type(s): "):].split(",")]
+        elif line.startswith("Unique values ("):
+            profile[field]["distinct"] = int(re.match(r"Unique values \((\d+)\)", line).group(1)) or None
+    return profile
+
+
+def load_schema_profile(path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """Profile from a schema file, else from events_schema.txt, else from mongodb_agent.events_schema."""
+    candidates = [path] if path else ["events_schema.txt"]
+    for candidate in candidates:
+        if candidate and Path(candidate).exists():
+            return parse_schema_profile(Path(candidate).read_text(encoding="utf-8"))
+    if path:
+        raise FileNotFoundError(path)
+
+    from mongodb_agent import events_schema
+    return parse_schema_profile(events_schema)
+
+
+# ============================================================================
+# PREDICATES
+# ============================================================================
+
+def _classify_condition(condition: Any) -> Tuple[str, str]:
+    """(kind, operator) of a field condition; kind is equality, range or residual."""
+    if not isinstance(condition, dict) or not condition:
+        return "equality", "$eq"
+    if set(condition) <= {"$date", "$oid", "$numberLong", "$numberDecimal"}:
+        # EJSON literal, not an operator document
+        return "equality", "$eq"
+
+    operators = set(condition) - {"$options"}
+    if operators == {"$eq"}:
+        return "equality", "$eq"
+    if operators == {"$in"}:
+        return "equality", "$in"
+    if operators == {"$exists"}:
+        return "residual", "$exists"
+    if operators and operators <= _RANGE_OPERATORS:
+        return "range", "range"
+    if operators == {"$regex"}:
+        pattern, options = condition["$regex"], condition.get("$options", "")
+        if isinstance(pattern, str) and pattern.startswith("^") and "i" not in options:
+            return "range", "$regex (prefix)"
+        return "residual", "$regex"
+    return "residual", "/".join(sorted(operators))
+
+
+def extract_predicates(query_filter: Any) -> List[List[Tuple[str, str, str, Any]]]:
+    """
+    Split a filter into the predicate sets an index would have to serve.
+
+    Top-level conjuncts (and $and clauses) form one set; each branch of an
+    $or is served separately, together with the conjuncts around it.
+
+    Returns:
+        A list of predicate sets, each a list of (field, kind, operator, condition)
+    """
+    if not isinstance(query_filter, dict):
+        return [[]]
+
+    conjuncts: List[Tuple[str, str, str, Any]] = []
+    branch_sets: List[List[Tuple[str, str, str, Any]]] = [[]]
+    for key, value in query_filter.items():
+        if key == "$and" and isinstance(value, list):
+            for clause in value:
+                nested = extract_predicates(clause)
+                branch_sets = [b + n for b in branch_sets for n in nested]
+        elif key == "$or" and isinstance(value, list) and value:
+            branches = [p for clause in value for p in extract_predicates(clause)]
+            branch_sets = [b + n for b in branch_sets for n in branches]
+        elif key.startswith("$"):
+            continue
+        else:
+            kind, operator = _classify_condition(value)
+            conjuncts.append((key, kind, operator, value))
+    return [conjuncts + b for b in branch_sets]
+
+
+def estimate_selectivity(field: str, kind: str, operator: str, condition: Any, profile: Dict[str, Dict[str, Any]]) -> float:
+    """Estimated fraction of the collection matching a single predicate."""
+    info = profile.get(field, {"presence": 1.0, "types": [], "distinct": None})
+    presence = info["presence"]
+
+    if kind == "equality":
+        per_value = presence / info["distinct"] if info["distinct"] else presence * HIGH_CARDINALITY_SELECTIVITY
+        if operator == "$in" and isinstance(condition, dict) and isinstance(condition.get("$in"), list):
+            return min(presence, per_value * len(condition["$in"]))
+        return per_value
+    if operator == "$regex (prefix)":
+        return presence * PREFIX_REGEX_SELECTIVITY
+    if kind == "range":
+        return presence * (DATE_RANGE_SELECTIVITY if "datetime" in info["types"] else RANGE_SELECTIVITY)
+    if operator == "$exists" and isinstance(condition, dict):
+        return presence if condition.get("$exists") else 1 - presence
+    return presence
+
+
+# ============================================================================
+# RECOMMENDATIONS
+# ============================================================================
+
+# Index shape of a query: (equality fields, sort keys in order, range fields)
+QueryShape = Tuple[FrozenSet[str], Tuple[Tuple[str, int], ...], FrozenSet[str]]
+
+
+def _sort_keys(sort: Any) -> Tuple[Tuple[str, int], ...]:
+    if not isinstance(sort, dict):
+        return ()
+    return tuple((field, -1 if direction in (-1, "-1", "desc", "descending") else 1) for field, direction in sort.items())
+
+
+def query_shape(predicates: List[Tuple[str, str, str, Any]], sort: Any) -> QueryShape:
+    sort_keys = _sort_keys(sort)
+    sorted_fields = {field for field, _ in sort_keys}
+    equality = frozenset(field for field, kind, _, _ in predicates if kind == "equality")
+    ranges = frozenset(
+        field for field, kind, _, _ in predicates
+        if kind == "range" and field not in equality and field not in sorted_fields
+    )
+    return equality, tuple(key for key in sort_keys if key[0] not in equality), ranges
+
+
+def build_index(shape: QueryShape, field_usage: Counter) -> Tuple[Tuple[str, int], ...]:
+    """
+    ESR-ordered index keys for a query shape. Equality fields are ordered by how
+    often they are used across the log so shapes share index prefixes.
+    """
+    equality, sort_keys, ranges = shape
+    by_usage = lambda field: (-field_usage[field], field)
+    keys = [(field, 1) for field in sorted(equality, key=by_usage)]
+    keys += list(sort_keys)
+    keys += [(field, 1) for field in sorted(ranges, key=by_usage)]
+    return tuple(keys)
+
+
+def serves(index: Tuple[Tuple[str, int], ...], shape: QueryShape) -> bool:
+    """True if the index serves every equality, sort and range predicate of the shape."""
+    equality, sort_keys, ranges = shape
+    fields = [field for field, _ in index]
+    n_eq, n_sort = len(equality), len(sort_keys)
+    if set(fields[:n_eq]) != equality:
+        return False
+    sort_part = index[n_eq:n_eq + n_sort]
+    reversed_sort = tuple((field, -direction) for field, direction in sort_keys)
+    if sort_part not in (sort_keys, reversed_sort):
+        return False
+    return set(fields[n_eq + n_sort:n_eq + n_sort + len(ranges)]) == ranges
+
+
+def analyze(entries: List[Dict[str, Any]], collection: str, profile: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate field/operator usage and query shapes of the logged queries on a collection."""
+    operator_usage: Dict[str, Counter] = defaultdict(Counter)
+    field_usage: Counter = Counter()
+    shapes: Counter = Counter()
+    shape_selectivity: Dict[QueryShape, List[float]] = defaultdict(list)
+    residual_fields: Dict[QueryShape, Counter] = defaultdict(Counter)
+    queries = 0
+
+    for entry in entries:
+        if entry.get("collection") != collection:
+            continue
+        queries += 1
+        for predicates in extract_predicates(entry.get("filter") or {}):
+            for field, kind, operator, _ in predicates:
+                operator_usage[field][operator] += 1
+                field_usage[field] += 1
+            for field, _ in _sort_keys(entry.get("sort")):
+                operator_usage[field]["sort"] += 1
+
+            shape = query_shape(predicates, entry.get("sort"))
+            if not shape[0] and not shape[1] and not shape[2]:
+                continue
+            shapes[shape] += 1
+            indexed = shape[0] | shape[2] | {field for field, _ in shape[1]}
+            selectivity = 1.0
+            for field, kind, operator, condition in predicates:
+                if field in indexed:
+                    selectivity *= estimate_selectivity(field, kind, operator, condition, profile)
+                else:
+                    residual_fields[shape][field] += 1
+            shape_selectivity[shape].append(selectivity)
+
+    return {
+        "queries": queries,
+        "operator_usage": operator_usage,
+        "field_usage": field_usage,
+        "shapes": shapes,
+        "shape_selectivity": shape_selectivity,
+        "residual_fields": residual_fields,
+    }
+
+
+def recommend_indexes(analysis: Dict[str, Any], top: int, min_support: int) -> List[Dict[str, Any]]:
+    """
+    Greedily pick the indexes serving the most logged queries: each round takes
+    the candidate covering the most not yet covered query shapes.
+    """
+    shapes: Counter = analysis["shapes"]
+    candidates = {build_index(shape, analysis["field_usage"]) for shape in shapes}
+    uncovered = set(shapes)
+    recommendations = []
+
+    while uncovered and len(recommendations) < top:
+        served = {index: {shape for shape in uncovered if serves(index, shape)} for index in candidates}
+        # Most queries served first, then the shorter index
+        best = max(served, key=lambda index: (sum(shapes[s] for s in served[index]), -len(index)), default=None)
+        if best is None:
+            break
+        best_shapes = served[best]
+        support = sum(shapes[s] for s in best_shapes)
+        if support < min_support:
+            break
+
+        selectivities = [v for s in best_shapes for v in analysis["shape_selectivity"][s]]
+        residual = Counter()
+        for s in best_shapes:
+            residual.update(analysis["residual_fields"][s])
+        recommendations.append({
+            "keys": best,
+            "support": support,
+            "support_share": support / analysis["queries"] if analysis["queries"] else 0.0,
+            "estimated_selectivity": statistics.median(selectivities) if selectivities else None,
+            "residual_fields": [field for field, _ in residual.most_common()],
+        })
+        uncovered -= best_shapes
+        candidates.discard(best)
+    return recommendations
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def _index_spec(keys: Tuple[Tuple[str, int], ...]) -> str:
+    return "{ " + ", ".join(f'"{field}": {direction}' for field, direction in keys) + " }"
+
+
+def print_report(analysis: Dict[str, Any], recommendations: List[Dict[str, Any]], collection: str) -> None:
+    print(f"\n[Field usage]: {analysis['queries']} logged queries on '{collection}'")
+    for field, operators in sorted(analysis["operator_usage"].items(), key=lambda item: -sum(item[1].values())):
+        usage = ", ".join(f"{op} x{count}" for op, count in operators.most_common())
+        print(f"   {field:<24} {usage}")
+
+    print(f"\n[Query shapes]: {len(analysis['shapes'])} distinct")
+    for (equality, sort_keys, ranges), count in analysis["shapes"].most_common(10):
+        sort = ", ".join(f"{field} {direction}" for field, direction in sort_keys) or "-"
+        print(f"   x{count:<4} equality: {', '.join(sorted(equality)) or '-'} | sort: {sort} | "
+              f"range: {', '.join(sorted(ranges)) or '-'}")
+
+    print(f"\n[Recommended indexes]: {len(recommendations)}")
+    for i, rec in enumerate(recommendations, start=1):
+        selectivity = rec["estimated_selectivity"]
+        print(f"   {i}. db.{collection}.createIndex({_index_spec(rec['keys'])})")
+        print(f"      serves {rec['support']} queries ({rec['support_share'] * 100:.1f}%), "
+              f"estimated match rate {'n/a' if selectivity is None else f'{selectivity * 100:.3f}%'} of documents")
+        if rec["residual_fields"]:
+            print(f"      not covered (filtered after the index scan): {', '.join(rec['residual_fields'])}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("query_log", help="JSONL query log written with AGENT_QUERY_LOG")
+    parser.add_argument("--collection", default="events")
+    parser.add_argument("--schema", help="Schema profile from extract_schema.py (default: events_schema.txt or the built-in schema)")
+    parser.add_argument("--top", type=int, default=5, help="Maximum number of indexes to recommend")
+    parser.add_argument("--min-support", type=int, default=2, help="Minimum number of queries an index must serve")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 80)
+    print("MongoDB AI Agent Index Advisor")
+    print("=" * 80)
+
+    entries = read_query_log(args.query_log)
+    profile = load_schema_profile(args.schema)
+    analysis = analyze(entries, args.collection, profile)
+    recommendations = recommend_indexes(analysis, args.top, args.min_support)
+    print_report(analysis, recommendations, args.collection)
+
+
+if __name__ == "__main__":
+    main()
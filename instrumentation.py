@@ -0,0 +1,168 @@
+"""
+Per-stage latency and token instrumentation for MongoDBAgent queries.
+
+Every query records a QueryTrace made of spans (session setup, tool listing,
+each completion with its token usage, each tool call with the bytes it
+returned). The trace is attached to the query result under "trace" and
+exported to the configured sinks.
+
+Sinks can be configured from the environment:
+    AGENT_TRACE_JSONL=traces.jsonl   # append one JSON line per query
+    AGENT_TRACE_LOGFIRE=1            # send each trace to logfire
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+
+_current_trace: ContextVar[Optional["QueryTrace"]] = ContextVar("query_trace", default=None)
+
+
+class QueryTrace:
+    """Spans recorded while answering a single query."""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._end: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Record a span; the yielded dict can be filled with attributes while it runs."""
+        span = {"name": name, "start_ms": round(self._elapsed_ms(), 3), "duration_ms": None, **attributes}
+        self.spans.append(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    @contextmanager
+    def activate(self):
+        """Make this the trace that span() records into for the current task."""
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            self._end = time.perf_counter()
+            _current_trace.reset(token)
+
+    def totals(self) -> Dict[str, Any]:
+        """Aggregate token usage, tool traffic and time per stage over all spans."""
+        completions = [s for s in self.spans if s["name"] == "completion"]
+        tool_calls = [s for s in self.spans if s["name"] == "tool_call"]
+
+        stage_ms: Dict[str, float] = {}
+        for s in self.spans:
+            stage_ms[s["name"]] = round(stage_ms.get(s["name"], 0.0) + (s["duration_ms"] or 0.0), 3)
+
+        return {
+            "completions": len(completions),
+            "prompt_tokens": sum(s.get("prompt_tokens", 0) for s in completions),
+            "completion_tokens": sum(s.get("completion_tokens", 0) for s in completions),
+            "cached_tokens": sum(s.get("cached_tokens", 0) for s in completions),
+            "tool_calls": len(tool_calls),
+            "tool_bytes": sum(s.get("bytes", 0) for s in tool_calls),
+            "stage_ms": stage_ms,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self._end if self._end is not None else time.perf_counter()
+        return {
+            "query": self.query,
+            "started_at": self.started_at.isoformat(),
+            "total_ms": round((end - self._start) * 1000, 3),
+            "totals": self.totals(),
+            "spans": self.spans,
+        }
+
+
+def current_trace() -> Optional[QueryTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record a span on the active trace; a no-op (yielding a scratch dict) outside of a query."""
+    trace = current_trace()
+    if trace is None:
+        yield dict(attributes)
+        return
+    with trace.span(name, **attributes) as s:
+        yield s
+
+
+def record_usage(span_data: Dict[str, Any], usage: Any) -> None:
+    """Copy token usage from an OpenAI completion response onto a span."""
+    if usage is None:
+        return
+    span_data["prompt_tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+    span_data["completion_tokens"] = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    span_data["cached_tokens"] = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+
+
+# ============================================================================
+# SINKS
+# ============================================================================
+
+class TraceSink:
+    """Destination for finished query traces."""
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+
+class JsonlTraceSink(TraceSink):
+    """Appends one JSON line per query trace, for offline analysis."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        line = json.dumps(trace, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class LogfireTraceSink(TraceSink):
+    """Sends each query trace to logfire (requires `pip install logfire` and logfire.configure())."""
+
+    def __init__(self):
+        import logfire
+        self._logfire = logfire
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        self._logfire.info(
+            "agent query {query}",
+            query=trace["query"],
+            total_ms=trace["total_ms"],
+            **trace["totals"],
+            spans=trace["spans"],
+        )
+
+
+def sinks_from_env() -> List[TraceSink]:
+    """Build trace sinks from AGENT_TRACE_* environment variables."""
+    sinks: List[TraceSink] = []
+    if os.getenv("AGENT_TRACE_JSONL"):
+        sinks.append(JsonlTraceSink(os.environ["AGENT_TRACE_JSONL"]))
+    if os.getenv("AGENT_TRACE_LOGFIRE", "").lower() in ("1", "true", "yes"):
+        sinks.append(LogfireTraceSink())
+    return sinks
@@ -0,0 +1,182 @@
+"""
+Cache for read-only MongoDB metadata lookups made through MCP tools.
+
+The agent asks for the same metadata over and over: the schema of the
+events collection and the unique values of enum-like fields such as
+type/entryType/leaveType. These results change rarely, so they are cached
+per agent with a TTL and shared by every query.
+
+Lookups that are still running (e.g. prefetched by the agent while the
+first completion is in flight) are tracked as in-flight futures, so a
+request for the same metadata can wait for them instead of calling again.
+
+Cacheable calls:
+- collection-schema, collection-indexes, list-collections, list-databases
+- "distinct" aggregations: a $group on a single field (optionally with a
+  count and a $sort) with no filter other than an existence check on that field
+
+Distinct lookups share an entry only when their pipelines produce the same
+documents: the key holds the whole pipeline, with only the spelling of the
+count accumulator ({"$sum": 1} / {"$count": {}}) normalized.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+CACHEABLE_TOOLS = {"collection-schema", "collection-indexes", "list-collections", "list-databases"}
+
+# Stages that may follow a distinct $group without changing the result: only
+# reordering, since $limit/$project ask for a different answer than the cached one
+_DISTINCT_TRAILING_STAGES = {"$sort"}
+
+
+def distinct_pipeline(field: str) -> list:
+    """Aggregation pipeline used to look up the unique values (with counts) of a field."""
+    return [
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+    ]
+
+
+def _is_count_accumulator(value: Any) -> bool:
+    return value in ({"$sum": 1}, {"$count": {}})
+
+
+def _is_existence_match(match: Dict[str, Any], field: str) -> bool:
+    """True for $match stages that only drop documents missing the field."""
+    if set(match) != {field} or not isinstance(match[field], dict):
+        return False
+    return all(
+        (op == "$exists" and value is True) or (op == "$ne" and value is None)
+        for op, value in match[field].items()
+    )
+
+
+def distinct_field(tool_name: str, arguments: Dict[str, Any]) -> Optional[str]:
+    """
+    Return the field name if a tool call is a unique-values lookup, else None.
+
+    Args:
+        tool_name: MCP tool name
+        arguments: Tool arguments as sent by the model
+
+    Returns:
+        The grouped field (without "$") for distinct-like aggregations
+    """
+    if tool_name != "aggregate":
+        return None
+
+    pipeline = list(arguments.get("pipeline") or [])
+    if not pipeline or not all(isinstance(stage, dict) and len(stage) == 1 for stage in pipeline):
+        return None
+
+    match = pipeline.pop(0)["$match"] if "$match" in pipeline[0] else None
+    if not pipeline or "$group" not in pipeline[0]:
+        return None
+
+    group = pipeline[0]["$group"]
+    group_id = group.get("_id")
+    if not isinstance(group_id, str) or not group_id.startswith("$"):
+        return None
+    if not all(_is_count_accumulator(value) for key, value in group.items() if key != "_id"):
+        return None
+    if not all(next(iter(stage)) in _DISTINCT_TRAILING_STAGES for stage in pipeline[1:]):
+        return None
+
+    field = group_id[1:]
+    if match is not None and not _is_existence_match(match, field):
+        return None
+    return field
+
+
+def _distinct_shape(pipeline: list) -> str:
+    """Key of a distinct pipeline: equal only for pipelines with the same output."""
+    stages = []
+    for stage in pipeline:
+        name, spec = next(iter(stage.items()))
+        if name == "$group":
+            spec = {key: value if key == "_id" else {"$sum": 1} for key, value in sorted(spec.items())}
+        elif name == "$match":
+            spec = {field: dict(sorted(condition.items())) for field, condition in spec.items()}
+        # $sort keeps its key order: it is the sort priority
+        stages.append({name: spec})
+    return json.dumps(stages, default=str)
+
+
+def metadata_key(tool_name: str, arguments: Dict[str, Any]) -> Optional[Tuple[str, ...]]:
+    """Cache key for a metadata tool call, or None if the call is not cacheable."""
+    field = distinct_field(tool_name, arguments)
+    if field is not None:
+        return (
+            "distinct", str(arguments.get("database")), str(arguments.get("collection")), field,
+            _distinct_shape(arguments["pipeline"])
+        )
+    if tool_name in CACHEABLE_TOOLS:
+        return (tool_name, json.dumps(arguments, sort_keys=True, default=str))
+    return None
+
+
+class MetadataCache:
+    """TTL cache of metadata tool results shared by all queries of an agent."""
+
+    def __init__(self, ttl_seconds: float = 600.0):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, ...], Tuple[float, Any]] = {}
+        self._inflight: Dict[Tuple[str, ...], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[Any]:
+        """Return the cached result of a metadata call, or None."""
+        key = metadata_key(tool_name, arguments)
+        if key is None:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[1]
+
+    def has(self, tool_name: str, arguments: Dict[str, Any]) -> bool:
+        """True if a fresh result is cached (does not count as a hit or miss)."""
+        entry = self._entries.get(metadata_key(tool_name, arguments))
+        return entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds
+
+    def track(self, tool_name: str, arguments: Dict[str, Any], future: asyncio.Future) -> None:
+        """Register a running lookup so others can wait for it (see inflight)."""
+        key = metadata_key(tool_name, arguments)
+        if key is None:
+            return
+        self._inflight[key] = future
+
+        def untrack(done: asyncio.Future) -> None:
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+
+        future.add_done_callback(untrack)
+
+    def inflight(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[asyncio.Future]:
+        """Running lookup for the same metadata on the current event loop, or None."""
+        future = self._inflight.get(metadata_key(tool_name, arguments))
+        if future is None or future.done() or future.get_loop() is not asyncio.get_running_loop():
+            return None
+        return future
+
+    def put(self, tool_name: str, arguments: Dict[str, Any], result: Any) -> None:
+        """Store the result of a successful metadata call (ignored for other calls)."""
+        key = metadata_key(tool_name, arguments)
+        if key is not None:
+            self._entries[key] = (time.monotonic(), result)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "inflight": len(self._inflight), "hits": self.hits, "misses": self.misses}
@@ -1,12 +1,34 @@
 import asyncio
 import os
 import json
+import re
+import threading
+import time
+import weakref
+from string import Template
+from contextlib import AsyncExitStack, asynccontextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union, Callable, AsyncContextManager
 
 from mcp import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
-from openai import OpenAI
+from mcp.types import CallToolResult, ListToolsResult
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+from cassette import Cassette, content_hash
+from instrumentation import QueryTrace, TraceSink, record_usage, sinks_from_env, span
+from metadata_cache import MetadataCache, distinct_pipeline, metadata_key
+from query_classifier import classify_difficulty, is_report_question
+from query_log import QUERY_TOOLS, QueryLog, is_target_query, query_call, query_fields
+from query_planner import (
+    PLAN_VALIDATION_MODES, explain_arguments, is_collection_scan, plan_hint, rewrite_query_arguments
+)
+from resilience import TRANSIENT_ERRORS, CompletionStats, LatencyWindow, backoff_delay, hedged
+from report_pipelines import REPORT_PROMPT, RUN_REPORT_TOOL, report_arguments
+from rollups import QUERY_DAILY_ROLLUP_TOOL, rollup_query_arguments
+from session_pool import MCPSessionPool
+from single_flight import SingleFlight, flight_key
 
 
 events_schema = """
@@ -299,6 +321,47 @@ Field: visitorId
 # CORE AI AGENT - Can be used independently for evaluation
 # ============================================================================
 
+# How far the agent loop runs:
+#   full         until the model stops calling tools and answers itself
+#   query_only   stop as soon as a find/aggregate succeeds (callers only need collection/filter)
+#   fast_answer  like query_only, but render the final answer locally from FAST_ANSWER_TEMPLATE
+STOP_MODES = ("full", "query_only", "fast_answer")
+
+FAST_ANSWER_TEMPLATE = Template("""Ran `$tool` on the `$collection` collection with:
+```json
+$query
+```
+
+$result""")
+
+FAST_ANSWER_MAX_CHARS = 4000
+
+# Iterations allowed per query difficulty (see query_classifier.py) when
+# adaptive_iterations is enabled, instead of the fixed max_iterations
+ITERATION_BUDGETS = {"easy": 4, "medium": 6, "hard": 8}
+
+# Metadata the model asks for in its first tool round of almost every query;
+# warmup() primes it and the agent prefetches it alongside the first completion
+METADATA_COLLECTION = "events"
+METADATA_ENUM_FIELDS = ("type", "entryType", "leaveType")
+
+class _LazySession:
+    """
+    Defers opening the MCP session until a tool call actually needs it, so
+    queries fully served from a cassette never touch the network.
+    """
+    
+    def __init__(self, opener):
+        self._opener = opener
+        self._session = None
+    
+    async def get(self) -> ClientSession:
+        if self._session is None:
+            with span("session_setup"):
+                self._session = await self._opener()
+        return self._session
+
+
 class MongoDBAgent:
     """
     MongoDB AI Agent that uses OpenAI and MCP tools to query MongoDB.
@@ -312,14 +375,89 @@ class MongoDBAgent:
         database_name: Optional[str] = None,
         mcp_server_url: str = "http://localhost:3000/mcp",
         model: str = "gpt-4.1",
-        max_iterations: int = 5
+        fast_model: Optional[str] = None,
+        max_iterations: int = 5,
+        cassette: Optional[Cassette] = None,
+        mcp_pool_size: int = 8,
+        metadata_cache_ttl: float = 600.0,
+        trace_sinks: Optional[List[TraceSink]] = None,
+        openai_client: Optional[Any] = None,
+        session_factory: Optional[Callable[[], AsyncContextManager[ClientSession]]] = None,
+        stop_mode: str = "full",
+        deadline_s: Optional[float] = None,
+        completion_timeout_s: Optional[float] = None,
+        tool_timeout_s: Optional[float] = None,
+        adaptive_iterations: bool = False,
+        completion_retries: int = 2,
+        retry_base_delay_s: float = 0.5,
+        retry_max_delay_s: float = 8.0,
+        hedge_completions: bool = False,
+        prefetch_metadata: bool = True,
+        plan_validation: str = "rewrite",
+        query_log: Optional[QueryLog] = None,
+        page_size: Optional[int] = 50,
+        daily_rollups: bool = False,
+        coalesce_queries: bool = False
     ):
         self.openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
         self.mongodb_connection_string = mongodb_connection_string or os.getenv("MDB_MCP_CONNECTION_STRING")
         self.database_name = database_name or os.getenv("MDB_MCP_DATABASE")
         self.mcp_server_url = mcp_server_url
         self.model = model
+        # Easy questions (see query_classifier.py) are tried on this cheaper model
+        # first and redone with `model` when the result fails _escalation_reason()
+        self.fast_model = fast_model
         self.max_iterations = max_iterations
+        if stop_mode not in STOP_MODES:
+            raise ValueError(f"Unknown stop mode '{stop_mode}', expected one of {STOP_MODES}")
+        self.stop_mode = stop_mode
+        # Wall-clock bounds in seconds (None = unbounded): for the whole query and
+        # for each completion / tool call; in-flight calls are cancelled when hit
+        self.deadline_s = deadline_s
+        self.completion_timeout_s = completion_timeout_s
+        self.tool_timeout_s = tool_timeout_s
+        self.adaptive_iterations = adaptive_iterations
+        # Transient completion errors are retried with jittered backoff; with hedging,
+        # completions slower than the recent p95 are raced by a duplicate (see resilience.py)
+        self.completion_retries = completion_retries
+        self.retry_base_delay_s = retry_base_delay_s
+        self.retry_max_delay_s = retry_max_delay_s
+        self.hedge_completions = hedge_completions
+        self.completion_latency = LatencyWindow()
+        self.completion_stats = CompletionStats()
+        # Checks on generated find/aggregate calls before they run (see query_planner.py)
+        if plan_validation not in PLAN_VALIDATION_MODES:
+            raise ValueError(f"Unknown plan validation '{plan_validation}', expected one of {PLAN_VALIDATION_MODES}")
+        self.plan_validation = plan_validation
+        # Finds are capped to one page for the model; larger result sets are
+        # counted and paged to the caller instead (see result_pager.py). None disables
+        self.page_size = page_size
+        # Record/replay of LLM and MCP calls (see cassette.py), configurable via AGENT_CASSETTE_MODE
+        self.cassette = cassette if cassette is not None else Cassette.from_env()
+        self.mcp_pool_size = mcp_pool_size
+        # Schema / unique-value lookups shared by all queries (see metadata_cache.py)
+        self.metadata_cache = MetadataCache(ttl_seconds=metadata_cache_ttl)
+        # Speculatively load uncached metadata while the first completion runs
+        self.prefetch_metadata = prefetch_metadata
+        self._mcp_tools = None
+        # Exporters for per-query traces (see instrumentation.py), configurable via AGENT_TRACE_*
+        self.trace_sinks = trace_sinks if trace_sinks is not None else sinks_from_env()
+        # Generated queries for index_advisor.py (see query_log.py), configurable via AGENT_QUERY_LOG
+        self.query_log = query_log if query_log is not None else QueryLog.from_env()
+        # Optional replacements for the OpenAI client and MCP transport (e.g. fake
+        # backends in run_benchmark.py); by default both are created per event loop
+        self._injected_openai_client = openai_client
+        self._session_factory = session_factory or self._session_context
+        # Tools run by the agent itself rather than the MCP server:
+        # name -> (OpenAI function definition, handler returning (result, error, executed call))
+        self._local_tools = {
+            "run_report": (RUN_REPORT_TOOL, self._run_report),
+        }
+        if daily_rollups:
+            # Only when events_daily is maintained by rollups.py
+            self._local_tools["query_daily_rollup"] = (QUERY_DAILY_ROLLUP_TOOL, self._query_daily_rollup)
+        # Identical questions asked concurrently share one agent run (see single_flight.py)
+        self.single_flight = SingleFlight() if coalesce_queries else None
 
         # self.mongo_client = MongoClient(self.mongodb_connection_string)
         # db = self.mongo_client[self.database_name]
@@ -332,7 +470,42 @@ class MongoDBAgent:
         if not self.database_name:
             raise ValueError("Database name not provided")
         
-        self.openai_client = OpenAI(api_key=self.openai_api_key)
+        # OpenAI clients and MCP session pools are bound to the event loop they
+        # were created in, so they are kept per loop and reused by every query on it
+        self._openai_clients = weakref.WeakKeyDictionary()
+        self._session_pools = weakref.WeakKeyDictionary()
+        
+        # Persistent event loop used by the synchronous wrappers, so pooled
+        # sessions and HTTP connections survive across query_sync() calls
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+    
+    @property
+    def openai_client(self) -> AsyncOpenAI:
+        """Async OpenAI client for the running event loop."""
+        if self._injected_openai_client is not None:
+            return self._injected_openai_client
+        
+        loop = asyncio.get_running_loop()
+        client = self._openai_clients.get(loop)
+        if client is None:
+            # The agent retries transient errors itself (_live_completion); SDK
+            # retries on top would multiply the attempts per completion
+            retries = {"max_retries": 0} if self.completion_retries else {}
+            client = AsyncOpenAI(api_key=self.openai_api_key, **retries)
+            self._openai_clients[loop] = client
+        return client
+    
+    @property
+    def session_pool(self) -> MCPSessionPool:
+        """MCP session pool for the running event loop."""
+        loop = asyncio.get_running_loop()
+        pool = self._session_pools.get(loop)
+        if pool is None:
+            pool = MCPSessionPool(self._session_factory, max_size=self.mcp_pool_size)
+            self._session_pools[loop] = pool
+        return pool
     
     @staticmethod
     def _convert_mcp_tools_to_openai_format(mcp_tools):
@@ -364,24 +537,22 @@ class MongoDBAgent:
         except Exception as e:
             return None, str(e)
     
-    async def query(self, user_query: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    async def _bounded(awaitable, stage_timeout: Optional[float], deadline: Optional[float]):
         """
-        Process a user query and return the result.
-        This is the main entry point for evaluation.
-        
-        Args:
-            user_query: Natural language query from the user
-            
-        Returns:
-            Dictionary containing the query results with structure:
-            {
-                "collection": str,
-                "filter": dict,
-                "iterations": List[dict],
-                "final_answer": str
-            }
+        Await with the tighter of the stage timeout and the time left until the
+        query deadline (a time.monotonic() value). The awaitable is cancelled
+        when the bound is hit and asyncio.TimeoutError is raised.
         """
-        print('user_query', user_query)
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        timeouts = [t for t in (stage_timeout, remaining) if t is not None]
+        if not timeouts:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, max(0.0, min(timeouts)))
+    
+    @asynccontextmanager
+    async def _session_context(self):
+        """Open an MCP session and connect it to MongoDB. Used by the session pool."""
         async with streamablehttp_client(self.mcp_server_url) as (
             read_stream,
             write_stream,
@@ -395,41 +566,500 @@ class MongoDBAgent:
                     'connect', 
                     {"connectionString": self.mongodb_connection_string}
                 )
+                yield session
+    
+    async def _list_tools(self, session: "_LazySession"):
+        """List MCP tools once per agent, served from the cassette when replaying."""
+        if self._mcp_tools is not None:
+            return self._mcp_tools
+        
+        with span("list_tools"):
+            if self.cassette:
+                recorded = self.cassette.lookup("list_tools", {"server": self.mcp_server_url})
+                if recorded is not None:
+                    return ListToolsResult.model_validate(recorded).tools
+            
+            tools_response = await (await session.get()).list_tools()
+            if self.cassette:
+                self.cassette.record("list_tools", {"server": self.mcp_server_url}, tools_response)
+            self._mcp_tools = tools_response.tools
+            return self._mcp_tools
+    
+    async def _call_tool(self, session: "_LazySession", tool_name: str, arguments: Dict[str, Any]):
+        """
+        Execute an MCP tool, served from the metadata cache or the cassette
+        when possible. Returns (result, error).
+        """
+        with span("tool_call", tool=tool_name) as tool_span:
+            result, error, tool_span["source"] = await self._resolve_tool_call(session, tool_name, arguments)
+            tool_span["bytes"] = len(str(result.content)) if result is not None else 0
+            if error is not None:
+                tool_span["error"] = error
+            return result, error
+    
+    async def _dispatch_tool(self, session: "_LazySession", tool_name: str, arguments: Dict[str, Any]):
+        """
+        Run a local or MCP tool. Returns (result, error, executed) where executed
+        is the (tool, arguments) of the MCP call that was made, if any.
+        """
+        if tool_name in self._local_tools:
+            with span("local_tool", tool=tool_name):
+                return await self._local_tools[tool_name][1](session, arguments)
+        
+        result, error = await self._call_tool(session, tool_name, arguments)
+        return result, error, (tool_name, arguments)
+    
+    async def _run_report(self, session: "_LazySession", arguments: Dict[str, Any]):
+        """Local run_report tool: a built-in report pipeline run with the MCP aggregate tool."""
+        try:
+            aggregate_args = report_arguments(arguments, self.database_name)
+        except ValueError as e:
+            return None, str(e), None
+        result, error = await self._call_tool(session, "aggregate", aggregate_args)
+        return result, error, ("aggregate", aggregate_args)
+    
+    async def _query_daily_rollup(self, session: "_LazySession", arguments: Dict[str, Any]):
+        """Local query_daily_rollup tool: counts read from events_daily with the MCP aggregate tool."""
+        try:
+            aggregate_args = rollup_query_arguments(arguments, self.database_name)
+        except ValueError as e:
+            return None, str(e), None
+        result, error = await self._call_tool(session, "aggregate", aggregate_args)
+        return result, error, ("aggregate", aggregate_args)
+    
+    async def _resolve_tool_call(self, session: "_LazySession", tool_name: str, arguments: Dict[str, Any]):
+        """Returns (result, error, source) where source is metadata_cache, prefetch, cassette or live."""
+        cached = self.metadata_cache.get(tool_name, arguments)
+        if cached is not None:
+            self._record_served(tool_name, arguments, cached)
+            return cached, None, "metadata_cache"
+        
+        inflight = self.metadata_cache.inflight(tool_name, arguments)
+        if inflight is not None:
+            # Wait for the prefetch without cancelling it if this call times out;
+            # fall through to a call of our own if it failed
+            await asyncio.wait({inflight})
+            if not inflight.cancelled() and inflight.exception() is None:
+                result, error, _ = inflight.result()
+                if error is None:
+                    self._record_served(tool_name, arguments, result)
+                    return result, None, "prefetch"
+        
+        return await self._fetch_tool_call(session, tool_name, arguments)
+    
+    def _record_served(self, tool_name: str, arguments: Dict[str, Any], result) -> None:
+        """
+        Record a result served from the metadata cache or a prefetch under the
+        model's own request. Replays run without prefetch and start with an empty
+        cache, so they look the model's call up in the cassette.
+        """
+        if self.cassette:
+            self.cassette.record("tool_call", {"name": tool_name, "arguments": arguments}, {"result": result, "error": None})
+    
+    async def _fetch_tool_call(self, session: "_LazySession", tool_name: str, arguments: Dict[str, Any]):
+        """Cassette or live part of _resolve_tool_call; successful metadata results are cached."""
+        request = {"name": tool_name, "arguments": arguments}
+        if self.cassette:
+            recorded = self.cassette.lookup("tool_call", request)
+            if recorded is not None:
+                if recorded.get("error") is not None:
+                    return None, recorded["error"], "cassette"
+                return CallToolResult.model_validate(recorded["result"]), None, "cassette"
+        
+        result, error = await self._execute_mcp_tool(await session.get(), tool_name, arguments)
+        if self.cassette:
+            self.cassette.record("tool_call", request, {"result": result, "error": error})
+        if error is None and not getattr(result, "isError", False):
+            self.metadata_cache.put(tool_name, arguments, result)
+        return result, error, "live"
+    
+    async def _check_query_plan(
+        self,
+        session: "_LazySession",
+        tool_name: str,
+        arguments: Dict[str, Any],
+        deadline: Optional[float],
+        allow_hint: bool
+    ):
+        """
+        Rewrite a find/aggregate call and, in explain mode, check its query plan.
+        Returns (arguments to run, rewrite notes, hint for the model or None).
+        """
+        if tool_name not in QUERY_TOOLS or self.plan_validation == "off":
+            return arguments, [], None
+        
+        arguments, rewrites = rewrite_query_arguments(tool_name, arguments)
+        if self.plan_validation != "explain" or not allow_hint:
+            return arguments, rewrites, None
+        
+        try:
+            result, error = await self._bounded(
+                self._call_tool(session, "explain", explain_arguments(tool_name, arguments)),
+                self.tool_timeout_s,
+                deadline
+            )
+        except asyncio.TimeoutError:
+            # The query itself will hit the same bound; don't block it on the check
+            return arguments, rewrites, None
+        
+        if (error is None and result is not None and not getattr(result, "isError", False)
+                and is_collection_scan(self._result_text(result))):
+            return arguments, rewrites, plan_hint(tool_name, arguments)
+        return arguments, rewrites, None
+    
+    def _cap_find_limit(self, tool_name: str, arguments: Dict[str, Any]):
+        """Limit a find to one page. Returns (arguments, whether the limit was capped)."""
+        if tool_name != "find" or not self.page_size:
+            return arguments, False
+        limit = arguments.get("limit")
+        if isinstance(limit, int) and 0 < limit <= self.page_size:
+            return arguments, False
+        return {**arguments, "limit": self.page_size}, True
+    
+    async def _count_matches(
+        self,
+        session: "_LazySession",
+        arguments: Dict[str, Any],
+        deadline: Optional[float]
+    ) -> Optional[int]:
+        """Number of documents matching a find via the MCP count tool, or None if it fails."""
+        count_args = {
+            "database": arguments.get("database"),
+            "collection": arguments.get("collection"),
+            "query": arguments.get("filter") or {}
+        }
+        try:
+            result, error = await self._bounded(
+                self._call_tool(session, "count", count_args),
+                self.tool_timeout_s,
+                deadline
+            )
+        except asyncio.TimeoutError:
+            return None
+        if error is not None or result is None or getattr(result, "isError", False):
+            return None
+        match = re.search(r"\d+", self._result_text(result))
+        return int(match.group()) if match else None
+    
+    def _metadata_lookups(self, collection: str, enum_fields: tuple) -> List[tuple]:
+        """(tool, arguments) of the schema and unique-value lookups for a collection."""
+        lookups = [("collection-schema", {"database": self.database_name, "collection": collection})]
+        lookups += [
+            ("aggregate", {
+                "database": self.database_name,
+                "collection": collection,
+                "pipeline": distinct_pipeline(field)
+            })
+            for field in enum_fields
+        ]
+        return lookups
+    
+    def _start_prefetch(self, session: "_LazySession") -> List[asyncio.Task]:
+        """
+        Start the metadata lookups missing from the cache in the background.
+        The model's own calls for them wait for these tasks instead of calling again.
+        """
+        if not self.prefetch_metadata or (self.cassette and self.cassette.replaying):
+            return []
+        
+        async def prefetch(tool_name, arguments):
+            with span("prefetch", tool=tool_name) as prefetch_span:
+                try:
+                    result, error, prefetch_span["source"] = await self._fetch_tool_call(session, tool_name, arguments)
+                except Exception as e:
+                    result, error = None, f"{type(e).__name__}: {e}"
+                if error is not None:
+                    prefetch_span["error"] = error
+                return result, error, prefetch_span.get("source")
+        
+        tasks = []
+        for tool_name, arguments in self._metadata_lookups(METADATA_COLLECTION, METADATA_ENUM_FIELDS):
+            if self.metadata_cache.has(tool_name, arguments) or self.metadata_cache.inflight(tool_name, arguments):
+                continue
+            task = asyncio.ensure_future(prefetch(tool_name, arguments))
+            self.metadata_cache.track(tool_name, arguments, task)
+            tasks.append(task)
+        return tasks
+    
+    async def _create_completion(self, **request) -> ChatCompletion:
+        """Call the chat completions API, served from the cassette when replaying."""
+        with span("completion", model=request.get("model"), source="live") as completion_span:
+            response = None
+            if self.cassette:
+                recorded = self.cassette.lookup("completion", request)
+                if recorded is not None:
+                    response = ChatCompletion.model_validate(recorded)
+                    completion_span["source"] = "cassette"
+            
+            if response is None:
+                response = await self._live_completion(request, completion_span)
+                if self.cassette:
+                    self.cassette.record("completion", request, response)
+            
+            record_usage(completion_span, response.usage)
+            return response
+    
+    async def _live_completion(self, request: Dict[str, Any], completion_span: Dict[str, Any]) -> ChatCompletion:
+        """Call the API, retrying transient errors and hedging slow requests."""
+        stats = self.completion_stats
+        for attempt in range(self.completion_retries + 1):
+            delay = self.completion_latency.hedge_delay() if self.hedge_completions else None
+            start = time.perf_counter()
+            stats.requests += 1
+            try:
+                response, hedge_fired, hedge_won = await hedged(
+                    lambda: self.openai_client.chat.completions.create(**request), delay
+                )
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.completion_retries:
+                    raise
+                stats.retries += 1
+                completion_span["retries"] = attempt + 1
+                wait = backoff_delay(attempt, self.retry_base_delay_s, self.retry_max_delay_s, e)
+                print(f"Completion failed ({type(e).__name__}), retrying in {wait:.2f}s")
+                await asyncio.sleep(wait)
+                continue
+            
+            self.completion_latency.add(time.perf_counter() - start)
+            if hedge_fired:
+                stats.hedges_fired += 1
+                stats.hedges_won += hedge_won
+                completion_span["hedged"] = True
+                completion_span["hedge_won"] = hedge_won
+            return response
+    
+    async def warmup(
+        self,
+        prime_metadata: bool = True,
+        collection: str = METADATA_COLLECTION,
+        enum_fields: tuple = METADATA_ENUM_FIELDS
+    ) -> Dict[str, float]:
+        """
+        Pay cold-start costs eagerly instead of on the first user query.
+        
+        Opens and connects a pooled MCP session, lists the tools, opens the
+        TLS connection to OpenAI and optionally primes the metadata cache
+        with the collection schema and the unique values of enum fields.
+        
+        Args:
+            prime_metadata: Also load the schema and enum values of the collection
+            collection: Collection whose metadata is primed
+            enum_fields: Fields whose unique values are primed
+            
+        Returns:
+            Seconds spent in each warm-up stage
+        """
+        timings = {}
+        
+        async def timed(stage, coro):
+            start = time.perf_counter()
+            await coro
+            timings[stage] = time.perf_counter() - start
+        
+        async with AsyncExitStack() as stack:
+            session = _LazySession(lambda: stack.enter_async_context(self.session_pool.session()))
+            
+            await asyncio.gather(
+                timed("mcp_session", session.get()),
+                timed("openai_connection", self.openai_client.models.retrieve(self.model)),
+            )
+            await timed("list_tools", self._list_tools(session))
+            
+            if prime_metadata:
+                lookups = self._metadata_lookups(collection, enum_fields)
+                await timed("metadata", asyncio.gather(
+                    *(self._call_tool(session, name, args) for name, args in lookups)
+                ))
+        
+        print('warmup', {stage: round(seconds, 3) for stage, seconds in timings.items()})
+        return timings
+    
+    def warmup_sync(self, **kwargs) -> Dict[str, float]:
+        """Synchronous wrapper for warmup(), run on the same loop as query_sync()."""
+        return self._run_sync(self.warmup(**kwargs))
+    
+    async def query(
+        self,
+        user_query: Union[str, Dict[str, Any]],
+        stop_mode: Optional[str] = None,
+        deadline_s: Optional[float] = None,
+        on_iteration: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Process a user query and return the result.
+        This is the main entry point for evaluation.
+        
+        Args:
+            user_query: Natural language query from the user, either plain text
+                or a dict with "text" and optional "today_date"
+            stop_mode: Overrides the agent's stop mode for this query (see STOP_MODES)
+            deadline_s: Overrides the agent's wall-clock deadline for this query
+            on_iteration: Called with each iteration's data as soon as it completes
+                (e.g. to stream progress); such queries are never coalesced
+            
+        Returns:
+            Dictionary containing the query results with structure:
+            {
+                "collection": str,
+                "filter": dict,
+                "iterations": List[dict],
+                "final_answer": str,
+                "difficulty": str,        # easy / medium / hard, see query_classifier.py
+                "iteration_budget": int,
+                "stop_reason": str,       # answered, query_found, max_iterations,
+                                          # completion_timeout or deadline_exceeded
+                "pagination": dict,       # set when a find matched more than page_size
+                                          # documents, see result_pager.py
+                "coalesced": bool,        # answered by an identical concurrent query,
+                                          # only set with coalesce_queries
+                "model": str,             # model that produced the result
+                "escalation": dict,       # set when fast_model's result was rejected:
+                                          # {"from_model", "reason", "stop_reason"}
+                "trace": dict   # per-stage spans and totals, see instrumentation.py
+            }
+        """
+        print('user_query', user_query)
+        if isinstance(user_query, str):
+            user_query = {"text": user_query}
+        
+        stop_mode = stop_mode or self.stop_mode
+        if stop_mode not in STOP_MODES:
+            raise ValueError(f"Unknown stop mode '{stop_mode}', expected one of {STOP_MODES}")
+        
+        deadline_s = deadline_s if deadline_s is not None else self.deadline_s
+        
+        if self.single_flight is not None and on_iteration is None:
+            key = flight_key(user_query, self.database_name, stop_mode, deadline_s)
+            return await self.single_flight.run(key, lambda: self._traced_query(user_query, stop_mode, deadline_s))
+        return await self._traced_query(user_query, stop_mode, deadline_s, on_iteration)
+    
+    async def _traced_query(
+        self,
+        user_query: Dict[str, Any],
+        stop_mode: str,
+        deadline_s: Optional[float],
+        on_iteration: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        deadline = time.monotonic() + deadline_s if deadline_s is not None else None
+        
+        difficulty = classify_difficulty(user_query)
+        budget = ITERATION_BUDGETS[difficulty] if self.adaptive_iterations else self.max_iterations
+        
+        model = self.fast_model if self.fast_model and difficulty == "easy" else self.model
+        escalation = None
+        
+        trace = QueryTrace(user_query.get("text"))
+        with trace.activate():
+            query_result = await self._query(user_query, stop_mode, budget, deadline, on_iteration, model)
+            
+            reason = self._escalation_reason(query_result) if model != self.model else None
+            if reason and self._timeout_reason(deadline, None) is None:
+                print(f"Escalating from {model} to {self.model}: {reason}")
+                escalation = {"from_model": model, "reason": reason, "stop_reason": query_result.get("stop_reason")}
+                model = self.model
+                query_result = await self._query(user_query, stop_mode, budget, deadline, on_iteration, model)
+        
+        query_result["model"] = model
+        query_result["escalation"] = escalation
+        query_result["difficulty"] = difficulty
+        query_result["iteration_budget"] = budget
+        query_result["trace"] = trace.to_dict()
+        self._export_trace(query_result["trace"])
+        if self.query_log:
+            try:
+                self.query_log.append(user_query, query_result)
+            except Exception as e:
+                print(f"Error writing query log: {e}")
+        return query_result
+    
+    def _export_trace(self, trace: Dict[str, Any]) -> None:
+        for sink in self.trace_sinks:
+            try:
+                sink.export(trace)
+            except Exception as e:
+                print(f"Error exporting trace to {type(sink).__name__}: {e}")
+    
+    async def _query(
+        self,
+        user_query: Dict[str, Any],
+        stop_mode: str,
+        max_iterations: int,
+        deadline: Optional[float],
+        on_iteration: Optional[Callable[[Dict[str, Any]], None]] = None,
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        async with AsyncExitStack() as stack:
+            # Borrow a pooled session; it goes back to the pool when the query ends
+            session = _LazySession(lambda: stack.enter_async_context(self.session_pool.session()))
+            try:
+                if not (self.cassette and self.cassette.replaying):
+                    # Without a cassette to replay from, every query needs the live session
+                    await self._bounded(session.get(), None, deadline)
                 
                 # Get available tools
-                tools_response = await session.list_tools()
-                
-                # Run the agent query
+                mcp_tools = await self._bounded(self._list_tools(session), None, deadline)
+            except asyncio.TimeoutError:
+                query_result = self._extract_query_from_iterations([])
+                query_result.update({"iterations": [], "stop_reason": "deadline_exceeded"})
+                return query_result
+            
+            # Load schema/enum metadata concurrently with the first completion
+            prefetches = self._start_prefetch(session)
+            
+            # Run the agent query
+            try:
                 iterations = await self._run_agent_loop(
                     session, 
                     user_query, 
-                    tools_response.tools
+                    mcp_tools,
+                    stop_mode,
+                    max_iterations,
+                    deadline,
+                    on_iteration,
+                    model
                 )
-                
-                # Extract MongoDB query from tool calls
-                query_result = self._extract_query_from_iterations(iterations)
-                query_result["iterations"] = iterations
-                
-                return query_result
+            finally:
+                # Don't leave lookups running on a session that goes back to the pool
+                for task in prefetches:
+                    task.cancel()
+            
+            # Extract MongoDB query from tool calls
+            query_result = self._extract_query_from_iterations(iterations)
+            query_result["iterations"] = iterations
+            query_result["stop_reason"] = iterations[-1].get("stop_reason") if iterations else None
+            query_result["pagination"] = self._pagination(iterations)
+            
+            return query_result
     
-    async def _run_agent_loop(
-        self, 
-        session, 
-        user_query: Dict[str, Any], 
-        mcp_tools
-    ) -> List[Dict[str, Any]]:
-        """Run the agent loop with tool calling."""
+    def fingerprint(self, stop_mode: Optional[str] = None, deadline_s: Optional[float] = None) -> str:
+        """
+        Hash of the configuration that shapes the agent's answers: prompts and
+        schema, models, iteration/stop settings and local tool definitions.
+        Evaluation results of an agent with the same fingerprint can be reused.
         
-        openai_tools = self._convert_mcp_tools_to_openai_format(mcp_tools)
-
-        # print('\n\nuser_query: \n', user_query)
+        Args:
+            stop_mode: Stop mode the queries are run with, if overridden per query
+            deadline_s: Deadline the queries are run with, if overridden per query
+        """
+        return content_hash({
+            "system_prompt": self._system_prompt({"text": "", "today_date": "<today>"}),
+            "report_prompt": REPORT_PROMPT,
+            "model": self.model,
+            "fast_model": self.fast_model,
+            "max_iterations": self.max_iterations,
+            "iteration_budgets": ITERATION_BUDGETS if self.adaptive_iterations else None,
+            # Effective per-query options, as resolved by query()
+            "stop_mode": stop_mode or self.stop_mode,
+            "deadline_s": deadline_s if deadline_s is not None else self.deadline_s,
+            "plan_validation": self.plan_validation,
+            "page_size": self.page_size,
+            "local_tools": [definition for definition, _ in self._local_tools.values()],
+        })
+    
+    def _system_prompt(self, user_query: Dict[str, Any]) -> str:
+        """System prompt of the agent loop for a query."""
         current_date = user_query.get("today_date")
-        querry_text = user_query.get("text")
-        
-        messages = [
-            {
-                "role": "system",
-                "content": f"""You are a MongoDB expert assistant. You have access to MongoDB MCP tools to query and analyze data.
+        return f"""You are a MongoDB expert assistant. You have access to MongoDB MCP tools to query and analyze data.
                   The database you're working with is: {self.database_name}
                   The schema of the collection you are querying is: \n\n {events_schema} \n\n
 
@@ -443,10 +1073,45 @@ class MongoDBAgent:
                   - you need to check the schema of the collection before performing any find or aggregate operation
                   - whenever you need to use any field that is not name or date, first check unique values of that field. This should generally apply to all information that could potentially be described as enums
                   - Check in/out events are in the events collection
+                  {REPORT_PROMPT if is_report_question(user_query) else ""}
 
                   The current date is {current_date}
 
                   Analyze the user's question and use the appropriate tools to answer it."""
+    
+    async def _run_agent_loop(
+        self, 
+        session, 
+        user_query: Dict[str, Any], 
+        mcp_tools,
+        stop_mode: str = "full",
+        max_iterations: Optional[int] = None,
+        deadline: Optional[float] = None,
+        on_iteration: Optional[Callable[[Dict[str, Any]], None]] = None,
+        model: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run the agent loop with tool calling.
+        
+        Stops after max_iterations (defaults to the agent's) or when the
+        deadline passes; a completion that times out ends the loop, a tool
+        call that times out is reported to the model as an error.
+        Each finished iteration is passed to on_iteration, if given.
+        Completions use model, defaulting to the agent's.
+        """
+        max_iterations = max_iterations or self.max_iterations
+        model = model or self.model
+        
+        openai_tools = self._convert_mcp_tools_to_openai_format(mcp_tools)
+        openai_tools += [definition for definition, _ in self._local_tools.values()]
+
+        # print('\n\nuser_query: \n', user_query)
+        querry_text = user_query.get("text")
+        
+        messages = [
+            {
+                "role": "system",
+                "content": self._system_prompt(user_query)
             },
             {
                 "role": "user",
@@ -456,23 +1121,42 @@ class MongoDBAgent:
         
         iteration = 0
         results = []
+        plan_hinted = False
+        
+        def record(iteration_data):
+            results.append(iteration_data)
+            if on_iteration is not None:
+                try:
+                    on_iteration(iteration_data)
+                except Exception as e:
+                    print(f"Error in iteration callback: {e}")
         
-        while iteration < self.max_iterations:
+        while iteration < max_iterations:
             iteration += 1
             
             iteration_data = {
                 "iteration": iteration,
+                "model": model,
                 "tool_calls": [],
                 "final_answer": None
             }
             
             # Call OpenAI with available tools
-            response = self.openai_client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=openai_tools,
-                tool_choice="auto"
-            )
+            try:
+                response = await self._bounded(
+                    self._create_completion(
+                        model=model,
+                        messages=messages,
+                        tools=openai_tools,
+                        tool_choice="auto"
+                    ),
+                    self.completion_timeout_s,
+                    deadline
+                )
+            except asyncio.TimeoutError:
+                iteration_data["stop_reason"] = self._timeout_reason(deadline, "completion_timeout")
+                record(iteration_data)
+                break
             
             assistant_message = response.choices[0].message
             messages.append(assistant_message)
@@ -483,18 +1167,66 @@ class MongoDBAgent:
                     tool_name = tool_call.function.name
                     tool_args = json.loads(tool_call.function.arguments)
                     
-                    # Execute the MCP tool
-                    result, error = await self._execute_mcp_tool(session, tool_name, tool_args)
+                    # Make generated queries index friendly before they hit the database
+                    tool_args, rewrites, hint = await self._check_query_plan(
+                        session, tool_name, tool_args, deadline, allow_hint=not plan_hinted
+                    )
+                    
+                    # Large finds: only the first page goes to the model, counted in parallel
+                    requested_limit = tool_args.get("limit") if tool_name == "find" else None
+                    tool_args, capped = self._cap_find_limit(tool_name, tool_args)
+                    count_task = None
+                    
+                    executed = None
+                    if hint is not None:
+                        # Collection scan: send the hint back instead of running it (once per query)
+                        plan_hinted = True
+                        result, error = None, hint
+                    else:
+                        if capped:
+                            count_task = asyncio.ensure_future(self._count_matches(session, tool_args, deadline))
+                        
+                        # Execute the MCP tool
+                        try:
+                            result, error, executed = await self._bounded(
+                                self._dispatch_tool(session, tool_name, tool_args),
+                                self.tool_timeout_s,
+                                deadline
+                            )
+                        except asyncio.TimeoutError:
+                            result, error = None, "Tool call timed out"
+                            if self._timeout_reason(deadline, None) is not None:
+                                # Out of time for the whole query, not just this call
+                                iteration_data["stop_reason"] = "deadline_exceeded"
                     
                     tool_data = {
                         "name": tool_name,
                         "arguments": tool_args,
-                        "success": error is None,
+                        "success": self._is_successful_result(result, error),
                         "error": error
                     }
+                    if rewrites:
+                        tool_data["rewrites"] = rewrites
+                    if hint is not None:
+                        tool_data["plan_rejected"] = True
+                    if executed is not None and executed[0] != tool_name:
+                        # Local tool: keep the MongoDB query it ran for extraction
+                        tool_data["executed"] = {"name": executed[0], "arguments": executed[1]}
+                    
+                    total = await count_task if count_task is not None else None
+                    if requested_limit:
+                        total = min(total, requested_limit) if total is not None else None
                     
                     if result:
                         result_content = str(result.content) if hasattr(result, 'content') else str(result)
+                        if total is not None and total > self.page_size:
+                            tool_data["total_count"] = total
+                            tool_data["requested_limit"] = requested_limit
+                            result_content += (
+                                f"\n\nNote: this is the first page of {self.page_size} out of {total} matching "
+                                "documents. The complete result is shown to the user page by page, so summarize "
+                                "this page and mention the total instead of requesting more pages."
+                            )
                         tool_data["result"] = result_content
                         
                         # Add tool result to messages
@@ -505,18 +1237,114 @@ class MongoDBAgent:
                         })
                     else:
                         tool_data["result"] = f"Error: {error}"
+                        
+                        # Every tool call needs a response before the next completion
+                        messages.append({
+                            "role": "tool",
+                            "tool_call_id": tool_call.id,
+                            "content": tool_data["result"]
+                        })
                     
                     iteration_data["tool_calls"].append(tool_data)
+                    
+                    if iteration_data.get("stop_reason"):
+                        break
+                    
+                    executed_name, executed_args = executed or (tool_name, tool_args)
+                    # Same predicate as query_call(), so the extracted query is the one that stopped the loop
+                    if stop_mode != "full" and tool_data["success"] and is_target_query(executed_name, executed_args):
+                        # The target query has been produced; skip the remaining round trips
+                        iteration_data["stop_reason"] = "query_found"
+                        if stop_mode == "fast_answer":
+                            iteration_data["final_answer"] = self._render_fast_answer(executed_name, executed_args, result)
+                        break
+                
+                if iteration_data.get("stop_reason"):
+                    record(iteration_data)
+                    break
             else:
                 # No more tool calls, the assistant has a final answer
                 iteration_data["final_answer"] = assistant_message.content
-                results.append(iteration_data)
+                iteration_data["stop_reason"] = "answered"
+                record(iteration_data)
                 break
             
-            results.append(iteration_data)
+            record(iteration_data)
+        else:
+            if results:
+                results[-1]["stop_reason"] = "max_iterations"
         
         return results
     
+    @staticmethod
+    def _escalation_reason(query_result: Dict[str, Any]) -> Optional[str]:
+        """Why a fast model's result can't be trusted (no_query, tool_error, empty_filter), or None."""
+        if not query_result.get("collection"):
+            return "no_query"
+        for iteration in query_result.get("iterations", []):
+            for tool_call in iteration.get("tool_calls", []):
+                # Plan hints are answered by the model's retry, not failures
+                if not tool_call.get("success") and not tool_call.get("plan_rejected"):
+                    return "tool_error"
+        if not query_result.get("filter"):
+            return "empty_filter"
+        return None
+    
+    @staticmethod
+    def _timeout_reason(deadline: Optional[float], stage_reason: Optional[str]) -> Optional[str]:
+        """Stop reason after a timeout: the query deadline if it has passed, else the stage's own."""
+        if deadline is not None and time.monotonic() >= deadline:
+            return "deadline_exceeded"
+        return stage_reason
+    
+    def _pagination(self, iterations: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Pagination spec (see result_pager.py) of the last find whose result didn't fit in one page."""
+        paged = [
+            tool_call
+            for iteration in iterations
+            for tool_call in iteration.get("tool_calls", [])
+            if tool_call.get("name") == "find" and tool_call.get("total_count")
+        ]
+        if not paged:
+            return None
+        arguments = paged[-1]["arguments"]
+        return {
+            "database": arguments.get("database") or self.database_name,
+            "collection": arguments.get("collection"),
+            "filter": arguments.get("filter") or {},
+            "sort": arguments.get("sort"),
+            "projection": arguments.get("projection"),
+            "limit": paged[-1].get("requested_limit"),
+            "total": paged[-1]["total_count"],
+            "page_size": self.page_size
+        }
+    
+    @staticmethod
+    def _is_successful_result(result, error) -> bool:
+        """True when a tool call returned a result that is not an error."""
+        return error is None and result is not None and not getattr(result, "isError", False)
+    
+    @staticmethod
+    def _result_text(result) -> str:
+        """Plain text of an MCP tool result."""
+        contents = getattr(result, "content", None) or []
+        texts = [c.text for c in contents if getattr(c, "text", None)]
+        return "\n".join(texts) if texts else str(result)
+    
+    @classmethod
+    def _render_fast_answer(cls, tool_name: str, arguments: Dict[str, Any], result) -> str:
+        """Final answer rendered locally from the query and its result, without another completion."""
+        query = arguments.get("filter", {}) if tool_name == "find" else arguments.get("pipeline", [])
+        result_text = cls._result_text(result)
+        if len(result_text) > FAST_ANSWER_MAX_CHARS:
+            result_text = result_text[:FAST_ANSWER_MAX_CHARS] + "\n\n... (truncated)"
+        return FAST_ANSWER_TEMPLATE.substitute(
+            tool=tool_name,
+            collection=arguments.get("collection"),
+            query=json.dumps(query, indent=2, default=str),
+            result=result_text
+        )
+    
     @staticmethod
     def _extract_query_from_iterations(iterations: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -533,32 +1361,73 @@ class MongoDBAgent:
         if iterations:
             result["final_answer"] = iterations[-1].get("final_answer")
         
-        # Look for MongoDB query tool calls
-        for iteration in iterations:
-            for tool_call in iteration.get("tool_calls", []):
-                tool_name = tool_call.get("name", "")
-                args = tool_call.get("arguments", {})
-                
-                if tool_name == "find":
-                    result["collection"] = args.get("collection")
-                    result["filter"] = args.get("filter", {})
-                    break
-                elif tool_name == "aggregate":
-                    result["collection"] = args.get("collection")
-                    # For aggregate, extract filter from $match stage if present
-                    pipeline = args.get("pipeline", [])
-                    for stage in pipeline:
-                        if "$match" in stage:
-                            result["filter"] = stage["$match"]
-                            break
-                    break
+        # The MongoDB query tool call (find or aggregate) that produced the answer
+        call = query_call(iterations)
+        if call is not None:
+            fields = query_fields(*call)
+            result["collection"] = fields["collection"]
+            result["filter"] = fields["filter"]
         
         return result
     
-    def query_sync(self, user_query: Dict[str, Any]) -> Dict[str, Any]:
+    def _run_sync(self, coro):
+        """Run a coroutine on the agent's persistent background event loop and wait for it."""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="mongodb-agent-loop",
+                    daemon=True
+                )
+                self._loop_thread.start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    
+    def query_sync(
+        self,
+        user_query: Union[str, Dict[str, Any]],
+        stop_mode: Optional[str] = None,
+        deadline_s: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         Synchronous wrapper for query() method.
         Use this for pydantic_evals integration.
+        
+        Queries run on a persistent background loop rather than a fresh
+        asyncio.run() per call, so the MCP session pool is reused.
         """
-        return asyncio.run(self.query(user_query))
-
+        return self._run_sync(self.query(user_query, stop_mode=stop_mode, deadline_s=deadline_s))
+    
+    async def aclose(self) -> None:
+        """Close the MCP sessions and OpenAI connections bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        
+        pool = self._session_pools.pop(loop, None)
+        if pool is not None:
+            await pool.close()
+        
+        client = self._openai_clients.pop(loop, None)
+        if client is not None:
+            await client.close()
+    
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Gracefully shut down the background loop used by the sync wrappers,
+        closing the sessions and connections opened on it.
+        """
+        with self._loop_lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop, self._loop_thread = None, None
+        
+        if loop is None or loop.is_closed():
+            return
+        
+        try:
+            asyncio.run_coroutine_threadsafe(self.aclose(), loop).result(timeout=timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            if thread is not None:
+                thread.join(timeout=timeout)
+            if not loop.is_running():
+                loop.close()
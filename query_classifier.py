@@ -0,0 +1,82 @@
+"""
+Local (no LLM call) difficulty classification of user questions.
+
+Mirrors the difficulty labels of the evaluation datasets:
+- easy: a single event type with one or two simple criteria (date, name, id)
+- medium: several criteria or fields that need enum/extra-field lookups
+- hard: reports, aggregations, comparisons or multi-step questions
+"""
+
+import re
+from typing import Any, Dict, Union
+
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# Patterns that each add one criterion the model has to translate into the filter
+_CRITERIA_PATTERNS = [
+    r"\b(today|yesterday|last|past|this)\s+(week|month|year|day)s?\b|\btoday\b|\byesterday\b",
+    r"\b\d{1,2}/\d{1,2}/\d{2,4}\b|\b\d{4}-\d{2}-\d{2}\b",
+    r"\b[0-9a-f]{24}\b",
+    r"\bemirates id\b|\beid\b",
+    r"\bqr\b|\bqr code\b|\bnfc\b|\bmanual(ly)?\b",
+    r"\bunit\s+\w+",
+    r"\bnamed?\b",
+    r"\bpurpose\b|\bcompany\b|\bbadge\b|\bdepartment\b",
+    r"\bdeliver(y|ies|er)\b",
+    r"\bproperty\b|\bcommunity\b",
+]
+
+# Person names are only recognizable before lowercasing ("visitor John Doe")
+_NAME_PATTERN = r"\b(visitor|guest|deliverer)\s+[A-Z][a-z]+"
+
+# Patterns that indicate server-side aggregation or multiple dependent steps
+_HARD_PATTERNS = [
+    r"\breport\b",
+    r"\bhow many\b|\bcount\b|\bnumber of\b|\btotal\b",
+    r"\bper (day|week|month|property|unit|type)\b|\bby (day|week|month|property|unit|type)\b",
+    r"\bbreakdown\b|\bgroup(ed)?\b|\baverage\b|\btrend\b|\bcompare\b|\bmost\b|\btop \d+\b",
+    r"\bfor each\b|\band then\b",
+]
+
+
+# Patterns of report-style questions, best answered with a server-side aggregation
+_REPORT_PATTERNS = [
+    r"\breport\b|\bsummary\b|\bsummari[sz]e\b|\bstatistics\b|\bbreakdown\b",
+    r"\bhow many\b|\bcount\b|\bnumber of\b|\btotal\b",
+    r"\bper (day|week|month|property|unit|type)\b|\bby (day|week|month|property|unit|type)\b",
+]
+
+
+def question_text(user_query: Union[str, Dict[str, Any]]) -> str:
+    if isinstance(user_query, dict):
+        return user_query.get("text") or ""
+    return user_query
+
+
+def classify_difficulty(user_query: Union[str, Dict[str, Any]]) -> str:
+    """
+    Classify a question as easy, medium or hard with keyword heuristics.
+
+    Args:
+        user_query: Question text, or a query dict with a "text" key
+
+    Returns:
+        One of DIFFICULTIES
+    """
+    text = question_text(user_query)
+    lowered = text.lower()
+
+    if any(re.search(pattern, lowered) for pattern in _HARD_PATTERNS):
+        return "hard"
+
+    criteria = sum(1 for pattern in _CRITERIA_PATTERNS if re.search(pattern, lowered))
+    if re.search(_NAME_PATTERN, text):
+        criteria += 1
+    return "easy" if criteria <= 3 else "medium"
+
+
+def is_report_question(user_query: Union[str, Dict[str, Any]]) -> bool:
+    """True for report-style questions (counts, totals, breakdowns) rather than document lookups."""
+    lowered = question_text(user_query).lower()
+    return any(re.search(pattern, lowered) for pattern in _REPORT_PATTERNS)
@@ -0,0 +1,122 @@
+"""
+Log of the MongoDB queries the agent generates, for offline analysis.
+
+Each answered question appends one JSON line with the tool, collection,
+filter and sort of the query it produced (see query_call), e.g.:
+
+    {"timestamp": "...", "question": "...", "tool": "find", "collection": "events",
+     "filter": {"type": "enterEvents", "date": {...}}, "sort": {"date": -1}, ...}
+
+index_advisor.py reads the log to recommend indexes.
+
+Configure from the environment with:
+    AGENT_QUERY_LOG=query_log.jsonl
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from metadata_cache import metadata_key
+
+
+QUERY_TOOLS = ("find", "aggregate")
+
+
+def is_target_query(tool_name: str, arguments: Dict[str, Any]) -> bool:
+    """
+    True for a find, or an aggregate that filters with $match, on a collection.
+    Metadata lookups (e.g. the unique values of type) are not target queries.
+    """
+    if tool_name not in QUERY_TOOLS or not arguments.get("collection"):
+        return False
+    if metadata_key(tool_name, arguments) is not None:
+        return False
+    if tool_name == "aggregate":
+        return any(
+            isinstance(stage, dict) and stage.get("$match")
+            for stage in arguments.get("pipeline") or []
+        )
+    return True
+
+
+def query_call(iterations: List[Dict[str, Any]]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    (tool, arguments) of the query an agent run produced: the first target
+    query (see is_target_query) that succeeded, i.e. the call that ends a
+    query_only/fast_answer run. Calls whose plan was rejected are replaced by
+    the model's retry. None if there is none.
+    """
+    for iteration in iterations:
+        for tool_call in iteration.get("tool_calls", []):
+            if tool_call.get("plan_rejected") or not tool_call.get("success"):
+                continue
+            # Local tools (e.g. run_report) record the MongoDB query they ran
+            call = tool_call.get("executed") or tool_call
+            tool_name, arguments = call.get("name", ""), call.get("arguments", {})
+            if is_target_query(tool_name, arguments):
+                return tool_name, arguments
+    return None
+
+
+def query_fields(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Tool, collection, filter and sort of one find/aggregate call."""
+    if tool_name == "find":
+        query_filter, sort = arguments.get("filter", {}), arguments.get("sort")
+    else:
+        # For aggregate, the filter and sort are the first $match / $sort stages
+        stages = [stage for stage in arguments.get("pipeline", []) if isinstance(stage, dict)]
+        query_filter = next((stage["$match"] for stage in stages if "$match" in stage), None)
+        sort = next((stage["$sort"] for stage in stages if "$sort" in stage), None)
+    return {"tool": tool_name, "collection": arguments.get("collection"), "filter": query_filter, "sort": sort}
+
+
+class QueryLog:
+    """Appends one JSON line per agent query with the MongoDB query it produced."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["QueryLog"]:
+        """Build a query log from AGENT_QUERY_LOG, or None when unset."""
+        path = os.getenv("AGENT_QUERY_LOG")
+        return cls(path) if path else None
+
+    def append(self, user_query: Dict[str, Any], query_result: Dict[str, Any]) -> None:
+        """Log the query of a finished agent run (runs without a query are skipped)."""
+        call = query_call(query_result.get("iterations", []))
+        if call is None or not call[1].get("collection"):
+            return
+
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "question": user_query.get("text"),
+            "today_date": user_query.get("today_date"),
+            # Every field comes from the same tool call
+            **query_fields(*call),
+            "difficulty": query_result.get("difficulty"),
+            "stop_reason": query_result.get("stop_reason"),
+        }
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def read_query_log(path: str) -> List[Dict[str, Any]]:
+    """Read all entries of a query log, skipping lines that are not valid JSON."""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
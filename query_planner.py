@@ -0,0 +1,206 @@
+"""
+Pre-execution checks for the find/aggregate calls generated by the model.
+
+Two stages run before a query reaches the events collection:
+
+1. Rewrites (local, always safe): forms that return the same documents but
+   defeat index use or never match are rewritten, e.g.
+       {"guestName": {"$regex": ".*John.*"}}  ->  {"guestName": {"$regex": "John"}}
+       {"date": {"$gte": "2025-10-09"}}        ->  {"date": {"$gte": {"$date": "2025-10-09T00:00:00Z"}}}
+   (a string never compares equal to a datetime in MongoDB, so the original
+   filter silently matched nothing).
+
+2. Plan validation (one extra `explain` call): if the winning plan is a
+   collection scan, the query is not executed and the model gets a hint on
+   how to make it index friendly instead.
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+
+# How much checking the agent does before running a find/aggregate:
+#   off      run the generated query as is
+#   rewrite  apply the safe rewrites below
+#   explain  rewrite, then explain the query and send collection scans back to the model
+PLAN_VALIDATION_MODES = ("off", "rewrite", "explain")
+
+# datetime fields of the events collection (see events_schema in mongodb_agent.py)
+DATE_FIELDS = {"date", "createdAt", "updatedAt", "enterEventDate", "validationDate"}
+
+_RANGE_OPERATORS = {"$eq", "$ne", "$gt", "$gte", "$lt", "$lte"}
+_LOGICAL_OPERATORS = {"$and", "$or", "$nor"}
+
+# Characters that make `.*` lazy/possessive or repeat it
+_QUANTIFIERS = {"?", "+", "*", "{"}
+
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(Z|[+-]\d{2}:?\d{2})?$")
+
+
+# ============================================================================
+# REWRITES
+# ============================================================================
+
+def _simplify_regex(pattern: str, options: str = "") -> str:
+    """
+    Drop `.*` at either end of a regex where it can't change what matches.
+
+    An unanchored regex matches wherever `.*X` or `X.*` does as long as X
+    does, since `.*` may match nothing. `^.*` and `.*$` are only dropped with
+    the m or s option: otherwise `.` stops at newlines and the anchor ties
+    the match to the first/last line of multi-line values. `.*` followed by
+    a quantifier (lazy `.*?`, possessive `.*+`) is kept.
+    """
+    anchors = "m" in options or "s" in options
+    if anchors and pattern.startswith("^.*") and pattern[3:4] not in _QUANTIFIERS:
+        pattern = pattern[3:]
+    while pattern.startswith(".*") and pattern[2:3] not in _QUANTIFIERS:
+        pattern = pattern[2:]
+    if anchors and pattern.endswith(".*$") and not pattern.endswith("\\.*$"):
+        pattern = pattern[:-3]
+    while pattern.endswith(".*") and not pattern.endswith("\\.*"):
+        pattern = pattern[:-2]
+    return pattern
+
+
+def ejson_date(value: str) -> Dict[str, str]:
+    """Relaxed EJSON date for an ISO date string (UTC unless an offset is given)."""
+    if not isinstance(value, str) or not _ISO_DATE.match(value):
+        raise ValueError(f"Not an ISO date: {value!r}")
+    value = value.replace(" ", "T")
+    if "T" not in value:
+        value += "T00:00:00"
+    if not _ISO_DATE.match(value).group(1):
+        value += "Z"
+    return {"$date": value}
+
+
+def _rewrite_condition(field: str, condition: Any, notes: List[str]) -> Any:
+    if field in DATE_FIELDS and isinstance(condition, str) and _ISO_DATE.match(condition):
+        notes.append(f"{field}: compared as a date instead of the string '{condition}'")
+        return ejson_date(condition)
+
+    if not isinstance(condition, dict):
+        return condition
+
+    if isinstance(condition.get("$regex"), str):
+        simplified = _simplify_regex(condition["$regex"], str(condition.get("$options") or ""))
+        if simplified != condition["$regex"]:
+            notes.append(f"{field}: regex /{condition['$regex']}/ simplified to /{simplified}/")
+            condition = {**condition, "$regex": simplified}
+
+    if field in DATE_FIELDS:
+        for op, value in list(condition.items()):
+            if op in _RANGE_OPERATORS and isinstance(value, str) and _ISO_DATE.match(value):
+                notes.append(f"{field}: {op} compared as a date instead of the string '{value}'")
+                condition = {**condition, op: ejson_date(value)}
+    return condition
+
+
+def rewrite_filter(query_filter: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Apply the safe rewrites to a find filter or $match stage.
+
+    Args:
+        query_filter: Filter as generated by the model
+
+    Returns:
+        (rewritten filter, human readable notes on what was changed)
+    """
+    notes: List[str] = []
+
+    def rewrite(node: Dict[str, Any]) -> Dict[str, Any]:
+        rewritten = {}
+        for key, value in node.items():
+            if key in _LOGICAL_OPERATORS and isinstance(value, list):
+                rewritten[key] = [rewrite(clause) if isinstance(clause, dict) else clause for clause in value]
+            elif key.startswith("$"):
+                rewritten[key] = value
+            else:
+                rewritten[key] = _rewrite_condition(key, value, notes)
+        return rewritten
+
+    return rewrite(query_filter), notes
+
+
+def rewrite_query_arguments(tool_name: str, arguments: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """Rewrite the filter of a find, or the leading $match of an aggregate. Arguments are not modified in place."""
+    if tool_name == "find" and isinstance(arguments.get("filter"), dict):
+        query_filter, notes = rewrite_filter(arguments["filter"])
+        return ({**arguments, "filter": query_filter}, notes) if notes else (arguments, [])
+
+    pipeline = arguments.get("pipeline")
+    if tool_name == "aggregate" and pipeline and isinstance(pipeline[0], dict) and isinstance(pipeline[0].get("$match"), dict):
+        match, notes = rewrite_filter(pipeline[0]["$match"])
+        if notes:
+            return {**arguments, "pipeline": [{"$match": match}] + pipeline[1:]}, notes
+    return arguments, []
+
+
+# ============================================================================
+# PLAN VALIDATION
+# ============================================================================
+
+def explain_arguments(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Arguments of the MCP `explain` tool for a find/aggregate call."""
+    if tool_name == "find":
+        method = {"name": "find", "arguments": {
+            key: arguments[key] for key in ("filter", "projection", "sort", "limit") if key in arguments
+        }}
+    else:
+        method = {"name": "aggregate", "arguments": {"pipeline": arguments.get("pipeline", [])}}
+    return {
+        "database": arguments.get("database"),
+        "collection": arguments.get("collection"),
+        "method": [method],
+        "verbosity": "queryPlanner",
+    }
+
+
+def is_collection_scan(explain_text: str) -> bool:
+    """True if the winning plan of an explain output scans the whole collection."""
+    return "COLLSCAN" in explain_text
+
+
+def _filter_fields(query_filter: Any) -> List[str]:
+    fields = []
+    if isinstance(query_filter, dict):
+        for key, value in query_filter.items():
+            if key in _LOGICAL_OPERATORS and isinstance(value, list):
+                for clause in value:
+                    fields += _filter_fields(clause)
+            elif not key.startswith("$"):
+                fields.append(key)
+    return fields
+
+
+def plan_hint(tool_name: str, arguments: Dict[str, Any]) -> str:
+    """Feedback for the model when its query would scan the whole collection."""
+    if tool_name == "find":
+        query_filter = arguments.get("filter") or {}
+    else:
+        stages = arguments.get("pipeline") or [{}]
+        query_filter = stages[0].get("$match", {}) if isinstance(stages[0], dict) else {}
+    fields = _filter_fields(query_filter)
+
+    advice = []
+    if not any(field in DATE_FIELDS for field in fields):
+        advice.append("restrict the query to a date range on `date` (with both $gte and $lt)")
+    if "type" not in fields:
+        advice.append("filter on the event `type`")
+    regex_fields = [
+        field for field, condition in query_filter.items()
+        if isinstance(condition, dict) and "$regex" in condition
+    ] if isinstance(query_filter, dict) else []
+    if regex_fields:
+        advice.append(
+            f"combine the regex on {', '.join(regex_fields)} with the criteria above; "
+            "prefer a case-sensitive regex anchored with ^ where the value's prefix is known"
+        )
+
+    return (
+        f"Query not executed: the query plan for this {tool_name} on `{arguments.get('collection')}` "
+        f"is a full collection scan (filter fields: {', '.join(fields) or 'none'}). "
+        f"To use an index, {'; '.join(advice) or 'add a selective equality or range criterion'}, "
+        "then run the query again."
+    )
@@ -0,0 +1,162 @@
+"""
+Built-in report pipelines over the events collection.
+
+Report-style questions ("Give a report of check-ins ... last month") are
+answered with a server-side aggregation instead of finding raw documents
+and summarizing them in the prompt. The model invokes a report by name
+through the local `run_report` tool; the agent builds the pipeline below
+and runs it with the MCP `aggregate` tool.
+
+Reports:
+    per_day          number of events per calendar day
+    per_type         number of events per event type
+    per_entry_type   number of events per entryType (how visitors checked in)
+    per_leave_type   number of events per leaveType (how visitors checked out)
+    per_property     number of events per propertyId
+    overview         total plus per day / per type / per entryType in one $facet
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from query_planner import ejson_date
+
+
+REPORT_COLLECTION = "events"
+
+# Report name -> field the events are grouped by (None: grouped by day)
+_GROUP_FIELDS = {
+    "per_day": None,
+    "per_type": "type",
+    "per_entry_type": "entryType",
+    "per_leave_type": "leaveType",
+    "per_property": "propertyId",
+}
+
+REPORTS = tuple(_GROUP_FIELDS) + ("overview",)
+
+_OBJECT_ID = re.compile(r"^[0-9a-fA-F]{24}$")
+
+# Definition of the local tool in OpenAI function calling format
+RUN_REPORT_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "run_report",
+        "description": (
+            "Run a built-in aggregation report over the events collection and return the counts. "
+            "Use this for report, summary, count or breakdown questions instead of finding documents. "
+            "Reports: per_day, per_type, per_entry_type, per_leave_type, per_property, "
+            "overview (total plus per day, per type and per entryType)."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "report": {"type": "string", "enum": list(REPORTS)},
+                "date_from": {"type": "string", "description": "Start of the period (inclusive), ISO date e.g. 2025-09-01"},
+                "date_to": {"type": "string", "description": "End of the period (exclusive), ISO date e.g. 2025-10-01"},
+                "type": {"type": "string", "description": "Event type to restrict to, e.g. enterEvents"},
+                "entry_type": {"type": "string", "description": "entryType to restrict to, e.g. eid"},
+                "leave_type": {"type": "string", "description": "leaveType to restrict to, e.g. qrCode"},
+                "property_id": {"type": "string", "description": "propertyId (24 hex characters) to restrict to"},
+                "timezone": {"type": "string", "description": "Timezone used to split days, default UTC"},
+            },
+            "required": ["report", "date_from", "date_to"],
+        },
+    },
+}
+
+REPORT_PROMPT = """
+                  This is a report-style question. Compute the numbers on the server:
+                  - prefer the run_report tool when one of its reports fits the question
+                  - otherwise use aggregate with a $match on the period followed by $group/$count/$facet
+                  - do not find raw documents to count or group them yourself"""
+
+
+def report_match(
+    date_from: str,
+    date_to: str,
+    event_type: Optional[str] = None,
+    entry_type: Optional[str] = None,
+    leave_type: Optional[str] = None,
+    property_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """$match stage restricting a report to a period and optional criteria."""
+    match: Dict[str, Any] = {"date": {"$gte": ejson_date(date_from), "$lt": ejson_date(date_to)}}
+    if event_type:
+        match["type"] = event_type
+    if entry_type:
+        match["entryType"] = entry_type
+    if leave_type:
+        match["leaveType"] = leave_type
+    if property_id:
+        if not _OBJECT_ID.match(property_id):
+            raise ValueError(f"property_id must be 24 hex characters, got {property_id!r}")
+        match["propertyId"] = {"$oid": property_id}
+    return match
+
+
+def _per_day(timezone: str) -> List[Dict[str, Any]]:
+    return [
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date", "timezone": timezone}},
+            "count": {"$sum": 1},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def _per_field(field: str) -> List[Dict[str, Any]]:
+    return [
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+    ]
+
+
+def build_report(report: str, date_from: str, date_to: str, timezone: str = "UTC", **criteria) -> List[Dict[str, Any]]:
+    """
+    Aggregation pipeline of a report.
+
+    Args:
+        report: One of REPORTS
+        date_from: Start of the period (inclusive), ISO date
+        date_to: End of the period (exclusive), ISO date
+        timezone: Timezone used to split days
+        **criteria: Optional event_type, entry_type, leave_type, property_id
+
+    Returns:
+        The pipeline, in relaxed EJSON as accepted by the MCP aggregate tool
+
+    Raises:
+        ValueError: Unknown report or invalid parameter
+    """
+    if report not in REPORTS:
+        raise ValueError(f"Unknown report {report!r}, expected one of {REPORTS}")
+
+    pipeline: List[Dict[str, Any]] = [{"$match": report_match(date_from, date_to, **criteria)}]
+    if report == "overview":
+        pipeline.append({"$facet": {
+            "total": [{"$count": "count"}],
+            "per_day": _per_day(timezone),
+            "per_type": _per_field("type"),
+            "per_entry_type": _per_field("entryType"),
+        }})
+    elif _GROUP_FIELDS[report] is None:
+        pipeline += _per_day(timezone)
+    else:
+        pipeline += _per_field(_GROUP_FIELDS[report])
+    return pipeline
+
+
+def report_arguments(arguments: Dict[str, Any], database: str) -> Dict[str, Any]:
+    """Arguments of the MCP aggregate tool for a run_report call made by the model."""
+    pipeline = build_report(
+        arguments.get("report"),
+        arguments.get("date_from"),
+        arguments.get("date_to"),
+        timezone=arguments.get("timezone") or "UTC",
+        event_type=arguments.get("type"),
+        entry_type=arguments.get("entry_type"),
+        leave_type=arguments.get("leave_type"),
+        property_id=arguments.get("property_id"),
+    )
+    return {"database": database, "collection": REPORT_COLLECTION, "pipeline": pipeline}
@@ -0,0 +1,139 @@
+"""
+Retries and hedging for OpenAI completion requests.
+
+A single slow or failed completion stalls the whole agent loop. The agent
+therefore:
+- retries transient errors (timeouts, connection errors, rate limits, 5xx)
+  with exponential backoff and full jitter, honouring retry-after
+- optionally hedges: when a completion is still running after the p95 of
+  recent completion latencies, an identical request is sent and whichever
+  finishes first is used (the other is cancelled)
+
+Hedging trades a few duplicate requests (about 5% by construction) for a
+much shorter latency tail.
+
+Retry layers (at most one layer retries each failure):
+- OpenAI SDK: disabled (max_retries=0) on the agent's own clients while
+  completion_retries > 0, so one completion is at most completion_retries + 1
+  HTTP requests (3 by default), plus one hedge per attempt when hedging
+- evaluation.rate_limit_aware: re-runs a whole case when a rate limit still
+  escapes the agent's retries, after pausing every case. Its retries multiply
+  with the agent's: a completion of a case can be attempted up to
+  (max_retries + 1) * (completion_retries + 1) times (18 by default)
+"""
+
+import asyncio
+import random
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from benchmark_stats import percentile
+
+
+# Errors worth retrying: the same request may well succeed a moment later
+TRANSIENT_ERRORS = (APITimeoutError, APIConnectionError, RateLimitError, InternalServerError)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Read the retry-after header (seconds) from an API error, if present."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, error: Optional[Exception] = None) -> float:
+    """
+    Seconds to wait before retry number attempt + 1.
+
+    The advertised retry-after wins; otherwise a full-jitter exponential
+    backoff, so retries of concurrent queries don't hit the API in lockstep.
+    """
+    advertised = retry_after(error) if error is not None else None
+    if advertised is not None:
+        return advertised
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class LatencyWindow:
+    """Recent completion latencies, used to pick the hedging delay."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20, pct: float = 95.0):
+        self._samples: deque = deque(maxlen=size)
+        self.min_samples = min_samples
+        self.pct = pct
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """p95 of the recent latencies, or None until enough have been seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        return percentile(list(self._samples), self.pct)
+
+
+async def hedged(
+    request: Callable[[], Awaitable[Any]],
+    delay: Optional[float]
+) -> Tuple[Any, bool, bool]:
+    """
+    Run a request, sending a duplicate if it hasn't finished after delay seconds.
+
+    Args:
+        request: Starts one attempt of the request
+        delay: Seconds before the hedge is sent, None to never hedge
+
+    Returns:
+        (result of the first attempt to succeed, whether a hedge was sent,
+        whether the hedge won)
+
+    Raises:
+        The primary's error when every attempt failed
+    """
+    primary = asyncio.ensure_future(request())
+    attempts = [primary]
+    try:
+        if delay is None:
+            return await primary, False, False
+
+        done, _ = await asyncio.wait(attempts, timeout=delay)
+        if done:
+            return primary.result(), False, False
+
+        attempts.append(asyncio.ensure_future(request()))
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result(), True, attempt is not primary
+        # Both attempts failed
+        return primary.result(), True, False
+    finally:
+        # The loser (or both, when the caller gave up) must not keep running
+        for attempt in attempts:
+            attempt.cancel()
+
+
+class CompletionStats:
+    """Counters of completion retries and hedges over the agent's lifetime."""
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+        }
@@ -0,0 +1,171 @@
+"""
+Paged access to large find results, read straight from MongoDB.
+
+When a find matches more documents than the agent's page size, the model
+only sees the first page and the query result carries a "pagination" spec:
+
+    {"database": ..., "collection": "events", "filter": {...}, "sort": {...},
+     "projection": {...}, "limit": None, "total": 4210, "page_size": 50}
+
+ResultPager serves that spec page by page with pymongo, so neither the agent
+nor the UI ever holds the full result set:
+- fetch_page(): one page at a time for interactive UIs; pages of unsorted
+  queries are keyset-paginated on `_id` (read even when the projection
+  excludes it, and stripped again), sorted queries and projections that
+  compute `_id` fall back to skip
+- iter_pages(): streams all pages through a single cursor
+
+Filters are relaxed EJSON as generated by the model ({"$date": ...},
+{"$oid": ...}); returned documents are converted back to relaxed EJSON.
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from pymongo import ASCENDING, DESCENDING, MongoClient
+
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def _from_ejson(value: Any) -> Any:
+    return json_util.loads(json.dumps(value))
+
+
+def _to_ejson(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return json.loads(json_util.dumps(documents, json_options=RELAXED_JSON_OPTIONS))
+
+
+def _sort_spec(sort: Any) -> Optional[List[Tuple[str, int]]]:
+    if not isinstance(sort, dict) or not sort:
+        return None
+    return [(field, DESCENDING if direction in (-1, "-1", "desc", "descending") else ASCENDING)
+            for field, direction in sort.items()]
+
+
+class ResultPager:
+    """Reads the documents described by a pagination spec, one page at a time."""
+
+    def __init__(
+        self,
+        connection_string: str,
+        database_name: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        max_time_ms: int = 30000
+    ):
+        """
+        Args:
+            connection_string: MongoDB connection string
+            database_name: Database used when the spec doesn't name one
+            page_size: Documents per page when the spec doesn't set one
+            max_time_ms: Server-side time limit for each page query
+        """
+        # MongoClient connects lazily and is safe to share between threads
+        self._client = MongoClient(connection_string)
+        self.database_name = database_name
+        self.page_size = page_size
+        self.max_time_ms = max_time_ms
+
+    def _collection(self, pagination: Dict[str, Any]):
+        return self._client[pagination.get("database") or self.database_name][pagination["collection"]]
+
+    def _page_size(self, pagination: Dict[str, Any]) -> int:
+        return pagination.get("page_size") or self.page_size
+
+    def fetch_page(
+        self,
+        pagination: Dict[str, Any],
+        token: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Fetch one page of the result set.
+
+        Args:
+            pagination: Spec from the agent's query result
+            token: Token returned for the previous page, None for the first page
+
+        Returns:
+            (documents of the page as relaxed EJSON, token of the next page or None
+            when this is the last page). Tokens are JSON-serializable.
+        """
+        token = token or {}
+        served = token.get("served", 0)
+        page_size = self._page_size(pagination)
+        limit = pagination.get("limit")
+        if limit:
+            page_size = min(page_size, limit - served)
+            if page_size <= 0:
+                return [], None
+
+        query_filter = _from_ejson(pagination.get("filter") or {})
+        projection = dict(pagination.get("projection") or {})
+        sort = _sort_spec(pagination.get("sort"))
+        keyset = sort is None
+        strip_id = False
+        if keyset and "_id" in projection and projection["_id"] not in (1, True):
+            if projection["_id"] in (0, False):
+                # Keyset paging needs the _id of the page's last document
+                del projection["_id"]
+                strip_id = True
+            else:
+                # _id is projected to a computed value
+                keyset = False
+        if keyset:
+            # Keyset pagination: stable and index-backed regardless of the page number
+            if "after_id" in token:
+                query_filter = {"$and": [query_filter, {"_id": {"$gt": json_util.loads(token["after_id"])}}]}
+            sort, skip = [("_id", ASCENDING)], 0
+        else:
+            # Skip-based paging still needs a stable order across pages
+            sort, skip = sort or [("_id", ASCENDING)], served
+
+        cursor = (
+            self._collection(pagination)
+            .find(query_filter, projection or None)
+            .sort(sort)
+            .skip(skip)
+            .limit(page_size + 1)
+            .max_time_ms(self.max_time_ms)
+        )
+        documents = list(cursor)
+        has_more = len(documents) > page_size and not (limit and served + page_size >= limit)
+        documents = documents[:page_size]
+
+        next_token = None
+        if has_more and documents:
+            next_token = {"served": served + len(documents)}
+            if keyset:
+                next_token["after_id"] = json_util.dumps(documents[-1]["_id"])
+        if strip_id:
+            for document in documents:
+                document.pop("_id", None)
+        return _to_ejson(documents), next_token
+
+    def iter_pages(self, pagination: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        """Stream the whole result set in pages through a single server cursor."""
+        page_size = self._page_size(pagination)
+        cursor = self._collection(pagination).find(
+            _from_ejson(pagination.get("filter") or {}),
+            pagination.get("projection") or None,
+            batch_size=page_size
+        )
+        sort = _sort_spec(pagination.get("sort"))
+        if sort:
+            cursor = cursor.sort(sort)
+        if pagination.get("limit"):
+            cursor = cursor.limit(pagination["limit"])
+
+        page: List[Dict[str, Any]] = []
+        with cursor:
+            for document in cursor:
+                page.append(document)
+                if len(page) == page_size:
+                    yield _to_ejson(page)
+                    page = []
+        if page:
+            yield _to_ejson(page)
+
+    def close(self) -> None:
+        self._client.close()
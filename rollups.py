@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Materialized daily rollups of the events collection.
+
+Maintains `events_daily`: one document per day, propertyId, type, entryType
+and leaveType with the number of events, e.g.
+
+    {"day": "2025-10-09", "day_start": ISODate("2025-10-09T00:00:00Z"),
+     "propertyId": ObjectId(...), "type": "enterEvents", "entryType": "qrCode",
+     "leaveType": null, "count": 42, "build_id": ObjectId(...)}
+
+`day` is the calendar day in the rollup's timezone, so day ranges can be
+queried without timezone arithmetic.
+
+The build is incremental: a watermark on `createdAt` (stored in
+`rollup_state`) tracks which events have been rolled up. Each run finds the
+days touched by newer events and recomputes those days completely with
+$merge, so reruns are idempotent. Recomputed documents are merged first and
+only then are the days' stale documents (from an older build_id) removed, so
+a failed run never leaves days missing. Run it periodically (e.g. from cron):
+
+    python rollups.py                 # incremental
+    python rollups.py --full          # rebuild everything
+
+MongoDBAgent(daily_rollups=True) exposes the rollup to the model as the
+local `query_daily_rollup` tool, so "how many QR check-ins last month" is a
+single indexed read instead of a month-long scan of events.
+"""
+
+import argparse
+import os
+import re
+from datetime import datetime, time, timedelta, timezone, tzinfo
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, MongoClient
+
+
+ROLLUP_COLLECTION = "events_daily"
+STATE_COLLECTION = "rollup_state"
+SOURCE_COLLECTION = "events"
+DIMENSIONS = ("propertyId", "type", "entryType", "leaveType")
+
+# Events may be committed slightly out of createdAt order; each run re-reads
+# this much before the watermark so late arrivals still update their day
+DEFAULT_LOOKBACK = timedelta(minutes=5)
+
+_DAY = re.compile(r"^\d{4}-\d{2}-\d{2}")
+_UTC_OFFSET = re.compile(r"^([+-])(\d{2}):?(\d{2})$")
+
+
+# ============================================================================
+# BUILDER
+# ============================================================================
+
+def _day_expression(tz: str) -> Dict[str, Any]:
+    # Start of the event's day in tz, as a UTC datetime ($dateTrunc needs MongoDB 5.0+)
+    return {"$dateTrunc": {"date": "$date", "unit": "day", "timezone": tz}}
+
+
+def _zone(tz: str) -> tzinfo:
+    """Python timezone for a MongoDB timezone: an Olson name or a UTC offset like +04:00."""
+    offset = _UTC_OFFSET.match(tz)
+    if offset:
+        sign, hours, minutes = offset.groups()
+        delta = timedelta(hours=int(hours), minutes=int(minutes))
+        return timezone(-delta if sign == "-" else delta)
+    if tz.upper() in ("UTC", "Z"):
+        return timezone.utc
+    return ZoneInfo(tz)
+
+
+def _next_day_start(day_start: datetime, zone: tzinfo) -> datetime:
+    """
+    Start of the following day in zone, in the same UTC form as day_start.
+
+    Steps the calendar date and localizes its midnight, since adding 24 hours
+    drifts by an hour across DST transitions.
+    """
+    aware = day_start if day_start.tzinfo is not None else day_start.replace(tzinfo=timezone.utc)
+    next_date = aware.astimezone(zone).date() + timedelta(days=1)
+    next_start = datetime.combine(next_date, time(0), tzinfo=zone).astimezone(timezone.utc)
+    return next_start if day_start.tzinfo is not None else next_start.replace(tzinfo=None)
+
+
+def _rollup_pipeline(match: Dict[str, Any], tz: str, build_id: ObjectId) -> List[Dict[str, Any]]:
+    """Group the matched events per day and dimension, merged into ROLLUP_COLLECTION."""
+    group_id = {"day": _day_expression(tz), **{dim: f"${dim}" for dim in DIMENSIONS}}
+    return [
+        {"$match": match},
+        {"$group": {"_id": group_id, "count": {"$sum": 1}}},
+        {"$project": {
+            "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$_id.day", "timezone": tz}},
+            "day_start": "$_id.day",
+            **{dim: {"$ifNull": [f"$_id.{dim}", None]} for dim in DIMENSIONS},
+            "count": 1,
+            "build_id": {"$literal": build_id},
+        }},
+        {"$merge": {"into": ROLLUP_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+def _affected_days(events, since: Optional[datetime], until: datetime, tz: str) -> List[datetime]:
+    """Start of each day (in tz) holding events created in (since, until]."""
+    created = {"$lte": until}
+    if since is not None:
+        created["$gt"] = since
+    days = events.aggregate([
+        {"$match": {"createdAt": created}},
+        {"$group": {"_id": _day_expression(tz)}},
+        {"$sort": {"_id": 1}},
+    ])
+    return [d["_id"] for d in days if d["_id"] is not None]
+
+
+def ensure_indexes(db) -> None:
+    """Indexes for the watermark scan and for reads of the rollup."""
+    db[SOURCE_COLLECTION].create_index([("createdAt", ASCENDING)])
+    rollup = db[ROLLUP_COLLECTION]
+    rollup.create_index([("day", ASCENDING)])
+    rollup.create_index([("type", ASCENDING), ("day", ASCENDING)])
+    rollup.create_index([("propertyId", ASCENDING), ("day", ASCENDING)])
+
+
+def build_daily_rollup(
+    db,
+    tz: str = "UTC",
+    full: bool = False,
+    lookback: timedelta = DEFAULT_LOOKBACK
+) -> Dict[str, Any]:
+    """
+    Bring ROLLUP_COLLECTION up to date with the events collection.
+
+    Args:
+        db: pymongo Database
+        tz: Timezone that defines the days
+        full: Ignore the watermark and rebuild every day
+        lookback: How far before the watermark to look for late events
+
+    Returns:
+        Summary with the previous and new watermark and the recomputed days
+    """
+    events, rollup, state = db[SOURCE_COLLECTION], db[ROLLUP_COLLECTION], db[STATE_COLLECTION]
+    ensure_indexes(db)
+
+    saved = state.find_one({"_id": ROLLUP_COLLECTION}) or {}
+    if saved.get("timezone", tz) != tz:
+        # Days of another timezone can't be patched incrementally
+        full = True
+    watermark = None if full else saved.get("watermark")
+
+    latest = events.find_one({"createdAt": {"$ne": None}}, {"createdAt": 1}, sort=[("createdAt", DESCENDING)])
+    if latest is None:
+        return {"previous_watermark": watermark, "watermark": watermark, "days": []}
+    new_watermark = latest["createdAt"]
+
+    since = watermark - lookback if watermark is not None else None
+    days = _affected_days(events, since, new_watermark, tz)
+
+    build_id = ObjectId()
+    if days:
+        # Recompute whole days: regroup all of their events (not only the new
+        # ones) so counts stay exact
+        zone = _zone(tz)
+        ranges = [{"date": {"$gte": day, "$lt": _next_day_start(day, zone)}} for day in days]
+        events.aggregate(_rollup_pipeline({"$or": ranges}, tz, build_id))
+
+    # Only once the new counts are in place: drop documents of the recomputed
+    # days that this build didn't produce (dimension combinations that vanished)
+    stale = {"build_id": {"$ne": build_id}}
+    if not full:
+        stale["day_start"] = {"$in": days}
+    if full or days:
+        rollup.delete_many(stale)
+
+    state.update_one(
+        {"_id": ROLLUP_COLLECTION},
+        {"$set": {"watermark": new_watermark, "timezone": tz, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    return {"previous_watermark": watermark, "watermark": new_watermark, "days": days}
+
+
+# ============================================================================
+# AGENT TOOL
+# ============================================================================
+
+QUERY_DAILY_ROLLUP_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "query_daily_rollup",
+        "description": (
+            f"Count events from the pre-aggregated `{ROLLUP_COLLECTION}` collection (one count per day, "
+            "propertyId, type, entryType and leaveType; refreshed periodically, so today's latest events may "
+            "be missing). Much faster than scanning events: use it for counts and breakdowns over days or "
+            "months, e.g. 'how many QR check-ins last month' or 'check-ins per day per property'."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "date_from": {"type": "string", "description": "First day (inclusive), ISO date e.g. 2025-09-01"},
+                "date_to": {"type": "string", "description": "End day (exclusive), ISO date e.g. 2025-10-01"},
+                "group_by": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": ["day"] + list(DIMENSIONS)},
+                    "description": "Breakdown dimensions; empty for a single total",
+                },
+                "type": {"type": "string", "description": "Event type to restrict to, e.g. enterEvents"},
+                "entry_type": {"type": "string", "description": "entryType to restrict to, e.g. qrCode"},
+                "leave_type": {"type": "string", "description": "leaveType to restrict to"},
+                "property_id": {"type": "string", "description": "propertyId (24 hex characters) to restrict to"},
+            },
+            "required": ["date_from", "date_to"],
+        },
+    },
+}
+
+
+def rollup_query_arguments(arguments: Dict[str, Any], database: str) -> Dict[str, Any]:
+    """
+    Arguments of the MCP aggregate tool for a query_daily_rollup call made by the model.
+
+    Raises:
+        ValueError: Invalid date or group_by dimension
+    """
+    days = []
+    for param in ("date_from", "date_to"):
+        value = arguments.get(param)
+        if not isinstance(value, str) or not _DAY.match(value):
+            raise ValueError(f"{param} must be an ISO date like 2025-09-01, got {value!r}")
+        days.append(value[:10])
+    match: Dict[str, Any] = {"day": {"$gte": days[0], "$lt": days[1]}}
+    for param, field in (("type", "type"), ("entry_type", "entryType"), ("leave_type", "leaveType")):
+        if arguments.get(param):
+            match[field] = arguments[param]
+    if arguments.get("property_id"):
+        if not re.match(r"^[0-9a-fA-F]{24}$", arguments["property_id"]):
+            raise ValueError(f"property_id must be 24 hex characters, got {arguments['property_id']!r}")
+        match["propertyId"] = {"$oid": arguments["property_id"]}
+
+    group_by = arguments.get("group_by") or []
+    unknown = [dim for dim in group_by if dim not in ("day",) + DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown group_by dimension(s) {unknown}, expected day or one of {DIMENSIONS}")
+
+    group_id = {dim: f"${dim}" for dim in group_by} or None
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": group_id, "count": {"$sum": "$count"}}},
+        {"$sort": {"_id": 1} if group_id else {"count": -1}},
+    ]
+    return {"database": database, "collection": ROLLUP_COLLECTION, "pipeline": pipeline}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="Rebuild the rollup from scratch")
+    parser.add_argument("--timezone", default="UTC", help="Timezone that defines the days")
+    parser.add_argument("--lookback-minutes", type=float, default=DEFAULT_LOOKBACK.total_seconds() / 60,
+                        help="Re-read this much before the watermark for late events")
+    args = parser.parse_args()
+
+    load_dotenv()
+    connection_string = os.getenv("MDB_MCP_CONNECTION_STRING")
+    database_name = os.getenv("MDB_MCP_DATABASE")
+    if not connection_string or not database_name:
+        print("Error: MDB_MCP_CONNECTION_STRING and MDB_MCP_DATABASE must be set in the .env file")
+        return
+
+    client = MongoClient(connection_string)
+    try:
+        print(f"Building {ROLLUP_COLLECTION} ({'full' if args.full else 'incremental'}, timezone {args.timezone})...")
+        summary = build_daily_rollup(
+            client[database_name],
+            tz=args.timezone,
+            full=args.full,
+            lookback=timedelta(minutes=args.lookback_minutes)
+        )
+        print(f"✓ Recomputed {len(summary['days'])} day(s)")
+        print(f"✓ Watermark: {summary['previous_watermark']} -> {summary['watermark']}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
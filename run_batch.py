@@ -0,0 +1,232 @@
+"""
+Batch question mode for the MongoDB AI Agent.
+
+Runs a file of questions through one shared MongoDBAgent (MCP session pool,
+metadata cache) with bounded concurrency and appends one JSON line per
+question to the output as soon as it completes.
+
+Input (JSONL or CSV, by file extension), one question per line/row:
+    {"id": "daily-checkins", "text": "Who checked in today?", "today_date": "2025-10-09"}
+"text" may also be called "question"; "id" and "today_date" are optional.
+Questions without an id are identified by a hash of their text and date.
+
+Output lines:
+    {"id": ..., "text": ..., "today_date": ..., "status": "ok", "collection": ...,
+     "filter": {...}, "final_answer": ..., "stop_reason": ..., "elapsed_s": ...}
+"status" is "ok", "incomplete" (the agent ran out of time or produced no
+query; "error" says which) or "error".
+
+Rerunning with the same output file resumes: questions already answered
+successfully are skipped, incomplete and failed ones are retried.
+
+Usage:
+    python run_batch.py questions.jsonl --output answers.jsonl
+    python run_batch.py questions.csv --output answers.jsonl --max-concurrency 8
+    python run_batch.py questions.jsonl --output answers.jsonl --stop-mode query_only
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from agent_registry import aclose_agents, get_agent
+from evaluation import rate_limit_aware
+from mongodb_agent import STOP_MODES
+
+# Load environment variables
+env_path = Path(__file__).parent / ".env"
+if env_path.exists():
+    load_dotenv(env_path)
+else:
+    load_dotenv()
+
+# Result fields copied to the output (the full iterations and trace with --full-results)
+RESULT_FIELDS = ("collection", "filter", "final_answer", "stop_reason", "difficulty", "pagination")
+
+# Stop reasons of runs cut short by a timeout
+TIMEOUT_STOP_REASONS = ("deadline_exceeded", "completion_timeout")
+
+
+def incomplete_reason(result: Dict[str, Any]) -> Optional[str]:
+    """Why an agent result is not a complete answer, or None when it is."""
+    if result.get("stop_reason") in TIMEOUT_STOP_REASONS:
+        return f"stopped by {result['stop_reason']}"
+    if not result.get("collection"):
+        return "no query was extracted"
+    return None
+
+
+def question_id(question: Dict[str, Any]) -> str:
+    """Stable id of a question without an explicit one."""
+    key = json.dumps([question["text"], question.get("today_date")])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def read_questions(path: str) -> List[Dict[str, Any]]:
+    """
+    Read questions from a JSONL or CSV file.
+
+    Returns:
+        Questions with "id", "text" and "today_date" (None when not given)
+
+    Raises:
+        ValueError: A row has no question text
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    questions = []
+    for number, row in enumerate(rows, start=1):
+        text = row.get("text") or row.get("question")
+        if not text:
+            raise ValueError(f"{path}: question {number} has no 'text' or 'question'")
+        question = {"text": text, "today_date": row.get("today_date") or None}
+        question["id"] = str(row.get("id") or question_id(question))
+        questions.append(question)
+    return questions
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids answered successfully in an existing output file."""
+    if not os.path.exists(path):
+        return set()
+
+    done = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run
+                continue
+            # A partial line may still parse (e.g. "{}"), so don't trust its keys
+            if isinstance(entry, dict) and entry.get("status") == "ok" and entry.get("id") is not None:
+                done.add(str(entry["id"]))
+    return done
+
+
+async def run_batch(
+    questions: List[Dict[str, Any]],
+    output_path: str,
+    max_concurrency: int = 4,
+    stop_mode: str = "full",
+    deadline_s: Optional[float] = None,
+    full_results: bool = False
+) -> Dict[str, int]:
+    """
+    Answer questions concurrently, appending each result to output_path as it completes.
+
+    Args:
+        questions: Questions from read_questions()
+        output_path: JSONL file the results are appended to
+        max_concurrency: Maximum number of questions in flight
+        stop_mode: Agent stop mode (see STOP_MODES)
+        deadline_s: Wall-clock limit per question, in seconds
+        full_results: Also write the iterations and trace of each question
+
+    Returns:
+        Number of questions answered ("ok"), cut short ("incomplete") and failed ("error")
+    """
+    agent = get_agent(adaptive_iterations=True)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    counts = {"ok": 0, "incomplete": 0, "error": 0}
+
+    async def ask(user_query):
+        return await agent.query(user_query, stop_mode=stop_mode, deadline_s=deadline_s)
+
+    ask = rate_limit_aware(ask)
+
+    async def answer(question):
+        async with semaphore:
+            user_query = {"text": question["text"]}
+            if question["today_date"]:
+                user_query["today_date"] = question["today_date"]
+
+            start = time.perf_counter()
+            entry = {"id": question["id"], "text": question["text"], "today_date": question["today_date"]}
+            try:
+                result = await ask(user_query)
+                reason = incomplete_reason(result)
+                entry["status"] = "ok" if reason is None else "incomplete"
+                if reason is not None:
+                    entry["error"] = reason
+                fields = RESULT_FIELDS + (("iterations", "trace") if full_results else ())
+                entry.update({field: result.get(field) for field in fields})
+            except Exception as e:
+                entry["status"] = "error"
+                entry["error"] = f"{type(e).__name__}: {e}"
+            entry["elapsed_s"] = round(time.perf_counter() - start, 3)
+            return entry
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        for finished in asyncio.as_completed([answer(question) for question in questions]):
+            entry = await finished
+            # One line per finished question, flushed so an interrupted run can resume
+            output.write(json.dumps(entry, default=str) + "\n")
+            output.flush()
+            counts[entry["status"]] += 1
+            print(f"[{sum(counts.values())}/{len(questions)}] {entry['status']:10} {entry['id']} ({entry['elapsed_s']:.1f}s)")
+    return counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Questions as JSONL or CSV")
+    parser.add_argument("--output", required=True, help="JSONL file results are appended to (and resumed from)")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Maximum number of questions in flight")
+    parser.add_argument("--stop-mode", choices=STOP_MODES, default="full", help="Agent stop mode")
+    parser.add_argument("--deadline-s", type=float, help="Wall-clock limit per question, in seconds")
+    parser.add_argument("--full-results", action="store_true", help="Also write iterations and traces")
+    return parser.parse_args()
+
+
+async def _run(args, questions):
+    try:
+        return await run_batch(
+            questions,
+            args.output,
+            max_concurrency=args.max_concurrency,
+            stop_mode=args.stop_mode,
+            deadline_s=args.deadline_s,
+            full_results=args.full_results
+        )
+    finally:
+        await aclose_agents()
+
+
+def main():
+    args = parse_args()
+
+    questions = read_questions(args.input)
+    done = completed_ids(args.output)
+    pending, seen = [], set(done)
+    for question in questions:
+        # Duplicate questions are only asked once
+        if question["id"] not in seen:
+            seen.add(question["id"])
+            pending.append(question)
+
+    answered = len({question["id"] for question in questions} & done)
+    print(f"Questions: {len(questions)} | already answered: {answered} | to run: {len(pending)}")
+    if not pending:
+        return
+
+    start = time.perf_counter()
+    counts = asyncio.run(_run(args, pending))
+    print(f"✓ {counts['ok']} answered, {counts['incomplete']} incomplete, {counts['error']} failed in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
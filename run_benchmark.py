@@ -0,0 +1,238 @@
+"""
+Performance benchmark for the MongoDB AI Agent.
+
+Replays the inputs of dataset/dataset.py and dataset/conversation_dataset.py
+against MongoDBAgent at a configurable concurrency and reports latency
+percentiles, iterations, tool calls and tokens per query and queries/sec.
+Results are written as JSON for comparison with compare_benchmarks.py.
+
+Backends:
+    fake      scripted model and MCP server with simulated latency (offline)
+    recorded  strict replay of cassettes recorded with --cassette record
+    live      real OpenAI and MCP server
+
+Usage:
+    python run_benchmark.py --backend fake --concurrency 8 --repeat 3
+    python run_benchmark.py --backend recorded --cassette-dir .cassettes
+    python run_benchmark.py --backend live --output benchmarks/live.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Add dataset directory to path
+sys.path.insert(0, str(Path(__file__).parent / "dataset"))
+
+from benchmark_stats import percentile
+from cassette import Cassette, DEFAULT_CASSETTE_DIR
+from fake_backend import FakeOpenAIClient, fake_session_factory
+from mongodb_agent import MongoDBAgent
+
+# Load environment variables
+env_path = Path(__file__).parent / ".env"
+if env_path.exists():
+    load_dotenv(env_path)
+else:
+    load_dotenv()
+
+BACKENDS = ("fake", "recorded", "live")
+DATASETS = ("query", "conversation")
+
+
+# ============================================================================
+# STATISTICS
+# ============================================================================
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def summarize(samples: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    """Aggregate per-query samples into the benchmark summary."""
+    ok = [s for s in samples if s["error"] is None]
+    latencies = [s["latency_ms"] for s in ok]
+    return {
+        "queries": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_seconds": round(wall_seconds, 3),
+        "queries_per_second": round(len(ok) / wall_seconds, 3) if wall_seconds > 0 else None,
+        "latency_ms": {
+            "mean": _mean(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else None,
+        },
+        "iterations_per_query": _mean([s["iterations"] for s in ok]),
+        "tool_calls_per_query": _mean([s["tool_calls"] for s in ok]),
+        "tokens_per_query": _mean([s["prompt_tokens"] + s["completion_tokens"] for s in ok]),
+        "prompt_tokens_per_query": _mean([s["prompt_tokens"] for s in ok]),
+        "completion_tokens_per_query": _mean([s["completion_tokens"] for s in ok]),
+    }
+
+
+# ============================================================================
+# HARNESS
+# ============================================================================
+
+def load_inputs(datasets: List[str]) -> List[Dict[str, Any]]:
+    """Collect (case name, agent input) pairs from the evaluation datasets."""
+    inputs = []
+    if "query" in datasets:
+        from dataset import dataset as query_dataset
+        inputs += [{"case": f"query/{c.name}", "input": c.inputs} for c in query_dataset.cases]
+    if "conversation" in datasets:
+        from conversation_dataset import dataset as conversation_dataset
+        inputs += [{"case": f"conversation/{c.name}", "input": c.inputs} for c in conversation_dataset.cases]
+    return inputs
+
+
+def build_agent(args) -> MongoDBAgent:
+    """Create the agent under test for the selected backend."""
+    if args.backend == "fake":
+        return MongoDBAgent(
+            openai_api_key="fake",
+            mongodb_connection_string="mongodb://fake",
+            database_name=os.getenv("MDB_MCP_DATABASE") or "buzzin-api-staging",
+            openai_client=FakeOpenAIClient(median_latency_ms=args.fake_llm_ms, seed=args.seed),
+            session_factory=fake_session_factory(median_latency_ms=args.fake_tool_ms, seed=args.seed),
+            trace_sinks=[],
+        )
+    if args.backend == "recorded":
+        return MongoDBAgent(
+            openai_api_key=os.getenv("OPENAI_API_KEY") or "recorded",
+            mongodb_connection_string=os.getenv("MDB_MCP_CONNECTION_STRING") or "mongodb://recorded",
+            database_name=os.getenv("MDB_MCP_DATABASE") or "buzzin-api-staging",
+            cassette=Cassette(args.cassette_dir, mode="replay", strict=True),
+            trace_sinks=[],
+        )
+    return MongoDBAgent(trace_sinks=[])
+
+
+async def run_case(agent: MongoDBAgent, case: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    """Run one input through the agent and turn its trace into a sample."""
+    sample = {"case": case["case"], "repeat": repeat, "error": None}
+    start = time.perf_counter()
+    try:
+        result = await agent.query(case["input"])
+    except Exception as e:
+        sample["error"] = f"{type(e).__name__}: {e}"
+        sample["latency_ms"] = (time.perf_counter() - start) * 1000
+        return sample
+
+    totals = result["trace"]["totals"]
+    sample.update({
+        "latency_ms": result["trace"]["total_ms"],
+        "iterations": len(result.get("iterations", [])),
+        "tool_calls": totals["tool_calls"],
+        "prompt_tokens": totals["prompt_tokens"],
+        "completion_tokens": totals["completion_tokens"],
+        "cached_tokens": totals["cached_tokens"],
+        "stage_ms": totals["stage_ms"],
+    })
+    return sample
+
+
+async def run_benchmark(agent: MongoDBAgent, inputs: List[Dict[str, Any]], concurrency: int, repeat: int):
+    """Run every input `repeat` times with at most `concurrency` queries in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(case, r):
+        async with semaphore:
+            return await run_case(agent, case, r)
+
+    start = time.perf_counter()
+    try:
+        samples = await asyncio.gather(*(bounded(case, r) for r in range(repeat) for case in inputs))
+    finally:
+        await agent.aclose()
+    return list(samples), time.perf_counter() - start
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    latency = summary["latency_ms"]
+    fmt = lambda v: "n/a" if v is None else f"{v:.1f}"
+    print(f"   Queries: {summary['queries']} ({summary['errors']} errors) in {summary['wall_seconds']}s "
+          f"-> {summary['queries_per_second']} queries/s")
+    print(f"   Latency ms: p50 {fmt(latency['p50'])} | p95 {fmt(latency['p95'])} | "
+          f"p99 {fmt(latency['p99'])} | max {fmt(latency['max'])}")
+    print(f"   Per query: {fmt(summary['iterations_per_query'])} iterations, "
+          f"{fmt(summary['tool_calls_per_query'])} tool calls, {fmt(summary['tokens_per_query'])} tokens")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, default="fake")
+    parser.add_argument("--datasets", nargs="+", choices=DATASETS, default=list(DATASETS))
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum queries in flight")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per input (more samples per case)")
+    parser.add_argument("--cassette-dir", default=DEFAULT_CASSETTE_DIR, help="Cassettes for --backend recorded")
+    parser.add_argument("--fake-llm-ms", type=float, default=800.0, help="Median fake completion latency")
+    parser.add_argument("--fake-tool-ms", type=float, default=60.0, help="Median fake tool call latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file for the results (default: benchmarks/<timestamp>.json)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 80)
+    print("MongoDB AI Agent Benchmark")
+    print("=" * 80)
+    print()
+
+    inputs = load_inputs(args.datasets)
+    print(f"Backend: {args.backend} | inputs: {len(inputs)} | repeat: {args.repeat} | concurrency: {args.concurrency}")
+    print()
+
+    agent = build_agent(args)
+    samples, wall_seconds = asyncio.run(run_benchmark(agent, inputs, args.concurrency, args.repeat))
+    summary = summarize(samples, wall_seconds)
+
+    started_at = datetime.now(timezone.utc)
+    output = Path(args.output or f"benchmarks/{started_at.strftime('%Y%m%dT%H%M%SZ')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "metadata": {
+                "created_at": started_at.isoformat(),
+                "git_commit": _git_commit(),
+                "backend": args.backend,
+                "model": agent.model,
+                "datasets": args.datasets,
+                "concurrency": args.concurrency,
+                "repeat": args.repeat,
+                "seed": args.seed,
+            },
+            "summary": summary,
+            "samples": samples,
+        }, f, indent=2)
+
+    print("\n[Summary]:")
+    print_summary(summary)
+    print(f"\nResults saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,16 @@ This evaluates:
 
 Usage:
     python run_conversation_evaluation.py
+    python run_conversation_evaluation.py --cassette record   # record LLM/MCP calls to .cassettes/
+    python run_conversation_evaluation.py --cassette replay   # replay recorded calls, only new ones go live
+    python run_conversation_evaluation.py --max-concurrency 8 # run up to 8 cases at once
+    python run_conversation_evaluation.py --incremental       # only re-run cases changed since their stored result
+    python run_conversation_evaluation.py --history           # score and latency trend of stored runs
 """
 
+import argparse
+import asyncio
+import os
 import sys
 from pathlib import Path
 from dotenv import load_dotenv
@@ -18,7 +26,13 @@ import json
 # Add dataset directory to path
 sys.path.insert(0, str(Path(__file__).parent / "dataset"))
 
-from conversation_dataset import dataset, ai_mongo_conversation
+from conversation_dataset import dataset, ai_mongo_conversation_async, QUERY_OPTIONS
+from cached_judge import judge_cache
+
+from cassette import CASSETTE_MODES, DEFAULT_CASSETTE_DIR
+from agent_registry import aclose_agents, get_agent
+from eval_store import DEFAULT_EVAL_STORE, EvalStore, print_history
+from evaluation import evaluate_with_store, evaluation_fingerprint
 
 # Load environment variables
 env_path = Path(__file__).parent / ".env"
@@ -34,8 +48,51 @@ from pydantic_ai import Agent
 logfire.configure()  
 logfire.instrument_pydantic_ai()
 
+# Export per-stage agent traces (latency, tokens, tool bytes) to logfire as well
+os.environ.setdefault("AGENT_TRACE_LOGFIRE", "1")
+
+
+# Name the results are stored under in the eval store
+DATASET_NAME = "conversations"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cassette", choices=CASSETTE_MODES, help="Record or replay LLM and MCP calls")
+    parser.add_argument("--cassette-dir", default=DEFAULT_CASSETTE_DIR, help="Directory holding recorded calls")
+    parser.add_argument("--strict", action="store_true", help="Fail on replay misses instead of going live")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Maximum number of cases evaluated at once")
+    parser.add_argument("--store", default=DEFAULT_EVAL_STORE, help="SQLite file the case results are stored in")
+    parser.add_argument("--incremental", action="store_true", help="Reuse stored results of unchanged cases")
+    parser.add_argument("--history", action="store_true", help="Print the trend of stored runs and exit")
+    return parser.parse_args()
+
+
+async def run_evaluation(store: EvalStore, incremental: bool, max_concurrency: int):
+    """Evaluate the dataset concurrently, then close the shared agent's sessions on this loop."""
+    try:
+        fingerprint = evaluation_fingerprint(dataset, get_agent().fingerprint(**QUERY_OPTIONS))
+        return await evaluate_with_store(
+            dataset, ai_mongo_conversation_async, store, DATASET_NAME, fingerprint,
+            incremental=incremental, max_concurrency=max_concurrency,
+        )
+    finally:
+        await aclose_agents()
+
 
 def main():
+    args = parse_args()
+    if args.cassette:
+        # MongoDBAgent picks the cassette up from the environment
+        os.environ["AGENT_CASSETTE_MODE"] = args.cassette
+        os.environ["AGENT_CASSETTE_DIR"] = args.cassette_dir
+        os.environ["AGENT_CASSETTE_STRICT"] = "1" if args.strict else ""
+
+    store = EvalStore(args.store)
+    if args.history:
+        print_history(store, DATASET_NAME)
+        return
+    
     print("=" * 80)
     print("MongoDB AI Agent - Conversation Evaluation")
     print("=" * 80)
@@ -48,7 +105,7 @@ def main():
     
     # Run full evaluation
     try:
-        results = dataset.evaluate_sync(ai_mongo_conversation)
+        results, reused = asyncio.run(run_evaluation(store, args.incremental, args.max_concurrency))
         
         print("\n" + "=" * 80)
         print("EVALUATION RESULTS")
@@ -56,7 +113,8 @@ def main():
         
         # Show the results table
         try:
-            print(results)
+            if results is not None:
+                print(results)
         except UnicodeEncodeError:
             print("[Note: Results table contains characters that cannot be displayed in this console]")
             print(f"Results: {len(results.cases)} successful, {len(results.failures)} failed")
@@ -67,8 +125,11 @@ def main():
         # Show summary
         print(f"\n[Summary]:")
         print(f"   Total cases: {len(dataset.cases)}")
-        print(f"   Successful: {len(results.cases)}")
-        print(f"   Failed: {len(results.failures)}")
+        print(f"   Reused from {args.store}: {len(reused)}")
+        print(f"   Successful: {len(results.cases) if results else 0}")
+        print(f"   Failed: {len(results.failures) if results else 0}")
+        cache = judge_cache.stats()
+        print(f"   Judge verdicts: {cache['hits']} cached, {cache['misses']} judged live ({judge_cache.directory})")
         
     except Exception as e:
         print(f"\n[ERROR] Fatal Error: {e}")
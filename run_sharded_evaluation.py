@@ -0,0 +1,230 @@
+"""
+Run an evaluation dataset sharded across worker processes.
+
+Cases are assigned to shards by a stable hash of their name, so a case
+always lands in the same shard for a given shard count and a single shard
+can be re-run on its own. Each worker process evaluates its shard
+concurrently with its own agent and MCP session pool; the shard reports are
+merged into one report (and stored, see eval_store.py).
+
+Usage:
+    python run_sharded_evaluation.py                              # queries dataset, one shard per core
+    python run_sharded_evaluation.py --dataset conversations --shards 8
+    python run_sharded_evaluation.py --shards 8 --only 3,5        # re-run shards 3 and 5 of 8
+    python run_sharded_evaluation.py --incremental                # only cases changed since their stored result
+    python run_sharded_evaluation.py --cassette replay            # replay recorded calls in every worker
+
+A shard whose worker fails is reported as failed; the reports of the other
+shards are still merged and stored, so the failed shard can be re-run alone
+with --only.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Add dataset directory to path (also in the spawned workers, which re-import this module)
+sys.path.insert(0, str(Path(__file__).parent / "dataset"))
+
+from pydantic_evals.reporting import EvaluationReport
+
+from cassette import CASSETTE_MODES, DEFAULT_CASSETTE_DIR
+from agent_registry import aclose_agents, get_agent
+from eval_store import DEFAULT_EVAL_STORE, EvalStore
+from evaluation import evaluate_concurrently, evaluation_fingerprint, split_stored_cases, store_run
+
+# Load environment variables
+env_path = Path(__file__).parent / ".env"
+if env_path.exists():
+    load_dotenv(env_path)
+else:
+    load_dotenv()
+
+
+# Dataset name -> (module in dataset/, async task function)
+DATASETS = {
+    "queries": ("dataset", "ai_mongo_query_async"),
+    "conversations": ("conversation_dataset", "ai_mongo_conversation_async"),
+}
+
+
+def shard_of(case_name: str, shards: int) -> int:
+    """Shard of a case: stable across runs and processes (unlike the salted built-in hash)."""
+    return int(hashlib.sha1(case_name.encode("utf-8")).hexdigest()[:8], 16) % shards
+
+
+def load_dataset(dataset_name: str) -> Tuple[Any, Any, Dict[str, Any]]:
+    """Import a dataset module and return (dataset, async task function, its agent.query() options)."""
+    module_name, task_name = DATASETS[dataset_name]
+    module = importlib.import_module(module_name)
+    return module.dataset, getattr(module, task_name), module.QUERY_OPTIONS
+
+
+def _run_shard(dataset_name: str, shard: int, case_names: List[str], max_concurrency: int) -> Tuple[int, Any, float]:
+    """Worker process: evaluate the cases of one shard. Returns (shard, EvaluationReport, seconds)."""
+    dataset, task, _ = load_dataset(dataset_name)
+    wanted = set(case_names)
+    shard_dataset = dataset.model_copy(update={"cases": [case for case in dataset.cases if case.name in wanted]})
+
+    async def run():
+        try:
+            return await evaluate_concurrently(shard_dataset, task, max_concurrency=max_concurrency)
+        finally:
+            await aclose_agents()
+
+    start = time.perf_counter()
+    report = asyncio.run(run())
+    return shard, report, time.perf_counter() - start
+
+
+def merge_reports(name: str, reports: List[Any]) -> Optional[Any]:
+    """One EvaluationReport holding the cases and failures of all shard reports."""
+    if not reports:
+        return None
+    return EvaluationReport(
+        name=name,
+        cases=[case for report in reports for case in report.cases],
+        failures=[failure for report in reports for failure in report.failures],
+    )
+
+
+def run_sharded(
+    dataset_name: str,
+    shards: int,
+    only: Optional[List[int]] = None,
+    max_concurrency: int = 4,
+    store: Optional[EvalStore] = None,
+    incremental: bool = False
+) -> Tuple[Optional[Any], List[Dict[str, Any]], Dict[int, str]]:
+    """
+    Evaluate a dataset across worker processes, one per shard.
+
+    Args:
+        dataset_name: Key of DATASETS
+        shards: Number of shards the cases are split into
+        only: Shards to run (default: all)
+        max_concurrency: Maximum number of cases in flight per worker
+        store: Results store to record the run in (None to not store)
+        incremental: Skip cases with a stored result for the same definition and fingerprint
+
+    Returns:
+        (merged EvaluationReport of the cases that ran, or None; reused stored
+        results; error of each shard whose worker failed)
+    """
+    dataset, _, query_options = load_dataset(dataset_name)
+    fingerprint = evaluation_fingerprint(dataset, get_agent().fingerprint(**query_options)) if store else None
+
+    if store and incremental:
+        pending, reused = split_stored_cases(dataset, store, dataset_name, fingerprint)
+    else:
+        pending, reused = list(dataset.cases), []
+
+    assignments: Dict[int, List[str]] = {}
+    for case in pending:
+        shard = shard_of(case.name, shards)
+        if only is None or shard in only:
+            assignments.setdefault(shard, []).append(case.name)
+
+    print(f"Total cases: {len(dataset.cases)} ({len(reused)} reused, {sum(map(len, assignments.values()))} to run)")
+    print(f"Shards: {', '.join(f'{shard} ({len(names)})' for shard, names in sorted(assignments.items())) or 'none'}")
+    print()
+
+    reports, failed_shards = [], {}
+    if assignments:
+        # spawn: workers start clean instead of inheriting the parent's agent, loops and sockets
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(assignments), mp_context=context) as executor:
+            futures = {
+                executor.submit(_run_shard, dataset_name, shard, names, max_concurrency): shard
+                for shard, names in sorted(assignments.items())
+            }
+            for future in as_completed(futures):
+                try:
+                    shard, report, seconds = future.result()
+                except Exception as e:
+                    # Keep the shards that finished: one crashed worker must not discard their reports
+                    shard = futures[future]
+                    failed_shards[shard] = f"{type(e).__name__}: {e}"
+                    print(f"[shard {shard}] worker failed: {failed_shards[shard]}")
+                    continue
+                print(f"[shard {shard}] {len(report.cases)} ok, {len(report.failures)} failed in {seconds:.1f}s")
+                reports.append(report)
+
+    report = merge_reports(f"{dataset_name} ({shards} shards)", reports)
+    if store:
+        # A partial rerun (or one with failed workers) only stores the shards that finished
+        store_run(store, dataset, dataset_name, fingerprint, incremental, report, reused)
+    return report, reused, failed_shards
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", choices=sorted(DATASETS), default="queries", help="Dataset to evaluate")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1, help="Number of shards (worker processes)")
+    parser.add_argument("--only", help="Comma-separated shards to run, e.g. 0,3 (default: all)")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Maximum number of cases in flight per worker")
+    parser.add_argument("--cassette", choices=CASSETTE_MODES, help="Record or replay LLM and MCP calls")
+    parser.add_argument("--cassette-dir", default=DEFAULT_CASSETTE_DIR, help="Directory holding recorded calls")
+    parser.add_argument("--strict", action="store_true", help="Fail on replay misses instead of going live")
+    parser.add_argument("--store", default=DEFAULT_EVAL_STORE, help="SQLite file the case results are stored in")
+    parser.add_argument("--no-store", action="store_true", help="Don't store the results")
+    parser.add_argument("--incremental", action="store_true", help="Reuse stored results of unchanged cases")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.shards < 1:
+        sys.exit("--shards must be at least 1")
+    only = None
+    if args.only:
+        only = [int(shard) for shard in args.only.split(",")]
+        if any(not 0 <= shard < args.shards for shard in only):
+            sys.exit(f"--only shards must be between 0 and {args.shards - 1}")
+    if args.cassette:
+        # Workers inherit the environment, so each one's MongoDBAgent picks the cassette up
+        os.environ["AGENT_CASSETTE_MODE"] = args.cassette
+        os.environ["AGENT_CASSETTE_DIR"] = args.cassette_dir
+        os.environ["AGENT_CASSETTE_STRICT"] = "1" if args.strict else ""
+
+    print("=" * 80)
+    print(f"MongoDB AI Agent Sharded Evaluation - {args.dataset}")
+    print("=" * 80)
+    print()
+
+    store = None if args.no_store else EvalStore(args.store)
+    start = time.perf_counter()
+    report, reused, failed_shards = run_sharded(
+        args.dataset,
+        args.shards,
+        only=only,
+        max_concurrency=args.max_concurrency,
+        store=store,
+        incremental=args.incremental,
+    )
+
+    print()
+    if report is not None:
+        print(report)
+    print(f"\n[Summary]:")
+    print(f"   Successful: {len(report.cases) if report else 0}")
+    print(f"   Failed: {len(report.failures) if report else 0}")
+    print(f"   Reused: {len(reused)}")
+    print(f"   Wall time: {time.perf_counter() - start:.1f}s")
+    if failed_shards:
+        shards = ",".join(str(shard) for shard in sorted(failed_shards))
+        print(f"   Failed shards: {shards} (re-run with --shards {args.shards} --only {shards})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
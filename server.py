@@ -0,0 +1,226 @@
+"""
+Async HTTP service for the MongoDB AI Agent.
+
+Serves the agent behind any frontend or load balancer, independently of the
+Streamlit UI. Each worker process holds one shared agent (OpenAI client, MCP
+session pool, metadata cache) that is warmed up at startup and closed at
+shutdown.
+
+Endpoints:
+    POST /query          run a question, returns the query result as JSON
+    POST /query/stream   same, as server-sent events: one "iteration" event per
+                         finished agent iteration, then a "result" (or "error") event
+    GET  /health         readiness of the agent (503 until warm-up succeeded; a failed
+                         warm-up is retried in the background, one at a time)
+
+Request body of /query and /query/stream:
+    {"text": "...", "today_date": "2025-10-09", "stop_mode": "full", "deadline_s": 30}
+
+Usage:
+    python server.py --port 8000
+    uvicorn server:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+from sse_starlette.sse import EventSourceResponse
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from agent_registry import aclose_agents, get_agent
+from mongodb_agent import STOP_MODES, MongoDBAgent
+
+
+load_dotenv()
+
+# Wall-clock bounds for served queries, in seconds (same defaults as app.py)
+QUERY_DEADLINE_S = float(os.getenv("AGENT_QUERY_DEADLINE_S", "60"))
+COMPLETION_TIMEOUT_S = 30.0
+TOOL_TIMEOUT_S = 15.0
+WARMUP_TIMEOUT_S = 30.0
+
+
+def _json_response(content: Any, status_code: int = 200) -> Response:
+    # Query results may hold values json can't encode natively (datetimes, ObjectIds)
+    return Response(json.dumps(content, default=str), status_code=status_code, media_type="application/json")
+
+
+def _create_agent() -> MongoDBAgent:
+    return get_agent(
+        completion_timeout_s=COMPLETION_TIMEOUT_S,
+        tool_timeout_s=TOOL_TIMEOUT_S,
+        adaptive_iterations=True,
+        # Easy questions go to this cheaper model first, e.g. gpt-4.1-mini
+        fast_model=os.getenv("AGENT_FAST_MODEL") or None,
+        # Race completions slower than the recent p95 with a duplicate request
+        hedge_completions=os.getenv("AGENT_HEDGE_COMPLETIONS", "").lower() in ("1", "true", "yes"),
+        coalesce_queries=True,
+        daily_rollups=os.getenv("AGENT_DAILY_ROLLUPS", "").lower() in ("1", "true", "yes")
+    )
+
+
+async def _warmup(app: Starlette) -> None:
+    """Warm the agent up on the server's event loop, recording the outcome for /health."""
+    try:
+        app.state.warmup = await asyncio.wait_for(app.state.agent.warmup(), WARMUP_TIMEOUT_S)
+        app.state.warmup_error = None
+    except Exception as e:
+        print(f"Agent warm-up failed: {e}")
+        app.state.warmup_error = str(e) or type(e).__name__
+
+
+def _retry_warmup(app: Starlette) -> None:
+    """Start a background warm-up retry unless one is already running."""
+    task = app.state.warmup_task
+    if task is None or task.done():
+        app.state.warmup_task = asyncio.ensure_future(_warmup(app))
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    app.state.agent = _create_agent()
+    app.state.warmup = None
+    app.state.warmup_task = None
+    await _warmup(app)
+    try:
+        yield
+    finally:
+        if app.state.warmup_task is not None:
+            app.state.warmup_task.cancel()
+        # Sessions and connections are bound to this loop, close them while it runs
+        await aclose_agents()
+
+
+async def _query_params(request: Request) -> Dict[str, Any]:
+    """
+    Parse and validate the body of a query request.
+
+    Raises:
+        ValueError: The body is not a JSON object with a non-empty "text", or
+            has an invalid "stop_mode" or "deadline_s"
+    """
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise ValueError("Request body must be JSON")
+    if not isinstance(body, dict) or not isinstance(body.get("text"), str) or not body["text"].strip():
+        raise ValueError('Request body must be a JSON object with a non-empty "text"')
+
+    user_query = {"text": body["text"]}
+    if body.get("today_date"):
+        user_query["today_date"] = body["today_date"]
+    if body.get("stop_mode") is not None and body["stop_mode"] not in STOP_MODES:
+        raise ValueError(f'"stop_mode" must be one of {list(STOP_MODES)}')
+    deadline_s = body.get("deadline_s")
+    # bool is an int subclass: true/false must not become a 1s/0s deadline; NaN,
+    # infinite, zero and negative deadlines would expire at once or never
+    if deadline_s is not None and (
+        isinstance(deadline_s, bool) or not isinstance(deadline_s, (int, float))
+        or not math.isfinite(deadline_s) or deadline_s <= 0
+    ):
+        raise ValueError('"deadline_s" must be a positive number of seconds')
+    return {
+        "user_query": user_query,
+        "stop_mode": body.get("stop_mode"),
+        # Callers may shorten the deadline, not extend it
+        "deadline_s": min(deadline_s, QUERY_DEADLINE_S) if deadline_s is not None else QUERY_DEADLINE_S,
+    }
+
+
+async def query(request: Request) -> Response:
+    try:
+        params = await _query_params(request)
+    except ValueError as e:
+        return _json_response({"error": str(e)}, status_code=400)
+    # Agent failures are server errors, not bad requests
+    result = await request.app.state.agent.query(**params)
+    return _json_response(result)
+
+
+async def query_stream(request: Request) -> Response:
+    try:
+        params = await _query_params(request)
+    except ValueError as e:
+        return _json_response({"error": str(e)}, status_code=400)
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_iteration(iteration_data: Dict[str, Any]) -> None:
+        events.put_nowait({"event": "iteration", "data": json.dumps(iteration_data, default=str)})
+
+    async def run() -> None:
+        try:
+            result = await request.app.state.agent.query(**params, on_iteration=on_iteration)
+            events.put_nowait({"event": "result", "data": json.dumps(result, default=str)})
+        except Exception as e:
+            print(f"Error processing streamed query: {e}")
+            events.put_nowait({"event": "error", "data": json.dumps({"error": str(e)})})
+        events.put_nowait(None)
+
+    async def stream():
+        task = asyncio.ensure_future(run())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            # The client went away: don't keep the agent loop running for nobody
+            task.cancel()
+
+    return EventSourceResponse(stream())
+
+
+async def health(request: Request) -> Response:
+    state = request.app.state
+    if state.warmup_error is not None:
+        # Retry in the background, so a worker started before the MCP server becomes
+        # ready on its own; probes get the last known state without waiting
+        _retry_warmup(request.app)
+
+    agent = state.agent
+    content = {
+        "status": "ok" if state.warmup_error is None else "unavailable",
+        "warmup": state.warmup,
+        "warmup_error": state.warmup_error,
+        "metadata_cache": agent.metadata_cache.stats(),
+        "single_flight": agent.single_flight.stats() if agent.single_flight else None,
+        "completions": agent.completion_stats.to_dict(),
+    }
+    return _json_response(content, status_code=200 if state.warmup_error is None else 503)
+
+
+app = Starlette(
+    routes=[
+        Route("/query", query, methods=["POST"]),
+        Route("/query/stream", query_stream, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("AGENT_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("AGENT_SERVER_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each with its own agent")
+    args = parser.parse_args()
+
+    uvicorn.run("server:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Pool of connected MCP client sessions shared by concurrent agent queries.
+
+Each session is owned by a dedicated background task, because the MCP
+transport context managers must be entered and exited in the same task.
+Sessions are opened on demand up to max_size, handed out one query at a
+time and returned to the pool afterwards; sessions whose transport died are
+discarded and replaced transparently.
+
+A pool is bound to the event loop it was created in.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, Callable, List, Optional
+
+from mcp import ClientSession
+
+
+class _PooledSession:
+    """An MCP session kept open by its owner task until close() is called."""
+
+    def __init__(self, opener: Callable[[], AsyncContextManager[ClientSession]]):
+        self._opener = opener
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._error: Optional[BaseException] = None
+        self.session: Optional[ClientSession] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    async def _run(self) -> None:
+        try:
+            async with self._opener() as session:
+                self.session = session
+                self._ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._ready.set()
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except BaseException:
+                pass
+
+
+class MCPSessionPool:
+    """
+    Bounded pool of MCP sessions.
+
+    Usage:
+        async with pool.session() as session:
+            await session.call_tool(...)
+    """
+
+    def __init__(self, opener: Callable[[], AsyncContextManager[ClientSession]], max_size: int = 8):
+        """
+        Args:
+            opener: Factory returning an async context manager that yields an
+                initialized (and connected) ClientSession
+            max_size: Maximum number of sessions open at the same time
+        """
+        self._opener = opener
+        self.max_size = max_size
+        self._semaphore = asyncio.Semaphore(max_size)
+        self._idle: List[_PooledSession] = []
+        self._open: List[_PooledSession] = []
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """Number of sessions currently open (idle or in use)."""
+        return len(self._open)
+
+    async def _acquire(self) -> _PooledSession:
+        while self._idle:
+            pooled = self._idle.pop()
+            if pooled.alive:
+                return pooled
+            await self._discard(pooled)
+
+        pooled = _PooledSession(self._opener)
+        self._open.append(pooled)
+        try:
+            await pooled.start()
+        except BaseException:
+            await self._discard(pooled)
+            raise
+        return pooled
+
+    async def _discard(self, pooled: _PooledSession) -> None:
+        if pooled in self._open:
+            self._open.remove(pooled)
+        await pooled.close()
+
+    @asynccontextmanager
+    async def session(self):
+        """Borrow a connected session for the duration of the block."""
+        if self._closed:
+            raise RuntimeError("MCP session pool is closed")
+
+        async with self._semaphore:
+            pooled = await self._acquire()
+            try:
+                yield pooled.session
+            finally:
+                if pooled.alive and not self._closed:
+                    self._idle.append(pooled)
+                else:
+                    await self._discard(pooled)
+
+    async def close(self) -> None:
+        """Close every open session. Must be called from the pool's event loop."""
+        self._closed = True
+        self._idle.clear()
+        for pooled in list(self._open):
+            await self._discard(pooled)
@@ -0,0 +1,91 @@
+"""
+Single-flight coalescing of identical concurrent agent queries.
+
+At the start of a shift many operators ask the same question ("who checked
+in today") within seconds. Instead of running one agent loop per request,
+requests that arrive while an identical one is still running wait for it and
+all receive its result. Nothing is cached: once the run finishes the next
+request starts a new one, so results are never stale.
+
+Requests are identical when they agree on:
+- the question, normalized (case, whitespace and trailing punctuation)
+- the date the question is asked on ("today" differs per day)
+- the database and the stop mode
+- the deadline: a request only waits for a run with the same deadline that
+  started before it, so it never waits longer than its own deadline
+"""
+
+import asyncio
+import copy
+import re
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase a question and collapse whitespace and trailing punctuation."""
+    return re.sub(r"\s+", " ", text or "").strip().rstrip("?!. ").lower()
+
+
+def flight_key(
+    user_query: Dict[str, Any],
+    database: str,
+    stop_mode: str,
+    deadline_s: Optional[float] = None
+) -> Tuple[str, ...]:
+    """Key under which identical concurrent queries are coalesced (deadline_s None: no deadline)."""
+    today = user_query.get("today_date") or date.today().isoformat()
+    deadline = "none" if deadline_s is None else str(float(deadline_s))
+    return (normalize_question(user_query.get("text")), str(today), str(database), stop_mode, deadline)
+
+
+class SingleFlight:
+    """Shares one in-flight agent run between concurrent identical queries."""
+
+    def __init__(self):
+        self._flights: Dict[Tuple[str, ...], asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _running(self, key: Tuple[str, ...]) -> Optional[asyncio.Task]:
+        task = self._flights.get(key)
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            return None
+        return task
+
+    async def run(self, key: Tuple[str, ...], run: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Run a query, or wait for the identical query already running.
+
+        Args:
+            key: See flight_key()
+            run: Starts the agent run; only called when no identical run is in flight
+
+        Returns:
+            The query result, with "coalesced" set to True for callers
+            that waited for another caller's run
+        """
+        task = self._running(key)
+        coalesced = task is not None
+        if coalesced:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            # The run is its own task, so a caller that gives up (e.g. a closed
+            # request) doesn't cancel it for everyone else waiting on it
+            task = asyncio.ensure_future(run())
+            self._flights[key] = task
+
+            def land(done: asyncio.Task) -> None:
+                if self._flights.get(key) is done:
+                    del self._flights[key]
+
+            task.add_done_callback(land)
+
+        # Every caller gets its own copy: callers may modify their result
+        result = copy.deepcopy(await asyncio.shield(task))
+        result["coalesced"] = coalesced
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {"inflight": len(self._flights), "leaders": self.leaders, "coalesced": self.coalesced}
@@ -0,0 +1,33 @@
+"""Shared fixtures: agents on the offline fake backends (fake_backend.py)."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fake_backend import FakeOpenAIClient, fake_session_factory
+from mongodb_agent import MongoDBAgent
+
+
+@pytest.fixture
+def make_agent():
+    """
+    Factory of agents on the fake backends: the fake model looks up the schema
+    and the unique values of `type` first, then runs the filtered find.
+    Keyword arguments override the MongoDBAgent defaults, e.g. openai_client.
+    """
+    def make(**kwargs) -> MongoDBAgent:
+        options = {
+            "openai_api_key": "fake",
+            "mongodb_connection_string": "mongodb://fake",
+            "database_name": "test",
+            "openai_client": FakeOpenAIClient(median_latency_ms=0, seed=1),
+            "session_factory": fake_session_factory(median_latency_ms=0, seed=1),
+            "trace_sinks": [],
+        }
+        options.update(kwargs)
+        return MongoDBAgent(**options)
+
+    return make
@@ -0,0 +1,47 @@
+"""Stop conditions of the agent loop, run against the offline fake backends."""
+
+import asyncio
+
+import pytest
+
+from fake_backend import fake_filter
+from query_log import is_target_query, query_call
+
+
+QUESTION = {"text": "Show all visitors who checked in today", "today_date": "2025-10-09"}
+
+
+@pytest.mark.parametrize("stop_mode", ["query_only", "fast_answer"])
+def test_metadata_lookup_does_not_stop_the_loop(make_agent, stop_mode):
+    result = asyncio.run(make_agent(prefetch_metadata=False).query(QUESTION, stop_mode=stop_mode))
+
+    assert result["collection"] == "events"
+    assert result["filter"]["type"] == fake_filter(QUESTION["text"], QUESTION["today_date"])["type"]
+    last = result["iterations"][-1]
+    assert last["stop_reason"] == "query_found"
+    assert [call["name"] for call in last["tool_calls"]] == ["find"]
+    if stop_mode == "fast_answer":
+        assert "Ran `find`" in last["final_answer"]
+
+
+def test_target_query_detection():
+    distinct = {"collection": "events", "pipeline": [{"$group": {"_id": "$type"}}]}
+    filtered = {"collection": "events", "pipeline": [{"$match": {"type": "enterEvents"}}, {"$count": "n"}]}
+    unfiltered = {"collection": "events", "pipeline": [{"$count": "n"}]}
+
+    assert not is_target_query("aggregate", distinct)
+    assert not is_target_query("aggregate", unfiltered)
+    assert is_target_query("aggregate", filtered)
+    assert is_target_query("find", {"collection": "events", "filter": {}})
+    assert not is_target_query("collection-schema", {"collection": "events"})
+
+
+def test_extracted_query_is_the_one_that_stops_the_loop():
+    failed = {"name": "find", "arguments": {"collection": "event", "filter": {"type": "x"}}, "success": False}
+    unfiltered = {"name": "aggregate", "arguments": {"collection": "events", "pipeline": [{"$count": "n"}]},
+                  "success": True}
+    found = {"name": "find", "arguments": {"collection": "events", "filter": {"type": "enterEvents"}}, "success": True}
+    iterations = [{"tool_calls": [failed, unfiltered]}, {"tool_calls": [found], "stop_reason": "query_found"}]
+
+    assert query_call(iterations) == ("find", found["arguments"])
+    assert query_call(iterations[:1]) is None
@@ -0,0 +1,42 @@
+"""Retries of a failed agent warm-up in the Streamlit app (app.py)."""
+
+import threading
+
+from app import AgentWarmup
+
+
+class FlakyAgent:
+    """Agent whose warm-up fails until the MCP server is up."""
+
+    def __init__(self):
+        self.server_up = False
+        self.attempts = 0
+        self.release = threading.Event()
+
+    def warmup_sync(self):
+        self.attempts += 1
+        if self.attempts > 1:
+            # Retries block until released, to observe one running at a time
+            self.release.wait(5)
+        if not self.server_up:
+            raise ConnectionError("MCP server not reachable")
+
+
+def test_failed_warmup_is_retried_in_the_background_once_at_a_time():
+    agent = FlakyAgent()
+    warmup = AgentWarmup(agent)
+    warmup.run()
+    assert "not reachable" in warmup.error
+
+    agent.server_up = True
+    for _ in range(5):
+        warmup.retry_if_failed()
+    retry = warmup._retry_thread
+    agent.release.set()
+    retry.join(5)
+
+    assert agent.attempts == 2
+    assert warmup.error is None
+    # Nothing left to retry
+    warmup.retry_if_failed()
+    assert warmup._retry_thread is retry
@@ -0,0 +1,28 @@
+"""Cassettes recorded with the default agent settings replay strictly."""
+
+import asyncio
+
+from cassette import Cassette
+from mongodb_agent import MongoDBAgent
+
+
+QUESTIONS = [
+    {"text": "Show all visitors who checked in today", "today_date": "2025-10-09"},
+    {"text": "Show deliveries from yesterday", "today_date": "2025-10-09"},
+]
+
+
+async def ask_all(agent: MongoDBAgent):
+    return [await agent.query(question) for question in QUESTIONS]
+
+
+def test_metadata_served_from_prefetch_and_cache_replays(make_agent, tmp_path):
+    # Recording prefetches the schema / unique values and serves the model's
+    # own metadata calls from the prefetch and the metadata cache
+    recorded = asyncio.run(ask_all(make_agent(cassette=Cassette(str(tmp_path), mode="record"))))
+
+    cassette = Cassette(str(tmp_path), mode="replay", strict=True)
+    replayed = asyncio.run(ask_all(make_agent(cassette=cassette)))
+
+    assert cassette.stats()["misses"] == 0
+    assert [r["filter"] for r in replayed] == [r["filter"] for r in recorded]
@@ -0,0 +1,61 @@
+"""Regression gate of compare_benchmarks.py on synthetic benchmark runs."""
+
+from compare_benchmarks import compare_cases, compare_overall
+from run_benchmark import summarize
+
+
+ALPHA, THRESHOLD = 0.05, 0.10
+
+
+def sample(case, latency_ms=100.0, error=None):
+    if error is not None:
+        return {"case": case, "repeat": 0, "error": error, "latency_ms": latency_ms}
+    return {"case": case, "repeat": 0, "error": None, "latency_ms": latency_ms,
+            "iterations": 2, "tool_calls": 2, "prompt_tokens": 100, "completion_tokens": 20}
+
+
+def run(samples):
+    return {"samples": samples, "summary": summarize(samples, wall_seconds=1.0)}
+
+
+def gate(baseline, candidate):
+    rows = compare_cases(baseline, candidate, ALPHA, THRESHOLD)
+    overall = compare_overall(baseline, candidate, rows, ALPHA, THRESHOLD)
+    return rows, overall
+
+
+def test_identical_runs_pass():
+    baseline = run([sample(f"case{i}", 100.0 + r) for i in range(3) for r in range(3)])
+    rows, overall = gate(baseline, baseline)
+
+    assert not overall["error_regression"] and not overall["latency_regression"]
+    assert not any(row["regressions"] for row in rows)
+
+
+def test_failing_candidate_is_a_regression():
+    baseline = run([sample(f"case{i}") for i in range(3) for _ in range(3)])
+    candidate = run([sample(f"case{i}", error="TimeoutError: deadline") for i in range(3) for _ in range(3)])
+    rows, overall = gate(baseline, candidate)
+
+    assert overall["error_regression"]
+    assert all(row["regressions"] == ["errors"] for row in rows)
+
+
+def test_missing_case_and_higher_error_rate_are_regressions():
+    baseline = run([sample(case) for case in ("a", "b") for _ in range(4)])
+    candidate = run([sample("b") for _ in range(3)] + [sample("b", error="RuntimeError: boom")])
+    rows, overall = gate(baseline, candidate)
+
+    by_case = {row["case"]: row for row in rows}
+    assert by_case["a"]["regressions"] == ["missing"]
+    assert by_case["b"]["regressions"] == ["errors"]
+    assert by_case["b"]["errors"] == (0, 1)
+    assert overall["error_regression"]
+
+
+def test_empty_candidate_is_a_regression():
+    baseline = run([sample("a") for _ in range(3)])
+    rows, overall = gate(baseline, run([]))
+
+    assert overall["error_regression"]
+    assert rows[0]["regressions"] == ["missing"]
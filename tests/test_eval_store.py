@@ -0,0 +1,77 @@
+"""Incremental evaluation runs stored in an EvalStore (eval_store.py, evaluation.py)."""
+
+import asyncio
+from dataclasses import dataclass
+
+import pytest
+from pydantic_evals import Case, Dataset
+from pydantic_evals.evaluators import Evaluator, EvaluatorContext
+
+from eval_store import EvalStore
+from evaluation import evaluate_with_store
+
+
+@dataclass
+class Matches(Evaluator):
+    def evaluate(self, ctx: EvaluatorContext) -> bool:
+        return ctx.output == ctx.expected_output
+
+
+@dataclass
+class FlakyJudge(Evaluator):
+    """Fails while `down` is set, like an LLM judge whose API errors."""
+    down: bool = True
+
+    def evaluate(self, ctx: EvaluatorContext) -> float:
+        if self.down:
+            raise RuntimeError("judge API unavailable")
+        return 1.0
+
+
+async def echo(inputs: str) -> str:
+    await asyncio.sleep(0.01)
+    return inputs
+
+
+def make_dataset(judge: FlakyJudge) -> Dataset:
+    cases = [Case(name=name, inputs=name, expected_output=name) for name in ("a", "b")]
+    return Dataset(name="test", cases=cases, evaluators=[Matches(), judge])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EvalStore(str(tmp_path / "evals.sqlite"))
+    yield store
+    store.close()
+
+
+def evaluate(store, dataset, incremental):
+    return asyncio.run(evaluate_with_store(dataset, echo, store, "test", "fingerprint", incremental=incremental))
+
+
+def test_cases_with_failed_evaluators_are_not_reused(store):
+    judge = FlakyJudge(down=True)
+    dataset = make_dataset(judge)
+    report, reused = evaluate(store, dataset, incremental=True)
+    assert all(case.evaluator_failures for case in report.cases) and reused == []
+    assert store.history("test")[0]["evaluator_errors"] == 2
+
+    # Same definition and fingerprint, but the incomplete results are run again
+    judge.down = False
+    report, reused = evaluate(store, dataset, incremental=True)
+    assert len(report.cases) == 2 and reused == []
+
+    report, reused = evaluate(store, dataset, incremental=True)
+    assert report is None and len(reused) == 2
+
+
+def test_history_latency_leaves_out_reused_cases(store):
+    dataset = make_dataset(FlakyJudge(down=False))
+    evaluate(store, dataset, incremental=True)
+    evaluate(store, dataset, incremental=True)
+
+    reused_run, first_run = store.history("test")[:2]
+    assert first_run["mean_duration_s"] is not None
+    assert reused_run["cases_reused"] == 2 and reused_run["mean_duration_s"] is None
+    assert reused_run["mean_score"] == first_run["mean_score"] == 1.0
+    assert all(row["reused_from"] is not None for row in store.case_history("test", "a")[:1])
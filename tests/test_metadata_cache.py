@@ -0,0 +1,53 @@
+"""Cache keys of metadata lookups (metadata_cache.py)."""
+
+import pytest
+
+from metadata_cache import MetadataCache, distinct_pipeline, metadata_key
+
+
+def aggregate(*pipeline):
+    return {"database": "test", "collection": "events", "pipeline": list(pipeline)}
+
+
+GROUP = {"$group": {"_id": "$type", "count": {"$sum": 1}}}
+
+
+def test_count_spellings_share_an_entry():
+    assert metadata_key("aggregate", aggregate(*distinct_pipeline("type"))) == metadata_key(
+        "aggregate", aggregate({"$group": {"_id": "$type", "count": {"$count": {}}}}, {"$sort": {"count": -1}})
+    )
+
+
+@pytest.mark.parametrize("other", [
+    # No count accumulator
+    aggregate({"$group": {"_id": "$type"}}),
+    # Count under another name
+    aggregate({"$group": {"_id": "$type", "n": {"$sum": 1}}}),
+    # The existence check drops the null group
+    aggregate({"$match": {"type": {"$ne": None}}}, GROUP),
+    aggregate({"$match": {"type": {"$exists": True}}}, GROUP),
+    # Another order
+    aggregate(GROUP, {"$sort": {"_id": 1}}),
+    aggregate(GROUP, {"$sort": {"count": 1}}),
+    aggregate(GROUP),
+])
+def test_lookups_with_different_output_do_not_share_an_entry(other):
+    assert metadata_key("aggregate", other) is not None
+    assert metadata_key("aggregate", other) != metadata_key("aggregate", aggregate(GROUP, {"$sort": {"count": -1}}))
+
+
+def test_sort_priority_is_part_of_the_key():
+    by_count = aggregate(GROUP, {"$sort": {"count": -1, "_id": 1}})
+    by_id = aggregate(GROUP, {"$sort": {"_id": 1, "count": -1}})
+    assert metadata_key("aggregate", by_count) != metadata_key("aggregate", by_id)
+
+
+def test_cache_serves_only_the_same_lookup():
+    cache = MetadataCache()
+    cache.put("aggregate", aggregate(*distinct_pipeline("type")), [{"_id": "enterEvents", "count": 3}])
+
+    assert cache.get("aggregate", aggregate(*distinct_pipeline("type"))) == [{"_id": "enterEvents", "count": 3}]
+    assert cache.get("aggregate", aggregate({"$group": {"_id": "$type"}})) is None
+    # Filtered queries are never cached
+    cache.put("aggregate", aggregate({"$match": {"type": "enterEvents"}}, GROUP), [])
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,40 @@
+"""Routing of easy questions to the fast model, run against the offline fake backends."""
+
+import asyncio
+
+import pytest
+
+from fake_backend import FakeOpenAIClient
+from query_classifier import classify_difficulty
+
+
+QUESTION = {"text": "Show all visitors who checked in today", "today_date": "2025-10-09"}
+
+
+class CountingOpenAIClient(FakeOpenAIClient):
+    """Fake model that remembers which model each completion was requested from."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requested_models = []
+        create = self.chat.completions.create
+
+        async def counted_create(model, messages, **request):
+            self.requested_models.append(model)
+            return await create(model=model, messages=messages, **request)
+
+        self.chat.completions.create = counted_create
+
+
+@pytest.mark.parametrize("stop_mode", ["full", "query_only"])
+def test_fast_model_result_with_real_filter_is_not_escalated(make_agent, stop_mode):
+    assert classify_difficulty(QUESTION) == "easy"
+    client = CountingOpenAIClient(median_latency_ms=0, seed=1)
+    agent = make_agent(model="gpt-4.1", fast_model="gpt-4.1-mini", openai_client=client, prefetch_metadata=False)
+
+    result = asyncio.run(agent.query(QUESTION, stop_mode=stop_mode))
+
+    assert result["escalation"] is None
+    assert result["model"] == "gpt-4.1-mini"
+    assert result["filter"]["type"] == "enterEvents"
+    assert set(client.requested_models) == {"gpt-4.1-mini"}
@@ -0,0 +1,51 @@
+"""Safe rewrites of generated filters (query_planner.py)."""
+
+import re
+
+import pytest
+
+from query_planner import _simplify_regex, rewrite_filter
+
+
+VALUES = ["John Smith", "Mr John", "john", "Jane\nJohn", "John\nJane", "Johnny", "", "Jo.hn"]
+
+
+def _flags(options):
+    return (re.M if "m" in options else 0) | (re.S if "s" in options else 0)
+
+
+@pytest.mark.parametrize("pattern, options, expected", [
+    (".*John.*", "", "John"),
+    (".*.*John", "", "John"),
+    ("^.*John", "m", "John"),
+    ("John.*$", "s", "John"),
+    # Anchored to the first/last line without m or s
+    ("^.*John", "", "^.*John"),
+    ("John.*$", "", "John.*$"),
+    # Lazy and possessive .* are kept
+    ("^.*?John", "m", "^.*?John"),
+    (".*?John", "", ".*?John"),
+    (".*+John", "", ".*+John"),
+    # An escaped dot is a literal
+    ("Jo\\.*", "", "Jo\\.*"),
+])
+def test_simplify_regex(pattern, options, expected):
+    simplified = _simplify_regex(pattern, options)
+
+    assert simplified == expected
+    re.compile(simplified)
+    for value in VALUES:
+        assert bool(re.search(simplified, value, _flags(options))) == bool(re.search(pattern, value, _flags(options)))
+
+
+def test_rewrite_filter_passes_regex_options():
+    rewritten, notes = rewrite_filter({"$or": [
+        {"guestName": {"$regex": "^.*John", "$options": "im"}},
+        {"hostName": {"$regex": "^.*John"}},
+    ]})
+
+    assert rewritten["$or"] == [
+        {"guestName": {"$regex": "John", "$options": "im"}},
+        {"hostName": {"$regex": "^.*John"}},
+    ]
+    assert len(notes) == 1
@@ -0,0 +1,111 @@
+"""Paging of ResultPager.fetch_page over an in-memory collection."""
+
+import pytest
+
+from result_pager import ResultPager
+
+
+class FakeCursor:
+    """The part of the pymongo cursor API that fetch_page uses."""
+
+    def __init__(self, documents, projection):
+        self.documents = documents
+        self.projection = projection
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, spec):
+        if spec is None:
+            # Like pymongo: sort() needs a key or a list of (key, direction) pairs
+            raise TypeError("sort() requires a key")
+        for field, direction in reversed(spec):
+            self.documents = sorted(self.documents, key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def skip(self, skip):
+        self._skip = skip
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def max_time_ms(self, max_time_ms):
+        return self
+
+    def __iter__(self):
+        documents = self.documents[self._skip:]
+        documents = documents[:self._limit] if self._limit else documents
+        return iter(self._project(d) for d in documents)
+
+    def _project(self, document):
+        if not self.projection:
+            return dict(document)
+        projected = dict(document)
+        for field, value in self.projection.items():
+            if value in (0, False):
+                projected.pop(field, None)
+            elif isinstance(value, str) and value.startswith("$"):
+                projected[field] = document[value[1:]]
+        return projected
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def _matches(self, document, query):
+        for field, condition in query.items():
+            if field == "$and":
+                if not all(self._matches(document, q) for q in condition):
+                    return False
+            elif isinstance(condition, dict) and "$gt" in condition:
+                if not document[field] > condition["$gt"]:
+                    return False
+            elif document.get(field) != condition:
+                return False
+        return True
+
+    def find(self, query, projection=None):
+        return FakeCursor([d for d in self.documents if self._matches(d, query)], projection)
+
+
+DOCUMENTS = [{"_id": i, "name": f"visitor{i:02d}", "type": "enterEvents"} for i in range(7)]
+
+
+@pytest.fixture
+def pager(monkeypatch):
+    pager = ResultPager("mongodb://localhost", database_name="test", page_size=3)
+    monkeypatch.setattr(pager, "_collection", lambda pagination: FakeCollection(DOCUMENTS))
+    yield pager
+    pager.close()
+
+
+def fetch_all(pager, pagination):
+    pages, token = [], None
+    while True:
+        documents, token = pager.fetch_page(pagination, token)
+        pages.append(documents)
+        if token is None:
+            return pages
+
+
+@pytest.mark.parametrize("projection, expected", [
+    (None, [dict(d) for d in DOCUMENTS]),
+    # Keyset paging reads _id and strips it again
+    ({"_id": 0, "name": 1}, [{"name": d["name"], "type": d["type"]} for d in DOCUMENTS]),
+    # _id computed from another field: skip-based paging ordered on the source _id
+    ({"_id": "$name"}, [{"_id": d["name"], "name": d["name"], "type": d["type"]} for d in DOCUMENTS]),
+])
+def test_unsorted_pages_cover_every_document_once(pager, projection, expected):
+    pages = fetch_all(pager, {"collection": "events", "filter": {}, "projection": projection})
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [d for page in pages for d in page] == expected
+
+
+def test_sorted_pages_respect_sort_and_limit(pager):
+    pagination = {"collection": "events", "filter": {}, "sort": {"name": -1}, "limit": 5}
+    pages = fetch_all(pager, pagination)
+
+    assert [[d["_id"] for d in page] for page in pages] == [[6, 5, 4], [3, 2]]
@@ -0,0 +1,50 @@
+"""Statuses and resuming of run_batch.py."""
+
+import asyncio
+import json
+
+import run_batch
+
+
+QUESTIONS = [
+    {"id": "answered", "text": "Who checked in today?", "today_date": "2025-10-09"},
+    {"id": "timed-out", "text": "Check-ins per property this year", "today_date": "2025-10-09"},
+    {"id": "no-query", "text": "Hello", "today_date": None},
+]
+
+RESULTS = {
+    "Who checked in today?": {"collection": "events", "filter": {"type": "enterEvents"}, "stop_reason": "answered"},
+    "Check-ins per property this year": {"collection": "events", "filter": {}, "stop_reason": "deadline_exceeded"},
+    "Hello": {"collection": None, "filter": None, "stop_reason": "answered"},
+}
+
+
+class FakeAgent:
+    async def query(self, user_query, **options):
+        return RESULTS[user_query["text"]]
+
+
+def test_incomplete_answers_are_retried(monkeypatch, tmp_path):
+    monkeypatch.setattr(run_batch, "get_agent", lambda **kwargs: FakeAgent())
+    output = tmp_path / "answers.jsonl"
+
+    counts = asyncio.run(run_batch.run_batch(QUESTIONS, str(output)))
+
+    assert counts == {"ok": 1, "incomplete": 2, "error": 0}
+    entries = {entry["id"]: entry for entry in map(json.loads, output.read_text().splitlines())}
+    assert entries["timed-out"]["error"] == "stopped by deadline_exceeded"
+    assert entries["no-query"]["error"] == "no query was extracted"
+    assert run_batch.completed_ids(str(output)) == {"answered"}
+
+
+def test_completed_ids_skips_malformed_lines(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    output.write_text("\n".join([
+        json.dumps({"id": "a", "status": "ok"}),
+        json.dumps({"status": "ok"}),
+        "[]",
+        '{"id": "b", "status": "o',
+        json.dumps({"id": 7, "status": "ok"}),
+    ]) + "\n")
+
+    assert run_batch.completed_ids(str(output)) == {"a", "7"}
@@ -0,0 +1,34 @@
+"""Request validation of the HTTP service (server.py), on the fake backends."""
+
+import pytest
+from starlette.testclient import TestClient
+
+import server
+
+
+@pytest.fixture
+def client(monkeypatch, make_agent):
+    monkeypatch.setattr(server, "_create_agent", lambda: make_agent(prefetch_metadata=False))
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("deadline", ["true", "0", "-5", "NaN", "Infinity", "1e999", '"30"'])
+def test_invalid_deadline_is_rejected(client, deadline):
+    response = client.post(
+        "/query", content=f'{{"text": "Who checked in today?", "deadline_s": {deadline}}}',
+        headers={"content-type": "application/json"}
+    )
+
+    assert response.status_code == 400
+    assert "deadline_s" in response.json()["error"]
+
+
+def test_query_with_deadline(client):
+    response = client.post("/query", json={
+        "text": "Show all visitors who checked in today", "today_date": "2025-10-09",
+        "stop_mode": "query_only", "deadline_s": 5,
+    })
+
+    assert response.status_code == 200
+    assert response.json()["collection"] == "events"
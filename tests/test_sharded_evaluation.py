@@ -0,0 +1,49 @@
+"""Merging of shard reports in run_sharded_evaluation.py, with workers run in threads."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic_evals import Case, Dataset
+
+import run_sharded_evaluation
+from eval_store import EvalStore
+from evaluation import evaluate_concurrently
+
+
+DATASET = Dataset(name="test", cases=[Case(name=f"case{i}", inputs=f"case{i}") for i in range(12)])
+FAILING_SHARD = 1
+
+
+async def echo(inputs: str) -> str:
+    return inputs
+
+
+class FakeAgent:
+    def fingerprint(self, **query_options) -> str:
+        return "fingerprint"
+
+
+def run_shard(dataset_name, shard, case_names, max_concurrency):
+    if shard == FAILING_SHARD:
+        raise RuntimeError("worker crashed")
+    shard_dataset = DATASET.model_copy(update={"cases": [case for case in DATASET.cases if case.name in case_names]})
+    return shard, asyncio.run(evaluate_concurrently(shard_dataset, echo, max_concurrency=max_concurrency)), 0.0
+
+
+def test_failed_worker_keeps_the_other_shards(monkeypatch, tmp_path):
+    monkeypatch.setattr(run_sharded_evaluation, "load_dataset", lambda name: (DATASET, echo, {}))
+    monkeypatch.setattr(run_sharded_evaluation, "_run_shard", run_shard)
+    monkeypatch.setattr(run_sharded_evaluation, "get_agent", FakeAgent)
+    monkeypatch.setattr(
+        run_sharded_evaluation, "ProcessPoolExecutor",
+        lambda max_workers, mp_context: ThreadPoolExecutor(max_workers=max_workers)
+    )
+    store = EvalStore(str(tmp_path / "evals.sqlite"))
+
+    report, reused, failed_shards = run_sharded_evaluation.run_sharded("test", shards=3, store=store)
+
+    failed_cases = {case.name for case in DATASET.cases if run_sharded_evaluation.shard_of(case.name, 3) == FAILING_SHARD}
+    assert failed_cases and list(failed_shards) == [FAILING_SHARD] and "worker crashed" in failed_shards[FAILING_SHARD]
+    assert {case.name for case in report.cases} == {case.name for case in DATASET.cases} - failed_cases
+    assert store.history("test")[0]["cases_run"] == len(DATASET.cases) - len(failed_cases)
+    store.close()
@@ -0,0 +1,31 @@
+"""Coalescing of identical concurrent queries (single_flight.py), on the fake backends."""
+
+import asyncio
+
+from single_flight import flight_key
+
+
+QUESTION = {"text": "Show all visitors who checked in today", "today_date": "2025-10-09"}
+
+
+def test_key_separates_deadlines():
+    key = flight_key(QUESTION, "test", "full", 30)
+    assert key == flight_key({**QUESTION, "text": "show all visitors who checked in today?"}, "test", "full", 30.0)
+    assert key != flight_key(QUESTION, "test", "full", 5)
+    assert key != flight_key(QUESTION, "test", "full", None)
+
+
+def test_only_queries_with_the_same_deadline_are_coalesced(make_agent):
+    agent = make_agent(coalesce_queries=True, prefetch_metadata=False)
+
+    async def ask():
+        return await asyncio.gather(
+            agent.query(QUESTION, deadline_s=30),
+            agent.query(QUESTION, deadline_s=30),
+            agent.query(QUESTION, deadline_s=5),
+        )
+
+    results = asyncio.run(ask())
+
+    assert [result["coalesced"] for result in results] == [False, True, False]
+    assert agent.single_flight.stats()["leaders"] == 2